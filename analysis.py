@@ -0,0 +1,547 @@
+﻿"""
+Direct stiffness analysis of the built bridge
+
+Every member is treated as a pin-jointed CHS bar carrying axial force only.
+Member ends that lie within JOINT_TOLERANCE of each other are merged into one
+node, the global stiffness matrix is assembled in one vectorized COO pass and
+converted to CSR, and the free block is factorized with a sparse LU. The pin
+anchor fixes all three translations and the roller anchor fixes the vertical
+one, matching the supports the builder snaps members to.
+
+Positions are in save coordinates, i.e. the records produced by
+BridgeModel.toRecords() or bridgeio.load(). Side members are built once and
+shown mirrored as the far truss, so they are doubled here across z = 0 before
+nodes are merged. DOFs no member stiffens at all (e.g. out of plane for a
+single Side truss) are restrained and counted rather than reported as a
+mechanism.
+
+Reanalysis keeps one factorization current through member edits. A member
+whose ends still land on existing nodes only changes the stiffness matrix by a
+few rank-one bar terms, so the new displacements follow from the old factor
+with the Sherman-Morrison-Woodbury identity. Edits that add nodes, stiffen a
+loose DOF, build up more than MAX_RANK terms or leave a mechanism fall back
+to a full rebuild.
+
+Run headless on a save with:  python analysis.py ./data/saves/bridge1.csv
+"""
+import sys
+import time
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+installIfNeeded("scipy")
+
+import numpy
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse import linalg
+from scipy.spatial import cKDTree
+import bridgeio
+import geometry
+import sections
+
+YOUNGS_MODULUS = 200e9			# Steel, Pa
+GRAVITY = 9.81					# m/s^2
+JOINT_TOLERANCE = 0.05			# Member ends closer than this share a node, matching the builder
+SUPPORT_TOLERANCE = 0.3			# Nodes within this of an anchor are supported, matching the anchor sensors
+PIVOT_TOLERANCE = 1e-10			# Relative LU pivot below which the structure counts as a mechanism
+MAX_RANK = 32					# Low-rank update terms kept before Reanalysis refactorizes
+UPDATE_TOLERANCE = 1e-8			# Relative capacitance singular value below which an update counts as a mechanism
+
+# Orientation codes, see structures.Orientation
+SIDE = 1
+TOP = 2
+BOTTOM = 3
+
+# Anchors in save coordinates, and which of x,y,z each one restrains
+PIN = (-10.0, 5.0, -5.0)
+ROLLER = (10.0, 5.0, -5.0)
+PIN_FIXED = (True, True, True)
+ROLLER_FIXED = (False, True, False)
+
+
+def defaultSupports(mirrorSide=True):
+	"""Return the (point,fixed) supports of the pin and roller anchors, mirrored for the far truss"""
+	supports = [(PIN, PIN_FIXED), (ROLLER, ROLLER_FIXED)]
+	if mirrorSide:
+		supports += [((x, y, -z), fixed) for (x, y, z), fixed in supports]
+	return supports
+
+
+def mergeNodes(points, tolerance=JOINT_TOLERANCE):
+	"""Cluster (N,3) points closer than tolerance, returning (nodes,index) with points ~ nodes[index]"""
+	points = numpy.asarray(points, dtype=float).reshape(-1,3)
+	if len(points) == 0:
+		return numpy.zeros((0,3)), numpy.zeros(0, dtype=int)
+	pairs = cKDTree(points).query_pairs(tolerance, output_type='ndarray')
+	graph = sparse.coo_matrix((numpy.ones(len(pairs)), (pairs[:,0], pairs[:,1])), shape=(len(points),)*2)
+	count, index = csgraph.connected_components(graph, directed=False)
+	weights = numpy.bincount(index, minlength=count).astype(float)
+	nodes = numpy.column_stack([numpy.bincount(index, points[:,axis], count) for axis in range(3)]) / weights[:,None]
+	return nodes, index
+
+
+def barEndpoints(records, mirrorSide=True):
+	"""Return (A,B,rows) bar end points and source record rows, with Side members mirrored as the far truss"""
+	endA, endB = geometry.memberEndpoints(records['pos'], records['euler'], records['length'])
+	rows = numpy.arange(len(records))
+	if mirrorSide:
+		side = rows[records['orientation'] == SIDE]
+		mirror = numpy.array([1.0, 1.0, -1.0])
+		endA = numpy.concatenate((endA, endA[side] * mirror))
+		endB = numpy.concatenate((endB, endB[side] * mirror))
+		rows = numpy.concatenate((rows, side))
+	return endA, endB, rows
+
+
+def barArea(records):
+	"""Return the CHS area of each record in m^2"""
+	return sections.area(records['diameter'], records['thickness'])
+
+
+class Structure(object):
+	"""Nodes, member connectivity and section data for one analysis"""
+	def __init__(self, records, mirrorSide=True, tolerance=JOINT_TOLERANCE):
+		endA, endB, rows = barEndpoints(records, mirrorSide)
+		self.tolerance = tolerance
+		self.nodes, index = mergeNodes(numpy.concatenate((endA, endB)), tolerance)
+		self.members = index.reshape(2,-1).T
+		#--Row of the source record for every bar, so mirrored bars map back to their member
+		self.rows = rows
+		self.area = barArea(records)[rows]
+		self.orientation = records['orientation'][rows]
+		self.length = numpy.zeros(len(rows))
+		self.valid = numpy.zeros(len(rows), dtype=bool)
+		self.cosines = numpy.zeros((len(rows),3))
+		self._measure(slice(None))
+
+	def _measure(self, bars):
+		delta = self.nodes[self.members[bars,1]] - self.nodes[self.members[bars,0]]
+		length = numpy.sqrt((delta ** 2).sum(axis=1))
+		#--Members shorter than the joint tolerance collapse onto one node and carry nothing
+		valid = length > self.tolerance
+		self.length[bars] = length
+		self.valid[bars] = valid
+		self.cosines[bars] = delta / numpy.where(valid, length, 1.0)[:,None]
+
+	def updateBars(self, bars, members, area, orientation, rows):
+		"""Reconnect existing bars to existing nodes, e.g. after a member edit"""
+		self.members[bars] = members
+		self.area[bars] = area
+		self.orientation[bars] = orientation
+		self.rows[bars] = rows
+		self._measure(bars)
+
+	def appendBars(self, count):
+		"""Grow every bar array by count empty bars, returning their indices"""
+		start = len(self.members)
+		self.members = numpy.concatenate((self.members, numpy.zeros((count,2), dtype=self.members.dtype)))
+		self.rows = numpy.concatenate((self.rows, numpy.zeros(count, dtype=self.rows.dtype)))
+		self.area = numpy.concatenate((self.area, numpy.zeros(count)))
+		self.orientation = numpy.concatenate((self.orientation, numpy.zeros(count, dtype=self.orientation.dtype)))
+		self.length = numpy.concatenate((self.length, numpy.zeros(count)))
+		self.valid = numpy.concatenate((self.valid, numpy.zeros(count, dtype=bool)))
+		self.cosines = numpy.concatenate((self.cosines, numpy.zeros((count,3))))
+		return numpy.arange(start, start + count)
+
+	def removeBars(self, bars):
+		"""Leave bars in place with no area so they carry and weigh nothing"""
+		self.area[bars] = 0.0
+		self.valid[bars] = False
+
+	def getNodeCount(self):
+		return len(self.nodes)
+
+	def getBarCount(self):
+		return len(self.members)
+
+	def stiffness(self, modulus=YOUNGS_MODULUS, bars=slice(None)):
+		"""Return per-bar axial stiffness EA/L in N/m, zero for collapsed bars"""
+		valid = self.valid[bars]
+		return numpy.where(valid, modulus * self.area[bars] / numpy.where(valid, self.length[bars], 1.0), 0.0)
+
+	def internalForces(self, axialForces):
+		"""Return the (N*3,) nodal forces the bars exert on the nodes, i.e. K u"""
+		forces = (axialForces * self.valid)[:,None] * self.cosines
+		dofs = self.dofs()
+		values = numpy.concatenate((-forces, forces), axis=1)
+		return numpy.bincount(dofs.ravel(), values.ravel(), len(self.nodes) * 3)
+
+	def danglingNodes(self):
+		"""Return nodes only one bar reaches, the usual cause of a mechanism in a hand-built bridge"""
+		counts = numpy.bincount(self.members[self.valid].ravel(), minlength=len(self.nodes))
+		return numpy.flatnonzero(counts == 1)
+
+	def dofs(self):
+		"""Return the (M,6) global DOFs of both ends of every bar"""
+		return numpy.column_stack((self.members[:,0:1] * 3 + numpy.arange(3), self.members[:,1:2] * 3 + numpy.arange(3)))
+
+	def selfWeight(self):
+		"""Return (N,3) nodal loads in N lumping half of each bar's weight on either end"""
+		weight = sections.DENSITY * GRAVITY * self.area * self.length
+		loads = numpy.zeros((len(self.nodes), 3))
+		loads[:,1] -= numpy.bincount(self.members[:,0], weight * 0.5, len(self.nodes))
+		loads[:,1] -= numpy.bincount(self.members[:,1], weight * 0.5, len(self.nodes))
+		return loads
+
+	def supportedDofs(self, supports, tolerance=SUPPORT_TOLERANCE):
+		"""Return a boolean (N*3,) mask of DOFs restrained by the (point,fixed) supports"""
+		fixed = numpy.zeros((len(self.nodes), 3), dtype=bool)
+		if len(self.nodes) == 0:
+			return fixed.ravel()
+		tree = cKDTree(self.nodes)
+		for point, mask in supports:
+			for node in tree.query_ball_point(point, tolerance):
+				fixed[node] |= numpy.asarray(mask, dtype=bool)
+		return fixed.ravel()
+
+
+def assemble(structure, modulus=YOUNGS_MODULUS):
+	"""Assemble the global (N*3,N*3) CSR stiffness matrix in one vectorized pass"""
+	k = structure.stiffness(modulus)
+	c = numpy.concatenate((-structure.cosines, structure.cosines), axis=1)
+	local = k[:,None,None] * c[:,:,None] * c[:,None,:]
+	dofs = structure.dofs()
+	rows = numpy.repeat(dofs, 6, axis=1).ravel()
+	cols = numpy.tile(dofs, (1,6)).ravel()
+	size = structure.getNodeCount() * 3
+	return sparse.coo_matrix((local.ravel(), (rows, cols)), shape=(size,size)).tocsr()
+
+
+class Analysis(object):
+	"""Linear static analysis of one bridge, factorized once and solvable for any nodal loads"""
+	def __init__(self, records, supports=None, mirrorSide=True, modulus=YOUNGS_MODULUS, tolerance=JOINT_TOLERANCE):
+		self.structure = Structure(records, mirrorSide, tolerance)
+		self.modulus = modulus
+		self.supports = defaultSupports(mirrorSide) if supports is None else supports
+		self.timings = {}
+
+		start = time.time()
+		self.stiffness = assemble(self.structure, modulus)
+		self.timings['assemble'] = time.time() - start
+
+		start = time.time()
+		fixed = self.structure.supportedDofs(self.supports)
+		self.supported = numpy.flatnonzero(fixed)
+		#--DOFs no bar reaches are restrained separately so planar trusses do not read as mechanisms
+		loose = ~fixed & (numpy.abs(self.stiffness.diagonal()) <= 0.0)
+		self.loose = numpy.flatnonzero(loose)
+		self.free = numpy.flatnonzero(~fixed & ~loose)
+		self._factor = None
+		self.stable = len(self.supported) > 0 and self._factorize()
+		self.timings['factorize'] = time.time() - start
+
+	def _factorize(self):
+		if len(self.free) == 0:
+			return True
+		block = self.stiffness[self.free][:,self.free].tocsc()
+		try:
+			factor = linalg.splu(block)
+		except RuntimeError:
+			return False
+		pivots = numpy.abs(factor.U.diagonal())
+		if not numpy.all(numpy.isfinite(pivots)) or pivots.min() <= pivots.max() * PIVOT_TOLERANCE:
+			return False
+		self._factor = factor
+		return True
+
+	def solveFree(self, rhs):
+		"""Solve the factorized free block for one or more right-hand sides"""
+		if len(self.free) == 0:
+			return numpy.zeros_like(rhs)
+		return self._factor.solve(rhs)
+
+	def solveLoads(self, loads):
+		"""Return (C,N,3) displacements for (C,N,3) nodal load cases in one multi-column solve, or None if unstable"""
+		if not self.stable:
+			return None
+		forces = numpy.asarray(loads, dtype=float).reshape(len(loads),-1)
+		displacements = numpy.zeros(forces.shape)
+		displacements[:,self.free] = self.solveFree(forces[:,self.free].T).T
+		return displacements.reshape(len(loads),-1,3)
+
+	def solve(self, loads=None):
+		"""Return a Solution for (N,3) nodal loads in N, defaulting to self-weight"""
+		if loads is None:
+			loads = self.structure.selfWeight()
+		start = time.time()
+		displacements = self.solveLoads([loads])
+		self.timings['solve'] = time.time() - start
+		return Solution(self, None if displacements is None else displacements[0], loads)
+
+
+class Solution(object):
+	"""Displacements, bar forces and reactions for one load case"""
+	def __init__(self, analysis, displacements, loads):
+		self.analysis = analysis
+		self.loads = numpy.asarray(loads, dtype=float).reshape(-1,3)
+		self.stable = displacements is not None
+		structure = analysis.structure
+		if not self.stable:
+			self.displacements = numpy.full((structure.getNodeCount(),3), numpy.nan)
+			self.axialForces = numpy.full(structure.getBarCount(), numpy.nan)
+			self.reactions = numpy.full((structure.getNodeCount(),3), numpy.nan)
+			return
+		self.displacements = displacements
+		#--Tension positive
+		elongation = ((displacements[structure.members[:,1]] - displacements[structure.members[:,0]]) * structure.cosines).sum(axis=1)
+		self.axialForces = structure.stiffness(analysis.modulus) * elongation
+		reactions = structure.internalForces(self.axialForces) - self.loads.ravel()
+		mask = numpy.zeros(len(reactions), dtype=bool)
+		mask[analysis.supported] = True
+		self.reactions = numpy.where(mask, reactions, 0.0).reshape(-1,3)
+
+	def memberForces(self):
+		"""Return the axial force per source record, taking the larger magnitude of mirrored pairs"""
+		rows = self.analysis.structure.rows
+		forces = numpy.zeros(rows.max() + 1 if len(rows) else 0)
+		order = numpy.argsort(numpy.abs(self.axialForces))
+		forces[rows[order]] = self.axialForces[order]
+		return forces
+
+	def getSummary(self):
+		structure = self.analysis.structure
+		summary = { 'stable'			: self.stable
+					,'nodes'			: structure.getNodeCount()
+					,'bars'				: structure.getBarCount()
+					,'looseDofs'		: len(self.analysis.loose)
+					,'danglingNodes'	: len(structure.danglingNodes())
+					,'supportedDofs'	: len(self.analysis.supported) }
+		if self.stable:
+			summary.update({ 'maxDisplacement'	: float(numpy.sqrt((self.displacements ** 2).sum(axis=1)).max()) if len(self.displacements) else 0.0
+							,'maxTension'		: float(max(self.axialForces.max(), 0.0)) if len(self.axialForces) else 0.0
+							,'maxCompression'	: float(max(-self.axialForces.min(), 0.0)) if len(self.axialForces) else 0.0
+							,'reaction'			: [float(v) for v in self.reactions.sum(axis=0)]
+							,'load'				: [float(v) for v in self.loads.sum(axis=0)] })
+		return summary
+
+
+class Reanalysis(object):
+	"""Analysis of a bridge under edit, updated per member through low-rank terms on one factorization"""
+	def __init__(self, records, ids, mirrorSide=True, **kwargs):
+		self._records = records.copy()
+		self._ids = numpy.asarray(ids, dtype=int).copy()
+		self._live = numpy.ones(len(records), dtype=bool)
+		self._mirrorSide = mirrorSide
+		self._kwargs = kwargs
+		self.rebuilds = 0
+		self.updates = 0
+		self.timings = {}
+		self._rebuild()
+
+	def _rebuild(self):
+		start = time.time()
+		self._records = self._records[self._live]
+		self._ids = self._ids[self._live]
+		self._live = numpy.ones(len(self._records), dtype=bool)
+		self._rowOf = dict(zip(self._ids.tolist(), range(len(self._ids))))
+		self.analysis = Analysis(self._records, mirrorSide=self._mirrorSide, **self._kwargs)
+		structure = self.analysis.structure
+		self._bars = {}
+		for bar, row in enumerate(structure.rows.tolist()):
+			self._bars.setdefault(int(self._ids[row]), []).append(bar)
+		#--Bars are keyed by member id from here on, since records come and go
+		structure.rows = self._ids[structure.rows]
+		self._freeIndex = numpy.full(structure.getNodeCount() * 3, -1)
+		self._freeIndex[self.analysis.free] = numpy.arange(len(self.analysis.free))
+		self._loose = numpy.zeros(structure.getNodeCount() * 3, dtype=bool)
+		self._loose[self.analysis.loose] = True
+		self._tree = cKDTree(structure.nodes) if structure.getNodeCount() else None
+		self._columns = numpy.zeros((len(self.analysis.free),0))
+		self._solved = numpy.zeros((len(self.analysis.free),0))
+		self._coefs = numpy.zeros(0)
+		self._stale = False
+		self.rebuilds += 1
+		self.timings['rebuild'] = time.time() - start
+
+	def getRank(self):
+		"""Number of low-rank terms applied on top of the factorization"""
+		return len(self._coefs)
+
+	def setMember(self, memberId, member):
+		"""Add or update one member from a (diameter,thickness,length,quantity,pos,euler,orientation) tuple"""
+		start = time.time()
+		row = self._rowOf.get(memberId)
+		if row is None:
+			row = len(self._records)
+			self._records = numpy.concatenate((self._records, bridgeio.createRecords(1)))
+			self._ids = numpy.append(self._ids, memberId)
+			self._live = numpy.append(self._live, True)
+			self._rowOf[memberId] = row
+		self._records[row] = member
+		if not self._stale:
+			self._stale = not self._replaceBars(memberId, self._records[row:row + 1])
+		self.timings['update'] = time.time() - start
+
+	def removeMember(self, memberId):
+		start = time.time()
+		row = self._rowOf.pop(memberId, None)
+		if row is None:
+			return
+		self._live[row] = False
+		if not self._stale:
+			self._stale = not self._replaceBars(memberId, self._records[:0])
+		self.timings['update'] = time.time() - start
+
+	def _replaceBars(self, memberId, record):
+		"""Swap a member's bars for new ones on existing nodes, returning False when a rebuild is needed"""
+		analysis = self.analysis
+		structure = analysis.structure
+		if not analysis.stable or self._tree is None:
+			return False
+		endA, endB, rows = barEndpoints(record, self._mirrorSide)
+		distance, nodes = self._tree.query(numpy.concatenate((endA, endB)), distance_upper_bound=structure.tolerance)
+		if not numpy.all(numpy.isfinite(distance)):
+			return False
+		members = nodes.reshape(2,-1).T
+		old = numpy.array(self._bars.get(memberId, []), dtype=int)
+		count = len(members)
+		bars = numpy.concatenate((old[:count], structure.appendBars(max(count - len(old), 0))))
+		dropped = old[count:]
+
+		#--Old bars leave with negative stiffness, new bars arrive with positive stiffness
+		terms = []
+		previous = old[:count]
+		oldMembers = structure.members[old].copy()
+		oldCosines = structure.cosines[old].copy()
+		oldStiffness = structure.stiffness(analysis.modulus, old)
+		structure.updateBars(bars, members, barArea(record)[rows], record['orientation'][rows], memberId)
+		structure.removeBars(dropped)
+		newStiffness = structure.stiffness(analysis.modulus, bars)
+		for i in range(len(old)):
+			if i < count and numpy.array_equal(oldMembers[i], members[i]):
+				#--Same nodes, e.g. a resize, so one term carries the change
+				terms.append((members[i], structure.cosines[bars[i]], newStiffness[i] - oldStiffness[i]))
+			else:
+				terms.append((oldMembers[i], oldCosines[i], -oldStiffness[i]))
+				if i < count:
+					terms.append((members[i], structure.cosines[bars[i]], newStiffness[i]))
+		for i in range(len(previous), count):
+			terms.append((members[i], structure.cosines[bars[i]], newStiffness[i]))
+		self._bars[memberId] = bars.tolist()
+
+		terms = [term for term in terms if term[2] != 0.0]
+		if len(self._coefs) + len(terms) > MAX_RANK:
+			return False
+		if not terms:
+			return True
+		columns = numpy.zeros((len(analysis.free), len(terms)))
+		for column, (ends, cosines, coef) in enumerate(terms):
+			dofs = (ends[:,None] * 3 + numpy.arange(3)).ravel()
+			values = numpy.concatenate((-cosines, cosines))
+			#--A bar reaching into a DOF that was restrained as loose changes the free set
+			if numpy.any(self._loose[dofs] & (numpy.abs(values) > PIVOT_TOLERANCE)):
+				return False
+			free = self._freeIndex[dofs]
+			numpy.add.at(columns[:,column], free[free >= 0], values[free >= 0])
+		self._columns = numpy.column_stack((self._columns, columns))
+		self._solved = numpy.column_stack((self._solved, analysis.solveFree(columns)))
+		self._coefs = numpy.append(self._coefs, [term[2] for term in terms])
+		self.updates += 1
+		return True
+
+	def solve(self, loads=None):
+		"""Return a Solution for the current members, refactorizing only when the updates cannot cover the edits"""
+		if self._stale:
+			self._rebuild()
+		analysis = self.analysis
+		structure = analysis.structure
+		current = structure.selfWeight() if loads is None else loads
+		if not analysis.stable:
+			return Solution(analysis, None, current)
+		start = time.time()
+		forces = numpy.asarray(current, dtype=float).ravel()
+		free = analysis.solveFree(forces[analysis.free])
+		if len(self._coefs):
+			#--Woodbury: (K + U C U')^-1 f = y - Z (C^-1 + U' Z)^-1 U' y, with y = K^-1 f and Z = K^-1 U
+			capacitance = numpy.diag(1.0 / self._coefs) + self._columns.T.dot(self._solved)
+			scale = numpy.abs(1.0 / self._coefs).max()
+			if numpy.linalg.svd(capacitance, compute_uv=False).min() <= scale * UPDATE_TOLERANCE:
+				#--The edits left a mechanism or a DOF nothing stiffens; let a full analysis sort it out
+				self._stale = True
+				return self.solve(loads)
+			free = free - self._solved.dot(numpy.linalg.solve(capacitance, self._columns.T.dot(free)))
+		displacements = numpy.zeros(len(forces))
+		displacements[analysis.free] = free
+		self.timings['solve'] = time.time() - start
+		return Solution(analysis, displacements.reshape(-1,3), current)
+
+
+def analyze(records, loads=None, **kwargs):
+	"""Analyze records in one call, returning the Solution"""
+	return Analysis(records, **kwargs).solve(loads)
+
+
+def prattTruss(panels, width=2.0, height=4.0, diameter=508.0, thickness=16.0):
+	"""Return (records,supports) of a Side Pratt truss starting at the pin anchor"""
+	x0, y0, z0 = PIN
+	bottom = [(x0 + i * width, y0) for i in range(panels + 1)]
+	top = [(x, y0 + height) for x, y in bottom]
+	bars = list(zip(bottom[:-1], bottom[1:])) + list(zip(top[1:-1], top[2:-1])) + list(zip(bottom, top))[1:-1]
+	bars += [(bottom[0], top[1]), (bottom[-1], top[-2])]
+	for i in range(1, panels - 1):
+		bars.append((bottom[i], top[i + 1]) if i < panels // 2 else (top[i], bottom[i + 1]))
+	rows = []
+	for (xa, ya), (xb, yb) in bars:
+		length = numpy.hypot(xb - xa, yb - ya)
+		roll = numpy.degrees(numpy.arctan2(yb - ya, xb - xa))
+		rows.append((diameter, thickness, length, 1, [(xa + xb) * 0.5, (ya + yb) * 0.5, z0], [0.0, 0.0, roll], SIDE))
+	supports = [(PIN, PIN_FIXED), ((x0 + panels * width, y0, z0), ROLLER_FIXED)]
+	supports += [((x, y, -z), fixed) for (x, y, z), fixed in supports]
+	return bridgeio.toRecords(rows), supports
+
+
+def printSummary(solution):
+	summary = solution.getSummary()
+	timings = solution.analysis.timings
+	print('nodes {nodes}, bars {bars}, supported DOFs {supportedDofs}, loose DOFs {looseDofs}, dangling ends {danglingNodes}'.format(**summary))
+	if not summary['stable']:
+		print('UNSTABLE: the bridge is a mechanism or is not supported by both anchors')
+		return
+	print('max displacement  {:10.3f} mm'.format(summary['maxDisplacement'] * 1000.0))
+	print('max tension       {:10.1f} kN'.format(summary['maxTension'] / 1000.0))
+	print('max compression   {:10.1f} kN'.format(summary['maxCompression'] / 1000.0))
+	print('total load        {:10.1f} kN'.format(summary['load'][1] / 1000.0))
+	print('total reaction    {:10.1f} kN'.format(summary['reaction'][1] / 1000.0))
+	print('assemble {:.2f} ms, factorize {:.2f} ms, solve {:.2f} ms'.format(*[timings.get(key,0.0) * 1000.0 for key in ('assemble','factorize','solve')]))
+
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1:
+		for path in sys.argv[1:]:
+			print(path)
+			printSummary(analyze(bridgeio.load(path)))
+	else:
+		print('  bars | assemble (ms) | factorize (ms) | solve (ms) | per bar (us)')
+		for panels in (10,100,500,1000,5000):
+			records, supports = prattTruss(panels)
+			analysis = Analysis(records, supports)
+			solution = analysis.solve()
+			total = sum(analysis.timings.values())
+			print('{:6d} | {:13.2f} | {:14.2f} | {:10.2f} | {:12.2f}'.format(analysis.structure.getBarCount(),
+					analysis.timings['assemble'] * 1000.0, analysis.timings['factorize'] * 1000.0,
+					analysis.timings['solve'] * 1000.0, total * 1e6 / analysis.structure.getBarCount()))
+
+		print('')
+		print('members | full re-analysis (ms) | one resize (ms) | one move (ms)')
+		for panels in (50,250,500,1000):
+			records, supports = prattTruss(panels)
+			start = time.time()
+			Analysis(records, supports).solve()
+			full = time.time() - start
+			reanalysis = Reanalysis(records, numpy.arange(len(records)), supports=supports)
+			reanalysis.solve()
+			#--Thicken the first bottom chord, then swap the first interior diagonal across its panel
+			member = list(bridgeio.iterMembers(records[:1]))[0]
+			start = time.time()
+			reanalysis.setMember(0, member[:1] + (member[1] * 1.5,) + member[2:])
+			reanalysis.solve()
+			resize = time.time() - start
+			roll = records['euler'][:,2]
+			row = int(numpy.flatnonzero((roll > 1.0) & (roll < 89.0))[1])
+			diameter, thickness, length, quantity, pos, euler, orientation = list(bridgeio.iterMembers(records[row:row + 1]))[0]
+			start = time.time()
+			reanalysis.setMember(row, (diameter, thickness, length, quantity, pos, [0.0, 0.0, 180.0 - euler[2]], orientation))
+			reanalysis.solve()
+			move = time.time() - start
+			print('{:7d} | {:21.2f} | {:15.2f} | {:13.2f}'.format(len(records), full * 1000.0, resize * 1000.0, move * 1000.0))
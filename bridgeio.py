@@ -0,0 +1,194 @@
+﻿"""
+Bridge save file formats
+
+Bridges are stored either as the legacy CSV export (one row of eleven fields
+per member) or as a versioned binary file of fixed-width little-endian records.
+The binary layout can be memory-mapped and decoded into NumPy columns in a
+single pass, which is what makes large bridges load quickly.
+
+[ Binary layout ]
+[ HEADER ]---------------MAGIC (6 bytes) | version (uint16) | count (uint32) | record size (uint32)
+[ RECORDS ]-------------count x RECORD_DTYPE
+"""
+import csv
+import os
+import struct
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+
+FORMAT_CSV = 'csv'
+FORMAT_BINARY = 'binary'
+
+CSV_EXTENSION = '.csv'
+BINARY_EXTENSION = '.tbb'
+
+MAGIC = b'TBBRDG'
+VERSION = 1
+HEADER = struct.Struct('<6sHII')
+
+# One record per member, in the same field order as the CSV columns
+RECORD_DTYPE = numpy.dtype([
+	 ('diameter',		'<f8')
+	,('thickness',		'<f8')
+	,('length',			'<f8')
+	,('quantity',		'<i4')
+	,('pos',			'<f8', (3,))
+	,('euler',			'<f8', (3,))
+	,('orientation',	'<i4')
+])
+
+CSV_FIELDS = 11
+STREAM_CHUNK = 256			# Records decoded per slice when streaming binary saves
+
+
+class BridgeFormatError(Exception):
+	"""Raised when a save file cannot be decoded"""
+	pass
+
+
+def createRecords(count=0):
+	"""Return an empty record array for count members"""
+	return numpy.zeros(count, dtype=RECORD_DTYPE)
+
+
+def toRecords(rows):
+	"""Build a record array from (diameter,thickness,length,quantity,pos,euler,orientation) tuples"""
+	rows = list(rows)
+	records = createRecords(len(rows))
+	for i, row in enumerate(rows):
+		records[i] = row
+	return records
+
+
+def detectFormat(path):
+	"""Detect save format from the file header, falling back to CSV"""
+	with open(path,'rb') as f:
+		magic = f.read(len(MAGIC))
+	if magic == MAGIC:
+		return FORMAT_BINARY
+	return FORMAT_CSV
+
+
+def formatFromPath(path):
+	"""Pick a save format from the file extension"""
+	if os.path.splitext(path)[1].lower() == CSV_EXTENSION:
+		return FORMAT_CSV
+	return FORMAT_BINARY
+
+
+def parseRow(row):
+	"""Parse one CSV row into a record tuple"""
+	if len(row) < CSV_FIELDS:
+		raise BridgeFormatError('Expected {} fields, got {}'.format(CSV_FIELDS,len(row)))
+	return ( float(row[0]), float(row[1]), float(row[2]), int(row[3]),
+			[float(row[4]), float(row[5]), float(row[6])],
+			[float(row[7]), float(row[8]), float(row[9])],
+			int(row[10]) )
+
+
+def formatRow(record):
+	"""Format one record as a CSV row"""
+	pos = record['pos']
+	euler = record['euler']
+	return [str(float(record['diameter'])),str(float(record['thickness'])),str(float(record['length'])),str(int(record['quantity'])),
+			str(pos[0]),str(pos[1]),str(pos[2]),
+			str(euler[0]),str(euler[1]),str(euler[2]),
+			int(record['orientation'])]
+
+
+def readCSV(path):
+	"""Read a legacy CSV save into a record array"""
+	with open(path,'rb') as f:
+		return toRecords(parseRow(row) for row in csv.reader(f) if row)
+
+
+def writeCSV(path, records):
+	"""Write records as a legacy CSV save"""
+	with open(path,'wb') as f:
+		writer = csv.writer(f)
+		for record in records:
+			writer.writerow(formatRow(record))
+
+
+def readHeader(f):
+	"""Read and validate the binary header, returning (version,count)"""
+	data = f.read(HEADER.size)
+	if len(data) < HEADER.size:
+		raise BridgeFormatError('Truncated header')
+	magic, version, count, recordSize = HEADER.unpack(data)
+	if magic != MAGIC:
+		raise BridgeFormatError('Not a bridge file')
+	if version > VERSION:
+		raise BridgeFormatError('Unsupported version {}'.format(version))
+	if recordSize != RECORD_DTYPE.itemsize:
+		raise BridgeFormatError('Unexpected record size {}'.format(recordSize))
+	return version, count
+
+
+def readBinary(path):
+	"""Memory-map a binary save and return its records"""
+	with open(path,'rb') as f:
+		version, count = readHeader(f)
+	if count == 0:
+		return createRecords()
+	expected = HEADER.size + count * RECORD_DTYPE.itemsize
+	if os.path.getsize(path) < expected:
+		raise BridgeFormatError('Truncated records')
+	return numpy.memmap(path,dtype=RECORD_DTYPE,mode='r',offset=HEADER.size,shape=(count,))
+
+
+def writeBinary(path, records):
+	"""Write records as a binary save"""
+	records = numpy.ascontiguousarray(records,dtype=RECORD_DTYPE)
+	with open(path,'wb') as f:
+		f.write(HEADER.pack(MAGIC,VERSION,len(records),RECORD_DTYPE.itemsize))
+		records.tofile(f)
+
+
+def load(path):
+	"""Load records from a save file of either format"""
+	if detectFormat(path) == FORMAT_BINARY:
+		return readBinary(path)
+	return readCSV(path)
+
+
+def save(path, records, format=None):
+	"""Save records, choosing the format from the extension unless given"""
+	if format is None:
+		format = formatFromPath(path)
+	if format == FORMAT_CSV:
+		writeCSV(path, records)
+	else:
+		writeBinary(path, records)
+
+
+def iterMembers(records):
+	"""Yield plain Python (diameter,thickness,length,quantity,pos,euler,orientation) tuples"""
+	columns = [ records['diameter'].tolist(), records['thickness'].tolist(), records['length'].tolist(),
+				records['quantity'].tolist(), records['pos'].tolist(), records['euler'].tolist(),
+				records['orientation'].tolist() ]
+	return zip(*columns)
+
+
+def streamMembers(path):
+	"""Lazily yield (member,progress) pairs from a save file of either format"""
+	if detectFormat(path) == FORMAT_BINARY:
+		records = readBinary(path)
+		count = float(max(len(records),1))
+		for start in range(0,len(records),STREAM_CHUNK):
+			for i, member in enumerate(iterMembers(records[start:start+STREAM_CHUNK])):
+				yield member, (start + i + 1) / count
+	else:
+		size = float(max(os.path.getsize(path),1))
+		consumed = [0]
+		with open(path,'rb') as f:
+			def lines():
+				for line in iter(f.readline,b''):
+					consumed[0] += len(line)
+					yield line
+			for row in csv.reader(lines()):
+				if row:
+					yield parseRow(row), consumed[0] / size
@@ -0,0 +1,276 @@
+﻿"""
+Structure-of-arrays bridge model
+
+Every committed member lives in one slot of a set of contiguous NumPy columns
+(id, section index, length, quantity, position, euler, orientation, flags).
+Removed slots go on a free list and are reused, so columns never shift. Scene
+nodes only mirror this state; saving, validation, bounds, totals and analysis
+input are computed from the columns without touching the scene graph.
+
+Positions and eulers are stored in Side orientation coordinates, the same
+frame used by save files and the autosave journal.
+
+Section properties come from a sections.SectionTable kept in step with the
+section indices. Steel mass per orientation and the mass moment behind the
+centre of gravity are running sums adjusted on every set and remove, so
+whole-bridge tonnage never needs a pass over the members. Side members count
+twice, once more for the mirrored far truss.
+"""
+import collections
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+import bridgeio
+import geometry
+import sections
+
+# Slot flags
+ACTIVE = 1
+
+DEFAULT_CAPACITY = 256
+ORIENTATIONS = (1, 2, 3)		# structures.Orientation Side, Top, Bottom values
+MIRRORED = 1					# Orientation whose members are also built mirrored as the far truss
+
+
+class BridgeModel(object):
+	"""Contiguous member columns with a free list of reusable slots"""
+	def __init__(self, capacity=DEFAULT_CAPACITY):
+		self._sections = []
+		self._sectionIndex = {}
+		self._sectionTable = sections.SectionTable()
+		self._resetMass()
+		self._slots = {}
+		self._free = []
+		self._size = 0
+		self._version = 0
+		self._allocate(max(capacity,1))
+
+	def sectionIndex(self, diameter, thickness):
+		"""Return the index of a (diameter,thickness) section, registering it if new"""
+		key = (float(diameter), float(thickness))
+		index = self._sectionIndex.get(key)
+		if index is None:
+			index = len(self._sections)
+			self._sections.append(key)
+			self._sectionIndex[key] = index
+			self._sectionTable.add([key])
+		return index
+
+	def getSections(self):
+		"""Return an (S,2) array of section diameters and thicknesses"""
+		return numpy.array(self._sections, dtype=float).reshape(-1,2)
+
+	def getSectionTable(self):
+		"""Return the SectionTable whose rows match section indices"""
+		return self._sectionTable
+
+	def sectionProperty(self, name, slots=None):
+		"""Return one sections.PROPERTY_DTYPE property per member, e.g. 'area' or 'massPerMetre'"""
+		if slots is None:
+			slots = self.active()
+		return self._sectionTable.getColumn(name, self.section[slots])
+
+	def set(self, memberId, member):
+		"""Add or update a member from a (diameter,thickness,length,quantity,pos,euler,orientation) tuple"""
+		diameter, thickness, length, quantity, pos, euler, orientation = member
+		slot = self._slots.get(memberId)
+		if slot is None:
+			slot = self._allocateSlot()
+			self._slots[memberId] = slot
+		else:
+			self._addMass(slot, -1.0)
+		self.id[slot] = memberId
+		self.section[slot] = self.sectionIndex(diameter, thickness)
+		self.length[slot] = length
+		self.quantity[slot] = quantity
+		self.pos[slot] = pos
+		self.euler[slot] = euler
+		self.orientation[slot] = orientation
+		self.flags[slot] = ACTIVE
+		self._addMass(slot, 1.0)
+		self._version += 1
+		return slot
+
+	def remove(self, memberId):
+		slot = self._slots.pop(memberId, None)
+		if slot is None:
+			return
+		self._addMass(slot, -1.0)
+		if not self._slots:
+			self._resetMass()
+		self.flags[slot] = 0
+		self._free.append(slot)
+		self._version += 1
+
+	def clear(self):
+		self.flags[:self._size] = 0
+		self._slots = {}
+		self._free = []
+		self._size = 0
+		self._resetMass()
+		self._version += 1
+
+	def has(self, memberId):
+		return memberId in self._slots
+
+	def getSlot(self, memberId):
+		return self._slots[memberId]
+
+	def getCount(self):
+		return len(self._slots)
+
+	def getVersion(self):
+		"""Counter bumped by every change, for caches derived from the columns"""
+		return self._version
+
+	def active(self):
+		"""Return the active slots in member id order"""
+		slots = numpy.flatnonzero(self.flags[:self._size] & ACTIVE)
+		return slots[numpy.argsort(self.id[slots], kind='mergesort')]
+
+	def get(self, memberId):
+		"""Return one member as a record tuple"""
+		slot = self._slots[memberId]
+		diameter, thickness = self._sections[self.section[slot]]
+		return ( diameter, thickness, float(self.length[slot]), int(self.quantity[slot]),
+				self.pos[slot].tolist(), self.euler[slot].tolist(), int(self.orientation[slot]) )
+
+	def items(self):
+		"""Return (id,member) pairs in id order, e.g. to seed the autosave journal"""
+		slots = self.active()
+		members = bridgeio.iterMembers(self.toRecords(slots))
+		return list(zip(self.id[slots].tolist(), members))
+
+	def toRecords(self, slots=None):
+		"""Build save records from the columns in one vectorized pass"""
+		if slots is None:
+			slots = self.active()
+		records = bridgeio.createRecords(len(slots))
+		sections = self.getSections()[self.section[slots]] if len(slots) else numpy.zeros((0,2))
+		records['diameter'] = sections[:,0]
+		records['thickness'] = sections[:,1]
+		records['length'] = self.length[slots]
+		records['quantity'] = self.quantity[slots]
+		records['pos'] = self.pos[slots]
+		records['euler'] = self.euler[slots]
+		records['orientation'] = self.orientation[slots]
+		return records
+
+	def load(self, records, ids):
+		"""Replace the model with save records assigned to the given member ids"""
+		self.clear()
+		count = len(records)
+		if count > len(self.id):
+			self._allocate(count)
+		keys = zip(records['diameter'].tolist(), records['thickness'].tolist())
+		self.section[:count] = [self.sectionIndex(diameter, thickness) for diameter, thickness in keys]
+		self.id[:count] = ids
+		self.length[:count] = records['length']
+		self.quantity[:count] = records['quantity']
+		self.pos[:count] = records['pos']
+		self.euler[:count] = records['euler']
+		self.orientation[:count] = records['orientation']
+		self.flags[:count] = ACTIVE
+		self._slots = dict(zip(self.id[:count].tolist(), range(count)))
+		self._size = count
+		slots = numpy.arange(count)
+		mass, moment = self._memberMass(slots)
+		orientation = self.orientation[slots]
+		for value in numpy.unique(orientation).tolist():
+			self._massByOrientation[value] = float(mass[orientation == value].sum())
+		self._moment = moment.sum(axis=0)
+		self._version += 1
+
+	def endpoints(self, slots=None):
+		"""Return (A,B) end point arrays of the active members"""
+		if slots is None:
+			slots = self.active()
+		return geometry.memberEndpoints(self.pos[slots], self.euler[slots], self.length[slots])
+
+	def bounds(self):
+		"""Return (min,max) corners around every member end"""
+		endA, endB = self.endpoints()
+		return geometry.bounds(numpy.concatenate((endA,endB)))
+
+	def totals(self):
+		"""Return member counts and steel lengths, overall and per orientation and section"""
+		slots = self.active()
+		length = self.length[slots]
+		orientation = self.orientation[slots]
+		byOrientation = collections.OrderedDict((value, int(numpy.count_nonzero(orientation == value))) for value in ORIENTATIONS)
+		bySection = numpy.bincount(self.section[slots], weights=length, minlength=len(self._sections))
+		return { 'members'			: len(slots)
+				,'steelLength'		: float(length.sum())
+				,'byOrientation'	: byOrientation
+				,'bySection'		: dict(zip(self._sections, bySection.tolist())) }
+
+	def massTotals(self):
+		"""Return steel tonnage, mass per orientation in kg and centre of gravity from the running sums"""
+		byOrientation = collections.OrderedDict((value, self._massByOrientation.get(value, 0.0)) for value in ORIENTATIONS)
+		mass = sum(self._massByOrientation.values())
+		centre = self._moment / mass if mass > 0 else numpy.zeros(3)
+		return { 'tonnes'			: mass * 0.001
+				,'byOrientation'	: byOrientation
+				,'centreOfGravity'	: centre.tolist() }
+
+	def validate(self):
+		"""Return (id,reason) pairs for members whose stored state is unusable"""
+		slots = self.active()
+		if not len(slots):
+			return []
+		sections = self.getSections()[self.section[slots]]
+		checks = [ ('non-finite transform', ~numpy.isfinite(numpy.hstack((self.pos[slots],self.euler[slots]))).all(axis=1))
+				  ,('non-positive length', ~(self.length[slots] > 0))
+				  ,('invalid section', ~((sections[:,1] > 0) & (sections[:,1] * 2 <= sections[:,0])))
+				  ,('unknown orientation', ~(self.orientation[slots,numpy.newaxis] == ORIENTATIONS).any(axis=1)) ]
+		problems = []
+		ids = self.id[slots]
+		for reason, failed in checks:
+			problems.extend((int(memberId), reason) for memberId in ids[failed])
+		return problems
+
+	def _memberMass(self, slots):
+		"""Return (mass,moment) of members in kg and kg m, counting the mirrored far truss"""
+		mass = self._sectionTable.getColumn('massPerMetre', self.section[slots]) * self.length[slots]
+		centre = self.pos[slots].copy()
+		mirrored = self.orientation[slots] == MIRRORED
+		#--The mirrored pair balances out across z = 0
+		mass = numpy.where(mirrored, mass * 2.0, mass)
+		centre[mirrored,2] = 0.0
+		return mass, mass[:,None] * centre
+
+	def _addMass(self, slot, sign):
+		mass, moment = self._memberMass(numpy.array([slot]))
+		orientation = int(self.orientation[slot])
+		self._massByOrientation[orientation] = self._massByOrientation.get(orientation, 0.0) + sign * float(mass[0])
+		self._moment += sign * moment[0]
+
+	def _resetMass(self):
+		self._massByOrientation = {}
+		self._moment = numpy.zeros(3)
+
+	def _allocateSlot(self):
+		if self._free:
+			return self._free.pop()
+		if self._size == len(self.id):
+			self._allocate(len(self.id) * 2)
+		slot = self._size
+		self._size += 1
+		return slot
+
+	def _allocate(self, capacity):
+		old = getattr(self, 'id', None)
+		columns = { 'id'			: numpy.zeros(capacity, dtype='<i4')
+					,'section'		: numpy.zeros(capacity, dtype='<i4')
+					,'length'		: numpy.zeros(capacity, dtype='<f8')
+					,'quantity'		: numpy.zeros(capacity, dtype='<i4')
+					,'pos'			: numpy.zeros((capacity,3), dtype='<f8')
+					,'euler'		: numpy.zeros((capacity,3), dtype='<f8')
+					,'orientation'	: numpy.zeros(capacity, dtype='<i1')
+					,'flags'		: numpy.zeros(capacity, dtype='<u1') }
+		for name, column in columns.items():
+			if old is not None:
+				column[:self._size] = getattr(self, name)[:self._size]
+			setattr(self, name, column)
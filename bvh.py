@@ -0,0 +1,268 @@
+﻿"""
+Bounding volume hierarchy for ray picking
+
+Members are picked as capsules (segment plus radius) and joints as spheres,
+i.e. capsules whose ends coincide. The hierarchy is an axis-aligned box tree
+built top-down by median split on the longest axis. A moved item only refits
+the boxes on its path to the root; inserting or removing items marks the tree
+for a rebuild on the next query. Small sets skip the tree altogether, since one
+vectorized test of every item is cheaper than descending it.
+
+Keys are whatever the caller uses to identify an item, so the module has no
+Vizard dependency. Nodes live in flat arrays so a ray descends the tree one
+level per vectorized box test, and the items of every leaf it enters are then
+tested with a single vectorized ray-capsule call.
+"""
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+
+LEAF_SIZE = 8
+BRUTE_FORCE_COUNT = 2000		# Below this many items one vectorized test of everything is faster than descending
+INFINITY = float('inf')
+
+
+def rayCapsule(origin, direction, a, b, radius):
+	"""Return the distance along a unit ray to each (a,b,radius) capsule, inf where it misses"""
+	origin = numpy.asarray(origin, dtype=float)
+	direction = numpy.asarray(direction, dtype=float)
+	a = numpy.asarray(a, dtype=float).reshape(-1,3)
+	u = numpy.asarray(b, dtype=float).reshape(-1,3) - a
+	w = origin - a
+	du = u.dot(direction)
+	uu = (u * u).sum(axis=1)
+	dw = w.dot(direction)
+	uw = (u * w).sum(axis=1)
+	# Closest points of the ray and each segment's line, clamped to the segment, then the ray, then the segment again
+	denom = uu - du * du
+	s = numpy.clip(numpy.where(denom > 1e-12, (uw - du * dw) / numpy.where(denom > 1e-12, denom, 1.0), 0.0), 0.0, 1.0)
+	t = numpy.maximum(s * du - dw, 0.0)
+	s = numpy.clip(numpy.where(uu > 1e-12, (uw + t * du) / numpy.where(uu > 1e-12, uu, 1.0), 0.0), 0.0, 1.0)
+	gap = w + t[:,None] * direction - s[:,None] * u
+	distance2 = (gap * gap).sum(axis=1)
+	radius2 = numpy.asarray(radius, dtype=float) ** 2
+	hit = distance2 <= radius2
+	entry = numpy.maximum(t - numpy.sqrt(numpy.where(hit, radius2 - distance2, 0.0)), 0.0)
+	return numpy.where(hit, entry, INFINITY)
+
+
+def rayBoxes(origin, inverse, lo, hi):
+	"""Return the entry distance of a ray into each (lo,hi) box, inf where it misses"""
+	t0 = (lo - origin) * inverse
+	t1 = (hi - origin) * inverse
+	near = numpy.maximum(numpy.minimum(t0, t1).max(axis=1), 0.0)
+	far = numpy.maximum(t0, t1).min(axis=1)
+	return numpy.where(near <= far, near, INFINITY)
+
+
+class BVH(object):
+	"""Box tree over keyed capsules tagged with a group"""
+	def __init__(self, leafSize=LEAF_SIZE, bruteForceCount=BRUTE_FORCE_COUNT):
+		self._leafSize = leafSize
+		self._bruteForceCount = bruteForceCount
+		self._builds = 0
+		self._refits = 0
+		self.clear()
+
+	def clear(self):
+		self._keys = []
+		self._rows = {}
+		self._count = 0
+		self._a = numpy.zeros((16,3))
+		self._b = numpy.zeros((16,3))
+		self._radius = numpy.zeros(16)
+		self._group = numpy.zeros(16, dtype=int)
+		self._groupCodes = {}
+		self._dirty = True
+
+	def has(self, key):
+		return key in self._rows
+
+	def getCount(self):
+		return self._count
+
+	def getStats(self):
+		return {'items' : self._count, 'builds' : self._builds, 'refits' : self._refits}
+
+	def insert(self, key, a, b, radius, group=None):
+		"""Add an item, or move it if the key is already present"""
+		if key in self._rows:
+			self.update(key, a, b, radius, group)
+			return
+		if self._count == len(self._radius):
+			self._grow()
+		row = self._count
+		self._count += 1
+		self._rows[key] = row
+		self._keys.append(key)
+		self._a[row] = a
+		self._b[row] = b
+		self._radius[row] = radius
+		self._group[row] = self._groupCode(group)
+		self._dirty = True
+
+	def update(self, key, a, b, radius=None, group=None):
+		"""Move an item, refitting only the boxes above its leaf"""
+		row = self._rows[key]
+		self._a[row] = a
+		self._b[row] = b
+		if radius is not None:
+			self._radius[row] = radius
+		if group is not None:
+			self._group[row] = self._groupCode(group)
+		if not self._dirty:
+			self._refit(self._leafOf[row])
+
+	def remove(self, key):
+		"""Remove an item, moving the last row into its place"""
+		row = self._rows.pop(key, None)
+		if row is None:
+			return
+		last = self._count - 1
+		lastKey = self._keys.pop()
+		if row != last:
+			self._keys[row] = lastKey
+			self._rows[lastKey] = row
+			for column in (self._a, self._b, self._radius, self._group):
+				column[row] = column[last]
+		self._count = last
+		self._dirty = True
+
+	def raycast(self, origin, direction, maxDistance=INFINITY, groups=None):
+		"""Return (key, distance) of the nearest item in groups hit by the ray, or (None, None)"""
+		if not self._count:
+			return None, None
+		origin = numpy.asarray(origin, dtype=float)
+		direction = numpy.asarray(direction, dtype=float)
+		direction = direction / numpy.sqrt((direction * direction).sum())
+		if self._count <= self._bruteForceCount:
+			rows = numpy.arange(self._count)
+		else:
+			rows = self._traverse(origin, direction, maxDistance)
+		if groups is not None:
+			codes = [self._groupCodes[group] for group in groups if group in self._groupCodes]
+			rows = rows[numpy.isin(self._group[rows], codes)]
+		if not len(rows):
+			return None, None
+		hits = rayCapsule(origin, direction, self._a[rows], self._b[rows], self._radius[rows])
+		index = int(numpy.argmin(hits))
+		if hits[index] == INFINITY or hits[index] > maxDistance:
+			return None, None
+		return self._keys[rows[index]], float(hits[index])
+
+	def _traverse(self, origin, direction, maxDistance):
+		"""Return the rows of every leaf whose box the ray enters within maxDistance"""
+		if self._dirty:
+			self._build()
+		inverse = 1.0 / numpy.where(numpy.abs(direction) > 1e-12, direction, 1e-12)
+		# Descend one level per vectorized box test, keeping every leaf the ray enters
+		leaves = []
+		frontier = numpy.zeros(1, dtype=int)
+		while len(frontier):
+			entry = rayBoxes(origin, inverse, self._lo[frontier], self._hi[frontier])
+			frontier = frontier[(entry < INFINITY) & (entry <= maxDistance)]
+			inner = self._left[frontier] >= 0
+			leaves.append(frontier[~inner])
+			frontier = numpy.concatenate((self._left[frontier[inner]], self._right[frontier[inner]]))
+		leaves = numpy.concatenate(leaves)
+		counts = self._size[leaves]
+		offsets = numpy.repeat(self._start[leaves] - numpy.cumsum(counts) + counts, counts)
+		return self._order[offsets + numpy.arange(counts.sum())]
+
+	def _groupCode(self, group):
+		return self._groupCodes.setdefault(group, len(self._groupCodes))
+
+	def _grow(self):
+		capacity = len(self._radius) * 2
+		for name in ('_a', '_b', '_radius', '_group'):
+			column = getattr(self, name)
+			grown = numpy.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+			grown[:len(column)] = column
+			setattr(self, name, grown)
+
+	def _itemBounds(self, rows):
+		radius = self._radius[rows][:,None]
+		lo = numpy.minimum(self._a[rows], self._b[rows]) - radius
+		hi = numpy.maximum(self._a[rows], self._b[rows]) + radius
+		return lo, hi
+
+	def _build(self):
+		"""Rebuild the tree by median split of item centres on the longest axis"""
+		count = self._count
+		self._order = numpy.arange(count)
+		self._leafOf = numpy.zeros(count, dtype=int)
+		self._dirty = False
+		self._builds += 1
+		capacity = max(1, 2 * count)
+		self._lo = numpy.zeros((capacity,3))
+		self._hi = numpy.zeros((capacity,3))
+		self._left = numpy.full(capacity, -1)
+		self._right = numpy.full(capacity, -1)
+		self._start = numpy.zeros(capacity, dtype=int)
+		self._size = numpy.zeros(capacity, dtype=int)
+		self._parent = numpy.full(capacity, -1)
+		if not count:
+			return
+		lo, hi = self._itemBounds(self._order)
+		centers = (lo + hi) * 0.5
+		nodes = 1
+		pending = [(0, 0, count)]
+		while pending:
+			index, start, end = pending.pop()
+			rows = self._order[start:end]
+			self._lo[index] = lo[rows].min(axis=0)
+			self._hi[index] = hi[rows].max(axis=0)
+			self._start[index] = start
+			self._size[index] = end - start
+			if end - start <= self._leafSize:
+				self._leafOf[rows] = index
+				continue
+			extent = centers[rows].max(axis=0) - centers[rows].min(axis=0)
+			axis = int(numpy.argmax(extent))
+			middle = start + (end - start) // 2
+			self._order[start:end] = rows[numpy.argpartition(centers[rows,axis], middle - start)]
+			self._left[index] = nodes
+			self._right[index] = nodes + 1
+			self._parent[nodes:nodes + 2] = index
+			pending.append((nodes, start, middle))
+			pending.append((nodes + 1, middle, end))
+			nodes += 2
+
+	def _refit(self, index):
+		start = self._start[index]
+		lo, hi = self._itemBounds(self._order[start:start + self._size[index]])
+		self._lo[index] = lo.min(axis=0)
+		self._hi[index] = hi.max(axis=0)
+		self._refits += 1
+		index = self._parent[index]
+		while index >= 0:
+			left = self._left[index]
+			right = self._right[index]
+			self._lo[index] = numpy.minimum(self._lo[left], self._lo[right])
+			self._hi[index] = numpy.maximum(self._hi[left], self._hi[right])
+			index = self._parent[index]
+
+
+if __name__ == '__main__':
+	import timeit
+	print('members | build (ms) | refit (us) | BVH pick (us) | brute force pick (us)')
+	for count in (100,1000,3000,10000):
+		centers = numpy.random.uniform([-10,0,-5],[10,10,5],(count,3))
+		directions = numpy.random.normal(size=(count,3))
+		directions /= numpy.sqrt((directions ** 2).sum(axis=1))[:,None]
+		a = centers - directions
+		b = centers + directions
+		radius = numpy.full(count, 0.05)
+		tree = BVH(bruteForceCount=0)
+		for key in range(count):
+			tree.insert(key, a[key], b[key], radius[key])
+		build = min(timeit.repeat(lambda: tree._build(), number=1, repeat=3))
+		refit = min(timeit.repeat(lambda: tree.update(count // 2, a[count // 2], b[count // 2] + 0.01), number=100, repeat=3)) / 100
+		origins = numpy.random.uniform([-10,0,-20],[10,10,-20],(100,3))
+		targets = numpy.random.uniform([-10,0,-5],[10,10,5],(100,3)) - origins
+		rays = list(zip(origins, targets / numpy.sqrt((targets ** 2).sum(axis=1))[:,None]))
+		picked = min(timeit.repeat(lambda: [tree.raycast(o, d) for o, d in rays], number=1, repeat=3)) / len(rays)
+		brute = min(timeit.repeat(lambda: [numpy.argmin(rayCapsule(o, d, a, b, radius)) for o, d in rays], number=1, repeat=3)) / len(rays)
+		print('{:7d} | {:10.2f} | {:10.1f} | {:13.1f} | {:21.1f}'.format(count, build * 1000.0, refit * 1e6, picked * 1e6, brute * 1e6))
@@ -0,0 +1,79 @@
+﻿"""
+Vectorized member geometry
+
+Members are CHS tubes modelled along their local x axis and centred on their
+position, so both end points follow from position, euler and length. Eulers are
+Vizard [yaw,pitch,roll] in degrees, applied roll first, then pitch, then yaw.
+
+Check the convention headless against the bundled saves with:  python geometry.py
+"""
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+
+
+def rotate(vectors, euler):
+	"""Rotate (N,3) vectors by (N,3) Vizard eulers, roll first, then pitch, then yaw"""
+	x, y, z = numpy.asarray(vectors,dtype=float).reshape(-1,3).T
+	yaw, pitch, roll = numpy.radians(numpy.asarray(euler,dtype=float).reshape(-1,3)).T
+	# Roll about z
+	x, y = x * numpy.cos(roll) - y * numpy.sin(roll), x * numpy.sin(roll) + y * numpy.cos(roll)
+	# Pitch about x
+	y, z = y * numpy.cos(pitch) - z * numpy.sin(pitch), y * numpy.sin(pitch) + z * numpy.cos(pitch)
+	# Yaw about y
+	x, z = x * numpy.cos(yaw) + z * numpy.sin(yaw), z * numpy.cos(yaw) - x * numpy.sin(yaw)
+	return numpy.column_stack((x,y,z))
+
+
+def eulerToBasis(euler):
+	"""Return (N,3,3) rotated x, y and z axes, one row per axis"""
+	euler = numpy.asarray(euler,dtype=float).reshape(-1,3)
+	count = len(euler)
+	axes = [rotate(numpy.tile(axis,(count,1)),euler) for axis in numpy.eye(3)]
+	return numpy.stack(axes,axis=1)
+
+
+def eulerToDirection(euler):
+	"""Return (N,3) unit vectors along each member's local x axis"""
+	euler = numpy.asarray(euler,dtype=float).reshape(-1,3)
+	return rotate(numpy.tile([1.0,0.0,0.0],(len(euler),1)),euler)
+
+
+def memberEndpoints(pos, euler, length):
+	"""Return (A,B) arrays of member end points, matching nodeA and nodeB"""
+	pos = numpy.asarray(pos,dtype=float).reshape(-1,3)
+	half = eulerToDirection(euler) * (numpy.asarray(length,dtype=float).reshape(-1,1) * 0.5)
+	return pos - half, pos + half
+
+
+def bounds(points):
+	"""Return (min,max) corners of a point cloud, or zeros when empty"""
+	points = numpy.asarray(points,dtype=float).reshape(-1,3)
+	if len(points) == 0:
+		return numpy.zeros(3), numpy.zeros(3)
+	return points.min(axis=0), points.max(axis=0)
+
+
+def danglingEnds(endA, endB, tolerance=0.05):
+	"""Return how many member ends meet no other member end within tolerance"""
+	ends = numpy.concatenate((endA, endB))
+	gaps = numpy.sqrt(((ends[:,numpy.newaxis] - ends[numpy.newaxis]) ** 2).sum(axis=2))
+	return int(((gaps < tolerance).sum(axis=1) == 1).sum())
+
+
+if __name__ == '__main__':
+	import glob
+	import bridgeio
+	#--A saved diagonal rolled -40 degrees runs down from the top chord onto the (10,5) anchor
+	endA, endB = memberEndpoints([7.54865789413, 7.05692005157, -5.0], [0.0, 0.0, -40.0], 6.4)
+	assert numpy.allclose(endB, [10.0, 5.0, -5.0], atol=0.01), endB
+	assert numpy.allclose(endA, [5.097, 9.114, -5.0], atol=0.01), endA
+	#--A roll of +90 points local x straight up
+	assert numpy.allclose(eulerToDirection([0.0, 0.0, 90.0]), [0.0, 1.0, 0.0])
+	print('save | members | dangling ends')
+	for path in sorted(glob.glob('data/saves/*')):
+		records = bridgeio.load(path)
+		endA, endB = memberEndpoints(records['pos'], records['euler'], records['length'])
+		print('{} | {} | {}'.format(path, len(records), danglingEnds(endA, endB)))
@@ -0,0 +1,97 @@
+﻿"""
+Incremental highlight candidate sets
+
+The builder used to hand the highlighter a freshly concatenated list of every
+member and joint on each mode change, orientation change and release. This
+manager keeps persistent named candidate sets (one per orientation) and only
+tells the highlighter about items whose candidacy actually changed. Changes
+and clear requests are batched until flush(), which the builder runs once per
+frame, so several clear() calls in one frame reach the highlighter once.
+
+The highlighter only needs addItems, removeItems and clear, so the module has
+no Vizard dependency.
+"""
+
+
+class HighlightSets(object):
+	"""Named highlight candidate sets applied to a highlighter as diffs"""
+	def __init__(self, tool):
+		self._tool = tool
+		self._sets = {}
+		self._activeSets = set()
+		self._registered = set()
+		self._pendingAdd = set()
+		self._pendingRemove = set()
+		self._clearPending = False
+		self._applied = 0
+		self._clears = 0
+
+	def add(self, name, item):
+		"""Add an item to a named set, making it a candidate if the set is active"""
+		self._sets.setdefault(name, set()).add(item)
+		if name in self._activeSets:
+			self._pendingRemove.discard(item)
+			self._pendingAdd.add(item)
+
+	def remove(self, name, item):
+		"""Remove an item from a named set, dropping its candidacy unless another active set holds it"""
+		self._sets.get(name, set()).discard(item)
+		if not any(item in self._sets[active] for active in self._activeSets if active in self._sets):
+			self._pendingAdd.discard(item)
+			self._pendingRemove.add(item)
+
+	def activate(self, names):
+		"""Make exactly the named sets active; only items whose candidacy changes are queued"""
+		names = set(names)
+		if names == self._activeSets:
+			return
+		wanted = set()
+		for name in names - self._activeSets:
+			wanted.update(self._sets.get(name, ()))
+		dropped = set()
+		for name in self._activeSets - names:
+			dropped.update(self._sets.get(name, ()))
+		kept = set()
+		for name in names & self._activeSets:
+			kept.update(self._sets.get(name, ()))
+		dropped -= wanted | kept
+		self._activeSets = names
+		self._pendingAdd.difference_update(dropped)
+		self._pendingAdd.update(wanted - kept)
+		self._pendingRemove.difference_update(wanted)
+		self._pendingRemove.update(dropped)
+
+	def getActiveSets(self):
+		return set(self._activeSets)
+
+	def isCandidate(self, item):
+		return any(item in self._sets[name] for name in self._activeSets if name in self._sets)
+
+	def clear(self):
+		"""Request that the current highlight be cleared at the next flush"""
+		self._clearPending = True
+
+	def flush(self):
+		"""Apply queued clears and candidate changes to the highlighter"""
+		if self._clearPending:
+			self._clearPending = False
+			self._clears += 1
+			self._tool.clear()
+		if self._pendingRemove:
+			removed = self._registered.intersection(self._pendingRemove)
+			self._pendingRemove.clear()
+			if removed:
+				self._registered.difference_update(removed)
+				self._tool.removeItems(list(removed))
+				self._applied += len(removed)
+		if self._pendingAdd:
+			added = self._pendingAdd.difference(self._registered)
+			self._pendingAdd.clear()
+			if added:
+				self._registered.update(added)
+				self._tool.addItems(list(added))
+				self._applied += len(added)
+
+	def getStats(self):
+		"""Items added or removed on the highlighter and clears forwarded to it so far"""
+		return {'applied' : self._applied, 'clears' : self._clears}
@@ -0,0 +1,98 @@
+﻿"""
+Vizard adapter for instancing.InstanceBuffer
+
+Draws every live buffer row from one merged on-the-fly triangle layer, so a
+whole level costs one node and one draw call however many instances exist.
+Each row owns a fixed block of vertices holding the shared mesh placed by the
+row's matrix. sync() rewrites only the blocks of rows the buffer marked dirty
+and collapses blocks left over from removed rows to a point. When the rows
+outgrow the layer it is rebuilt at twice the capacity.
+
+Colours are written per vertex; alpha applies to the whole layer.
+"""
+import viz
+import instancing
+
+
+class InstancedRenderer(object):
+	"""Merged-mesh renderer for one InstanceBuffer"""
+	def __init__(self, mesh, parent=None, capacity=instancing.DEFAULT_CAPACITY):
+		self._root = viz.addGroup()
+		if parent is not None:
+			self._root.setParent(parent)
+		self._vertices, self._normals = mesh
+		self._buffer = instancing.InstanceBuffer(capacity)
+		self._layer = None
+		self._capacity = 0
+		self._shown = 0
+		self._alpha = 1.0
+		self._build(max(capacity,1))
+
+	def getBuffer(self):
+		return self._buffer
+
+	def getGroup(self):
+		return self._root
+
+	def visible(self, state=viz.ON):
+		self._root.visible(state)
+
+	def alpha(self, value):
+		"""Set the alpha of every instance"""
+		self._alpha = value
+		self._layer.alpha(value)
+
+	def sync(self):
+		"""Push dirty rows into their vertex blocks"""
+		data = self._buffer.getData()
+		count = len(data)
+		if count > self._capacity:
+			capacity = self._capacity
+			while capacity < count:
+				capacity *= 2
+			self._build(capacity)
+			self._buffer.takeDirty()
+			rows = list(range(count))
+		else:
+			rows = self._buffer.takeDirty()
+		if rows:
+			size = len(self._vertices)
+			placed, turned = self._buffer.placeMesh(self._vertices, self._normals, rows)
+			colors = data['color'][rows,:3].tolist()
+			for row, vertices, normals, color in zip(rows, placed.tolist(), turned.tolist(), colors):
+				start = row * size
+				for index, (vertex, normal) in enumerate(zip(vertices, normals), start):
+					self._layer.setVertex(index, vertex)
+					self._layer.setNormal(index, normal)
+					self._layer.setVertexColor(index, color)
+		for row in range(count, self._shown):
+			self._collapse(row)
+		self._shown = count
+
+	def clear(self):
+		self._buffer.clear()
+		self.sync()
+
+	def remove(self):
+		self._layer.remove()
+		self._layer = None
+		self._root.remove()
+
+	def _collapse(self, row):
+		size = len(self._vertices)
+		for index in range(row * size, (row + 1) * size):
+			self._layer.setVertex(index, [0.0, 0.0, 0.0])
+
+	def _build(self, capacity):
+		"""Replace the layer with one of capacity collapsed vertex blocks"""
+		if self._layer is not None:
+			self._layer.remove()
+		viz.startLayer(viz.TRIANGLES)
+		for i in range(capacity * len(self._vertices)):
+			viz.vertex(0.0, 0.0, 0.0)
+		self._layer = viz.endLayer()
+		self._layer.setParent(self._root)
+		self._layer.dynamic()
+		self._layer.alpha(self._alpha)
+		self._capacity = capacity
+		self._shown = 0
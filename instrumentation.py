@@ -0,0 +1,196 @@
+﻿"""
+Per-callback timing histograms
+
+Timers, event callbacks and viztask steps can be wrapped so every call's
+duration lands in a fixed-size histogram for that callback. Each histogram
+has log-spaced buckets from a microsecond to a second, so recording costs the
+same after ten calls as after ten million. p50/p95/p99 are read back per
+callback for the profiler overlay and dumped to JSON and CSV on exit.
+
+Wrapped callables check the module-level ENABLED flag first and call straight
+through when it is off, so disabled instrumentation costs one branch.
+"""
+import bisect
+import csv
+import json
+import os
+import sys
+import time
+
+ENABLED = False
+
+BUCKETS_PER_DECADE = 10
+MIN_SECONDS = 1e-6
+DECADES = 6						# Buckets span MIN_SECONDS to a second; slower calls share one overflow bucket
+EDGES = [MIN_SECONDS * 10.0 ** (index / float(BUCKETS_PER_DECADE)) for index in range(DECADES * BUCKETS_PER_DECADE + 1)]
+FIELDS = ('name', 'calls', 'totalMs', 'meanMs', 'p50Ms', 'p95Ms', 'p99Ms', 'maxMs')
+
+if hasattr(time, 'perf_counter'):
+	clock = time.perf_counter
+elif sys.platform == 'win32':
+	clock = time.clock
+else:
+	clock = time.time
+
+_histograms = {}
+
+
+class Histogram(object):
+	"""Fixed-size log-bucketed duration histogram"""
+	def __init__(self, name):
+		self.name = name
+		self.counts = [0] * (len(EDGES) + 1)
+		self.calls = 0
+		self.total = 0.0
+		self.peak = 0.0
+
+	def add(self, seconds):
+		self.counts[bisect.bisect_left(EDGES, seconds)] += 1
+		self.calls += 1
+		self.total += seconds
+		if seconds > self.peak:
+			self.peak = seconds
+
+	def percentile(self, fraction):
+		"""Upper edge of the bucket holding the given fraction of calls, in seconds"""
+		if not self.calls:
+			return 0.0
+		target = fraction * self.calls
+		running = 0
+		for index, count in enumerate(self.counts):
+			running += count
+			if running >= target and count:
+				break
+		if index < len(EDGES):
+			return min(EDGES[index], self.peak)
+		return self.peak
+
+	def getSummary(self):
+		return { 'name'		: self.name
+				,'calls'	: self.calls
+				,'totalMs'	: self.total * 1000.0
+				,'meanMs'	: self.total * 1000.0 / max(self.calls, 1)
+				,'p50Ms'	: self.percentile(0.5) * 1000.0
+				,'p95Ms'	: self.percentile(0.95) * 1000.0
+				,'p99Ms'	: self.percentile(0.99) * 1000.0
+				,'maxMs'	: self.peak * 1000.0 }
+
+
+def setEnabled(state):
+	global ENABLED
+	ENABLED = bool(state)
+
+
+def isEnabled():
+	return ENABLED
+
+
+def getHistogram(name):
+	"""Return the histogram for a name, creating it on first use"""
+	histogram = _histograms.get(name)
+	if histogram is None:
+		histogram = _histograms[name] = Histogram(name)
+	return histogram
+
+
+def record(name, seconds):
+	getHistogram(name).add(seconds)
+
+
+def callableName(func):
+	"""Readable name for a function or bound method"""
+	owner = getattr(func, '__self__', None)
+	name = getattr(func, '__name__', None) or type(func).__name__
+	if owner is not None and not isinstance(owner, type(sys)):
+		return type(owner).__name__ + '.' + name
+	return name
+
+
+def wrap(func, name=None):
+	"""Return func wrapped so each call is recorded while ENABLED"""
+	histogram = getHistogram(name or callableName(func))
+	def timed(*args, **kwargs):
+		if not ENABLED:
+			return func(*args, **kwargs)
+		start = clock()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			histogram.add(clock() - start)
+	timed.__name__ = getattr(func, '__name__', 'timed')
+	timed.__doc__ = getattr(func, '__doc__', None)
+	return timed
+
+
+def timed(func):
+	"""Decorator form of wrap"""
+	return wrap(func)
+
+
+def wrapTask(task, name=None):
+	"""Drive a viztask generator, recording the time of each resumed step while ENABLED"""
+	histogram = getHistogram(name or 'task.' + getattr(task, '__name__', type(task).__name__))
+	value = None
+	while True:
+		if not ENABLED:
+			try:
+				condition = task.send(value)
+			except StopIteration:
+				return
+		else:
+			start = clock()
+			try:
+				condition = task.send(value)
+			except StopIteration:
+				return
+			finally:
+				histogram.add(clock() - start)
+		value = yield condition
+
+
+def getSummary(sortBy='totalMs'):
+	"""Return one summary dict per callback that has been called, largest sortBy first"""
+	rows = [histogram.getSummary() for histogram in _histograms.values() if histogram.calls]
+	rows.sort(key=lambda row: row[sortBy], reverse=True)
+	return rows
+
+
+def formatSummary(limit=12, sortBy='p99Ms'):
+	"""Text table of the slowest callbacks for the profiler overlay"""
+	lines = ['{:<28} {:>7} {:>7} {:>7} {:>7}'.format('callback', 'calls', 'p50', 'p95', 'p99')]
+	for row in getSummary(sortBy)[:limit]:
+		lines.append('{:<28} {:>7d} {:>7.2f} {:>7.2f} {:>7.2f}'.format(row['name'][:28], row['calls'], row['p50Ms'], row['p95Ms'], row['p99Ms']))
+	return '\n'.join(lines)
+
+
+def dump(basePath):
+	"""Write the summary to basePath.json and basePath.csv, returning the row count"""
+	rows = getSummary()
+	directory = os.path.dirname(basePath)
+	if directory and not os.path.isdir(directory):
+		os.makedirs(directory)
+	with open(basePath + '.json', 'w') as f:
+		json.dump({'buckets' : EDGES, 'callbacks' : rows, 'histograms' : dict((row['name'], _histograms[row['name']].counts) for row in rows)}, f, indent=1)
+	with open(basePath + '.csv', 'w') as f:
+		writer = csv.DictWriter(f, FIELDS, lineterminator='\n')
+		writer.writeheader()
+		writer.writerows(rows)
+	return len(rows)
+
+
+def reset():
+	"""Forget every recorded call"""
+	_histograms.clear()
+
+
+if __name__ == '__main__':
+	import timeit
+	work = lambda: None
+	wrapped = wrap(work, 'benchmark')
+	bare = min(timeit.repeat(work, number=100000, repeat=3)) / 100000
+	setEnabled(False)
+	disabled = min(timeit.repeat(wrapped, number=100000, repeat=3)) / 100000
+	setEnabled(True)
+	enabled = min(timeit.repeat(wrapped, number=100000, repeat=3)) / 100000
+	print('bare call (us) | disabled wrapper (us) | enabled wrapper (us)')
+	print('{:14.3f} | {:21.3f} | {:20.3f}'.format(bare * 1e6, disabled * 1e6, enabled * 1e6))
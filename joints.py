@@ -0,0 +1,123 @@
+﻿"""
+Joint registry
+
+Member ends that meet at the same place share one joint instead of each
+drawing its own connector sphere and registering its own sensor. Positions are
+quantized to the snap tolerance so a lookup only checks the 27 cells around an
+end. Every joint is reference counted by the member ends attached to it and is
+destroyed when the last one detaches.
+
+Joint objects themselves are built and torn down by the create/destroy
+callbacks, so the registry has no Vizard dependency.
+"""
+import itertools
+import math
+
+SNAP_TOLERANCE = 0.05
+NEIGHBOURS = list(itertools.product((-1,0,1),repeat=3))
+
+
+class JointRegistry(object):
+	"""Reference-counted joints keyed by (group, quantized position)"""
+	def __init__(self, create, destroy=None, tolerance=SNAP_TOLERANCE):
+		self._create = create
+		self._destroy = destroy
+		self._tolerance = float(tolerance)
+		self._cells = {}
+		self._joints = {}
+		self._owners = {}
+
+	def quantize(self, pos):
+		return tuple(int(math.floor(v / self._tolerance + 0.5)) for v in pos)
+
+	def find(self, pos, group=None):
+		"""Return the nearest joint within tolerance of pos, or None"""
+		cell = self.quantize(pos)
+		nearest = None
+		best = self._tolerance * self._tolerance
+		for offset in NEIGHBOURS:
+			key = (group, (cell[0] + offset[0], cell[1] + offset[1], cell[2] + offset[2]))
+			for joint in self._cells.get(key, ()):
+				jointPos = self._joints[joint]['pos']
+				distance = sum((a - b) * (a - b) for a, b in zip(pos, jointPos))
+				if distance <= best:
+					nearest = joint
+					best = distance
+		return nearest
+
+	def attach(self, owner, pos, group=None):
+		"""Attach an owner (a member end) to the joint at pos, creating it if needed"""
+		if owner in self._owners:
+			self.detach(owner)
+		joint = self.find(pos, group)
+		if joint is None:
+			pos = tuple(float(v) for v in pos)
+			joint = self._create(pos, group)
+			key = (group, self.quantize(pos))
+			self._cells.setdefault(key, []).append(joint)
+			self._joints[joint] = {'key' : key, 'pos' : pos, 'group' : group, 'owners' : []}
+		self._joints[joint]['owners'].append(owner)
+		self._owners[owner] = joint
+		return joint
+
+	def detach(self, owner):
+		"""Detach an owner, destroying its joint when no owners remain; returns that joint or None"""
+		joint = self._owners.pop(owner, None)
+		if joint is None:
+			return None
+		entry = self._joints[joint]
+		entry['owners'].remove(owner)
+		if entry['owners']:
+			return None
+		self._forget(joint)
+		if self._destroy is not None:
+			self._destroy(joint)
+		return joint
+
+	def clear(self):
+		"""Destroy every joint"""
+		joints = list(self._joints)
+		self._cells = {}
+		self._joints = {}
+		self._owners = {}
+		if self._destroy is not None:
+			for joint in joints:
+				self._destroy(joint)
+
+	def getJoint(self, owner):
+		return self._owners.get(owner)
+
+	def getOwners(self, joint):
+		"""Return a joint's owners, most recently attached last"""
+		return list(self._joints[joint]['owners'])
+
+	def getRefCount(self, joint):
+		entry = self._joints.get(joint)
+		if entry is None:
+			return 0
+		return len(entry['owners'])
+
+	def getPosition(self, joint):
+		return self._joints[joint]['pos']
+
+	def getGroup(self, joint):
+		return self._joints[joint]['group']
+
+	def getJoints(self, group=None):
+		"""Return all joints, or only those in one group"""
+		if group is None:
+			return list(self._joints)
+		return [joint for joint, entry in self._joints.items() if entry['group'] == group]
+
+	def getJointCount(self):
+		return len(self._joints)
+
+	def getOwnerCount(self):
+		return len(self._owners)
+
+	def _forget(self, joint):
+		key = self._joints.pop(joint)['key']
+		cell = self._cells[key]
+		cell.remove(joint)
+		if not cell:
+			del self._cells[key]
@@ -0,0 +1,124 @@
+﻿"""
+Joint query service
+
+A static KD-tree over every member end of the bridge model, for queries that
+look at the whole bridge at once: k nearest joints, all joints within a
+radius, and all pairs of ends closer than a tolerance (duplicate detection).
+The tree is rebuilt lazily, on the first query after the model's version
+changed, and every query takes an array of points so a tool can test
+thousands of candidates in one call.
+
+Points are in the model's Side orientation coordinates. Row i of the tree is
+end i % 2 of member i // 2 in id order, see getLabels().
+"""
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+installIfNeeded("scipy")
+
+import numpy
+from scipy.spatial import cKDTree
+
+
+def memberEnds(model):
+	"""Return (points, labels) for every member end; labels hold (member id, end index) rows"""
+	slots = model.active()
+	endA, endB = model.endpoints(slots)
+	points = numpy.empty((len(slots) * 2, 3))
+	points[0::2] = endA
+	points[1::2] = endB
+	labels = numpy.empty((len(slots) * 2, 2), dtype=numpy.int64)
+	labels[:,0] = numpy.repeat(model.id[slots], 2)
+	labels[:,1] = numpy.tile([0,1], len(slots))
+	return points, labels
+
+
+class JointTree(object):
+	"""Lazily rebuilt cKDTree over a bridge model's member ends"""
+	def __init__(self, model):
+		self._model = model
+		self._version = None
+		self._tree = None
+		self._points = numpy.zeros((0,3))
+		self._labels = numpy.zeros((0,2), dtype=numpy.int64)
+		self._builds = 0
+
+	def getPoints(self):
+		self._update()
+		return self._points
+
+	def getLabels(self):
+		self._update()
+		return self._labels
+
+	def getBuildCount(self):
+		return self._builds
+
+	def nearest(self, points, k=1, maxDistance=numpy.inf):
+		"""Return (distances, rows) of the k nearest ends to each point; missing neighbours get row == len(getPoints())"""
+		self._update()
+		points = numpy.asarray(points, dtype=float).reshape(-1,3)
+		if self._tree is None:
+			shape = (len(points),) if k == 1 else (len(points),k)
+			return numpy.full(shape, numpy.inf), numpy.zeros(shape, dtype=int)
+		return self._tree.query(points, k=k, distance_upper_bound=maxDistance)
+
+	def withinRadius(self, points, radius):
+		"""Return one array of end rows per point, holding every end within radius of it"""
+		self._update()
+		points = numpy.asarray(points, dtype=float).reshape(-1,3)
+		if self._tree is None:
+			return [numpy.zeros(0, dtype=int) for point in points]
+		return [numpy.asarray(rows, dtype=int) for rows in self._tree.query_ball_point(points, radius)]
+
+	def countWithin(self, points, radius):
+		"""Return how many ends lie within radius of each point"""
+		self._update()
+		points = numpy.asarray(points, dtype=float).reshape(-1,3)
+		if self._tree is None:
+			return numpy.zeros(len(points), dtype=int)
+		return numpy.array([len(rows) for rows in self._tree.query_ball_point(points, radius)], dtype=int)
+
+	def closePairs(self, tolerance):
+		"""Return an (M,2) array of end rows closer than tolerance to each other"""
+		self._update()
+		if self._tree is None:
+			return numpy.zeros((0,2), dtype=int)
+		return self._tree.query_pairs(tolerance, output_type='ndarray')
+
+	def duplicateMembers(self, tolerance):
+		"""Return (M,2) member id pairs lying on top of each other, i.e. both ends coincide"""
+		pairs = self.closePairs(tolerance)
+		members = pairs // 2
+		members = members[members[:,0] != members[:,1]]
+		members.sort(axis=1)
+		unique, counts = numpy.unique(members, axis=0, return_counts=True)
+		ids = self._labels[0::2,0]
+		return ids[unique[counts >= 2]].reshape(-1,2)
+
+	def _update(self):
+		version = self._model.getVersion()
+		if version == self._version:
+			return
+		self._points, self._labels = memberEnds(self._model)
+		self._tree = cKDTree(self._points) if len(self._points) else None
+		self._version = version
+		self._builds += 1
+
+
+if __name__ == '__main__':
+	import timeit
+	import bridgemodel
+	print('members | build (ms) | 10k candidate snaps (ms) | close pairs (ms)')
+	for count in (1000,10000,100000):
+		model = bridgemodel.BridgeModel(count)
+		grid = numpy.random.randint(0,200,(count,3)) * [0.5,0.5,0.5]
+		for memberId in range(count):
+			model.set(memberId, (508.0, 16.0, 1.0, 1, grid[memberId].tolist(), [0.0,0.0,0.0], 1))
+		tree = JointTree(model)
+		tree.getPoints()
+		build = min(timeit.repeat(lambda: JointTree(model).getPoints(), number=1, repeat=3))
+		candidates = numpy.random.uniform(0,100,(10000,3))
+		snaps = min(timeit.repeat(lambda: tree.nearest(candidates, maxDistance=0.3), number=1, repeat=3))
+		pairs = min(timeit.repeat(lambda: tree.closePairs(0.05), number=1, repeat=3))
+		print('{:7d} | {:10.2f} | {:24.2f} | {:16.2f}'.format(count, build * 1000.0, snaps * 1000.0, pairs * 1000.0))
@@ -0,0 +1,222 @@
+﻿"""
+Append-only edit journal with background snapshot compaction
+
+Every committed edit is appended as one fixed-size record, so autosaving costs
+the same for a one-member bridge as for a ten-thousand-member bridge. After
+COMPACT_EVERY records the journal is rolled over and the current bridge state
+is written out as a snapshot on a background thread. Recovery replays the
+snapshot followed by any journal segments still on disk.
+
+Records hold absolute member state, so replaying a segment twice is harmless.
+
+After a crash the files on disk are held untouched until the caller decides
+between recover() and discarding, which both end in reset(). Edits made in
+the meantime only update the in-memory state, so nothing rolls the crashed
+segments over before they are replayed.
+
+[ Files ]
+[ <name>.snapshot ]---------Compacted bridge state (CREATE records only)
+[ <name>.journal.prev ]-----Segment being compacted
+[ <name>.journal ]----------Live segment
+[ <name>.lock ]-------------Present while a session is running
+"""
+import collections
+import os
+import struct
+import threading
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+
+# Operation codes
+CREATE = 1
+MOVE = 2
+ROTATE = 3
+DELETE = 4
+CLEAR = 5
+
+MAGIC = b'TBBJNL'
+VERSION = 1
+HEADER = struct.Struct('<6sH')
+RECORD = struct.Struct('<BBHIdddi3d3d')
+RECORD_DTYPE = numpy.dtype([
+	 ('op',				'<u1')
+	,('orientation',	'<u1')
+	,('pad',			'<u2')
+	,('id',				'<u4')
+	,('diameter',		'<f8')
+	,('thickness',		'<f8')
+	,('length',			'<f8')
+	,('quantity',		'<i4')
+	,('pos',			'<f8', (3,))
+	,('euler',			'<f8', (3,))
+])
+
+COMPACT_EVERY = 512			# Journal records per segment before compacting
+EMPTY_MEMBER = (0.0, 0.0, 0.0, 0, (0.0,0.0,0.0), (0.0,0.0,0.0), 0)
+
+
+def packRecord(op, memberId, member=None):
+	"""Pack one journal record from a (diameter,thickness,length,quantity,pos,euler,orientation) tuple"""
+	diameter, thickness, length, quantity, pos, euler, orientation = member or EMPTY_MEMBER
+	return RECORD.pack(op, orientation, 0, memberId, diameter, thickness, length, quantity,
+						pos[0], pos[1], pos[2], euler[0], euler[1], euler[2])
+
+
+def readRecords(path):
+	"""Decode every complete record in a journal file, ignoring a torn tail"""
+	if not os.path.exists(path):
+		return numpy.zeros(0, dtype=RECORD_DTYPE)
+	with open(path,'rb') as f:
+		data = f.read()
+	if len(data) < HEADER.size or HEADER.unpack(data[:HEADER.size])[0] != MAGIC:
+		return numpy.zeros(0, dtype=RECORD_DTYPE)
+	count = (len(data) - HEADER.size) // RECORD_DTYPE.itemsize
+	return numpy.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+
+def replay(records, members=None):
+	"""Apply journal records to an ordered id -> member mapping"""
+	if members is None:
+		members = collections.OrderedDict()
+	ops = records['op'].tolist()
+	ids = records['id'].tolist()
+	rows = zip(records['diameter'].tolist(), records['thickness'].tolist(), records['length'].tolist(),
+				records['quantity'].tolist(), records['pos'].tolist(), records['euler'].tolist(),
+				records['orientation'].tolist())
+	for op, memberId, member in zip(ops, ids, rows):
+		if op == CREATE or op == MOVE or op == ROTATE:
+			members[memberId] = member
+		elif op == DELETE:
+			members.pop(memberId, None)
+		elif op == CLEAR:
+			members.clear()
+	return members
+
+
+def replaceFile(src, dst):
+	"""Move src over dst, tolerating platforms where rename cannot overwrite"""
+	try:
+		os.rename(src, dst)
+	except OSError:
+		if not os.path.exists(dst):
+			raise
+		os.remove(dst)
+		os.rename(src, dst)
+
+
+class Journal(object):
+	"""Crash-safe autosave built from a live journal segment and a compacted snapshot"""
+	def __init__(self, directory='./data/autosave', name='session', compactEvery=COMPACT_EVERY):
+		self._directory = directory
+		self._path = os.path.join(directory, name + '.journal')
+		self._prevPath = self._path + '.prev'
+		self._snapshotPath = os.path.join(directory, name + '.snapshot')
+		self._tmpPath = self._snapshotPath + '.tmp'
+		self._lockPath = os.path.join(directory, name + '.lock')
+		self._compactEvery = compactEvery
+		self._members = collections.OrderedDict()
+		self._file = None
+		self._count = 0
+		self._thread = None
+		self._held = False
+
+	def begin(self):
+		"""Start a session, returning True if the previous one did not shut down cleanly"""
+		if not os.path.isdir(self._directory):
+			os.makedirs(self._directory)
+		crashed = os.path.exists(self._lockPath)
+		open(self._lockPath,'wb').close()
+		#--Keep the crashed segments on disk until recover or discard ends in reset()
+		self._held = crashed
+		return crashed
+
+	def recover(self):
+		"""Replay snapshot and journal segments into a list of (id,member) pairs"""
+		snapshotPath = self._snapshotPath
+		if not os.path.exists(snapshotPath) and os.path.exists(self._tmpPath):
+			snapshotPath = self._tmpPath
+		members = replay(readRecords(snapshotPath))
+		replay(readRecords(self._prevPath), members)
+		replay(readRecords(self._path), members)
+		return list(members.items())
+
+	def reset(self, members=()):
+		"""Discard history and start over from the given (id,member) pairs"""
+		self._held = False
+		self._members = collections.OrderedDict(members)
+		if self._file is None:
+			self._roll(keep=True)
+		records = [packRecord(CLEAR, 0)]
+		records.extend(packRecord(CREATE, memberId, member) for memberId, member in self._members.items())
+		self._file.write(b''.join(records))
+		self._file.flush()
+		self._count += len(records)
+		self.compact()
+
+	def append(self, op, memberId, member=None):
+		"""Record one edit; cost is independent of bridge size"""
+		if op == DELETE:
+			self._members.pop(memberId, None)
+		elif op == CLEAR:
+			self._members.clear()
+		else:
+			self._members[memberId] = member
+		if self._held:
+			return
+		if self._file is None:
+			self._roll(keep=True)
+		self._file.write(packRecord(op, memberId, member))
+		self._file.flush()
+		self._count += 1
+		if self._count >= self._compactEvery:
+			self.compact()
+
+	def compact(self):
+		"""Roll the live segment and write a snapshot on a background thread"""
+		if self._held or (self._thread is not None and self._thread.is_alive()):
+			return
+		self._roll(keep=True)
+		self._thread = threading.Thread(target=self._writeSnapshot, args=(list(self._members.items()),))
+		self._thread.daemon = True
+		self._thread.start()
+
+	def close(self):
+		"""Finish pending compaction and mark the session as cleanly closed, unless a crash is still unanswered"""
+		self._join()
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+		if not self._held and os.path.exists(self._lockPath):
+			os.remove(self._lockPath)
+
+	def getMemberCount(self):
+		return len(self._members)
+
+	def _join(self):
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def _roll(self, keep):
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+		if keep and os.path.exists(self._path):
+			replaceFile(self._path, self._prevPath)
+		self._file = open(self._path,'wb')
+		self._file.write(HEADER.pack(MAGIC,VERSION))
+		self._file.flush()
+		self._count = 0
+
+	def _writeSnapshot(self, members):
+		with open(self._tmpPath,'wb') as f:
+			f.write(HEADER.pack(MAGIC,VERSION))
+			f.write(b''.join(packRecord(CREATE, memberId, member) for memberId, member in members))
+			f.flush()
+			os.fsync(f.fileno())
+		replaceFile(self._tmpPath, self._snapshotPath)
+		if os.path.exists(self._prevPath):
+			os.remove(self._prevPath)
@@ -0,0 +1,304 @@
+﻿"""
+Load cases and combinations over one factorization
+
+A LoadCases set analyzes one bridge under several nodal load cases at once:
+self-weight, deck surfacing, pedestrian crowd and a vehicle at several
+positions along the span. The stiffness matrix is factorized once and every
+case is solved as one column of a multi-column right-hand side.
+
+Results are kept as stacked per-case arrays (case, node, axis) and
+(case, bar). Because the analysis is linear, a combination is a factored sum
+of cases, so a whole set of combinations is one matrix product with a
+(combination, case) factor matrix. Envelopes reduce over that leading axis.
+
+Deck loads go to the deck nodes, i.e. nodes reached by Bottom members, or the
+lowest Side nodes when there are none. Each station along x takes its
+tributary length of the deck and shares it equally across the width.
+"""
+import collections
+import sys
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+import analysis
+
+SELF_WEIGHT = 'Self-weight'
+DECK = 'Deck'
+PEDESTRIAN = 'Pedestrian'
+VEHICLE = 'Vehicle'
+
+DECK_LOAD = 2.5e3				# Surfacing and deck plate, Pa
+PEDESTRIAN_LOAD = 5e3			# Crowd loading, Pa
+VEHICLE_WEIGHT = 300e3			# One vehicle, N
+VEHICLE_POSITIONS = 5			# Vehicle positions spread evenly across the span
+DECK_WIDTH = 10.0				# Deck width in m when the deck nodes do not span one, i.e. the truss spacing
+STATION_TOLERANCE = 0.05		# Deck nodes closer than this along x share one station
+
+# Partial factors for the standard combinations
+PERMANENT_FACTOR = 1.35
+VARIABLE_FACTOR = 1.5
+TRAFFIC_FACTOR = 1.35
+
+
+def deckNodes(structure):
+	"""Return the nodes the deck rests on"""
+	bottom = structure.valid & (structure.orientation == analysis.BOTTOM)
+	if bottom.any():
+		return numpy.unique(structure.members[bottom])
+	side = numpy.unique(structure.members[structure.valid & (structure.orientation == analysis.SIDE)])
+	if not len(side):
+		return side
+	height = structure.nodes[side,1]
+	return side[height <= height.min() + STATION_TOLERANCE]
+
+
+def deckStations(structure, nodes):
+	"""Return (x,station) with the sorted station positions along x and every node's station"""
+	keys = numpy.round(structure.nodes[nodes,0] / STATION_TOLERANCE).astype(int)
+	unique, station = numpy.unique(keys, return_inverse=True)
+	x = numpy.bincount(station, structure.nodes[nodes,0]) / numpy.bincount(station)
+	return x, station
+
+
+def deckLoads(structure, pressure, nodes=None):
+	"""Return (N,3) nodal loads of a uniform deck pressure in Pa, lumped by tributary length"""
+	loads = numpy.zeros((structure.getNodeCount(),3))
+	nodes = deckNodes(structure) if nodes is None else nodes
+	if len(nodes) < 2:
+		return loads
+	x, station = deckStations(structure, nodes)
+	if len(x) < 2:
+		return loads
+	z = structure.nodes[nodes,2]
+	width = z.max() - z.min()
+	if width <= STATION_TOLERANCE:
+		width = DECK_WIDTH
+	gaps = numpy.diff(x)
+	tributary = (numpy.concatenate(([0.0], gaps)) + numpy.concatenate((gaps, [0.0]))) * 0.5
+	perNode = (pressure * width * tributary / numpy.bincount(station))[station]
+	loads[nodes,1] -= perNode
+	return loads
+
+
+def pointLoads(structure, position, weight, nodes=None):
+	"""Return (N,3) nodal loads of a weight at x, split between the deck stations either side"""
+	loads = numpy.zeros((structure.getNodeCount(),3))
+	nodes = deckNodes(structure) if nodes is None else nodes
+	if not len(nodes):
+		return loads
+	x, station = deckStations(structure, nodes)
+	share = numpy.ones(len(x))
+	if len(x) > 1:
+		position = min(max(position, x[0]), x[-1])
+		right = min(max(int(numpy.searchsorted(x, position)), 1), len(x) - 1)
+		fraction = (position - x[right - 1]) / (x[right] - x[right - 1])
+		share[:] = 0.0
+		share[right - 1] = 1.0 - fraction
+		share[right] = fraction
+	perNode = (weight * share / numpy.bincount(station))[station]
+	loads[nodes,1] -= perNode
+	return loads
+
+
+class LoadCases(object):
+	"""Named load cases on one bridge, solved together against one factorization"""
+	def __init__(self, records, **kwargs):
+		self.analysis = analysis.Analysis(records, **kwargs)
+		self._names = []
+		self._loads = []
+		self._combinations = collections.OrderedDict()
+
+	def getStructure(self):
+		return self.analysis.structure
+
+	def getNames(self):
+		return list(self._names)
+
+	def add(self, name, loads):
+		"""Add or replace a case from (N,3) nodal loads in N"""
+		loads = numpy.asarray(loads, dtype=float).reshape(-1,3)
+		if name in self._names:
+			self._loads[self._names.index(name)] = loads
+		else:
+			self._names.append(name)
+			self._loads.append(loads)
+
+	def getLoads(self, name):
+		"""Return the (N,3) nodal loads of one case"""
+		return self._loads[self._names.index(name)]
+
+	def addSelfWeight(self, name=SELF_WEIGHT):
+		self.add(name, self.analysis.structure.selfWeight())
+
+	def addDeck(self, name=DECK, pressure=DECK_LOAD):
+		self.add(name, deckLoads(self.analysis.structure, pressure))
+
+	def addVehicles(self, positions=None, weight=VEHICLE_WEIGHT, prefix=VEHICLE):
+		"""Add one case per vehicle position along x, defaulting to positions spread across the deck"""
+		structure = self.analysis.structure
+		if positions is None:
+			nodes = deckNodes(structure)
+			low, high = (structure.nodes[nodes,0].min(), structure.nodes[nodes,0].max()) if len(nodes) else (0.0, 0.0)
+			positions = numpy.linspace(low, high, VEHICLE_POSITIONS)
+		names = []
+		for position in positions:
+			names.append('{} @ {:.1f} m'.format(prefix, position))
+			self.add(names[-1], pointLoads(structure, position, weight))
+		return names
+
+	def addStandard(self):
+		"""Add self-weight, deck, pedestrian and vehicle cases with their standard combinations"""
+		self.addSelfWeight()
+		self.addDeck()
+		self.addDeck(PEDESTRIAN, PEDESTRIAN_LOAD)
+		vehicles = self.addVehicles()
+		permanent = {SELF_WEIGHT : 1.0, DECK : 1.0}
+		self.addCombination('SLS permanent', permanent)
+		self.addCombination('ULS pedestrian', {SELF_WEIGHT : PERMANENT_FACTOR, DECK : PERMANENT_FACTOR, PEDESTRIAN : VARIABLE_FACTOR})
+		for name in vehicles:
+			self.addCombination('ULS ' + name, {SELF_WEIGHT : PERMANENT_FACTOR, DECK : PERMANENT_FACTOR, name : TRAFFIC_FACTOR})
+
+	def addCombination(self, name, factors):
+		"""Define a combination as a {case : factor} mapping"""
+		self._combinations[name] = dict(factors)
+
+	def getCombinationNames(self):
+		return list(self._combinations)
+
+	def combinationMatrix(self, names=None):
+		"""Return the (K,C) factor matrix of the named combinations, all of them by default"""
+		names = list(self._combinations) if names is None else names
+		matrix = numpy.zeros((len(names), len(self._names)))
+		for row, name in enumerate(names):
+			for case, factor in self._combinations[name].items():
+				matrix[row, self._names.index(case)] = factor
+		return matrix
+
+	def solve(self):
+		"""Solve every case in one multi-column solve, returning CaseResults"""
+		loads = numpy.array(self._loads).reshape(len(self._loads), -1, 3)
+		displacements = self.analysis.solveLoads(loads)
+		return CaseResults(self, loads, displacements)
+
+
+class CaseResults(object):
+	"""Stacked per-case results with vectorized combinations and envelopes"""
+	def __init__(self, cases, loads, displacements):
+		self.cases = cases
+		self.names = cases.getNames()
+		self.stable = displacements is not None
+		structure = cases.getStructure()
+		solver = cases.analysis
+		count = len(self.names)
+		self.loads = loads
+		self.supported = solver.supported
+		if not self.stable:
+			self.displacements = numpy.full((count, structure.getNodeCount(), 3), numpy.nan)
+			self.axialForces = numpy.full((count, structure.getBarCount()), numpy.nan)
+			self.reactions = numpy.full((count, len(self.supported)), numpy.nan)
+			return
+		self.displacements = displacements
+		#--(C,M) axial forces, tension positive
+		delta = displacements[:,structure.members[:,1]] - displacements[:,structure.members[:,0]]
+		self.axialForces = (delta * structure.cosines).sum(axis=2) * structure.stiffness(solver.modulus)
+		#--(C,S) reactions at the supported DOFs only
+		forces = (self.axialForces * structure.valid)[:,:,None] * structure.cosines
+		values = numpy.concatenate((-forces, forces), axis=2).reshape(count, -1)
+		dofs = structure.dofs().ravel()
+		size = structure.getNodeCount() * 3
+		offsets = (numpy.arange(count) * size)[:,None]
+		internal = numpy.bincount((dofs[None,:] + offsets).ravel(), values.ravel(), count * size).reshape(count, size)
+		self.reactions = (internal - loads.reshape(count, -1))[:,self.supported]
+
+	def getCase(self, name):
+		"""Return the displacements, axial forces and reactions of one case"""
+		row = self.names.index(name)
+		return {'displacements' : self.displacements[row], 'axialForces' : self.axialForces[row], 'reactions' : self.reactions[row]}
+
+	def combine(self, factors):
+		"""Return displacements, axial forces and reactions for a (C,) factor vector or (K,C) factor matrix"""
+		factors = numpy.asarray(factors, dtype=float)
+		return { 'displacements'	: numpy.tensordot(factors, self.displacements, axes=1)
+				,'axialForces'		: factors.dot(self.axialForces)
+				,'reactions'		: factors.dot(self.reactions) }
+
+	def combinations(self, names=None):
+		"""Return (names,axialForces) of the named combinations, all of them by default"""
+		names = self.cases.getCombinationNames() if names is None else names
+		return names, self.combine(self.cases.combinationMatrix(names))['axialForces']
+
+	def envelope(self, forces=None):
+		"""Return per-bar max and min axial force and the row governing each, over cases or given (K,M) forces"""
+		forces = self.axialForces if forces is None else forces
+		if not len(forces):
+			empty = numpy.zeros(forces.shape[1:])
+			return {'max' : empty, 'min' : empty, 'maxRow' : empty.astype(int), 'minRow' : empty.astype(int)}
+		return { 'max'		: forces.max(axis=0)
+				,'min'		: forces.min(axis=0)
+				,'maxRow'	: forces.argmax(axis=0)
+				,'minRow'	: forces.argmin(axis=0) }
+
+	def memberEnvelope(self, forces=None):
+		"""Return (max,min) axial force per source record, folding mirrored bars into their member"""
+		envelope = self.envelope(forces)
+		rows = self.cases.getStructure().rows
+		count = rows.max() + 1 if len(rows) else 0
+		high = numpy.full(count, -numpy.inf)
+		low = numpy.full(count, numpy.inf)
+		numpy.maximum.at(high, rows, envelope['max'])
+		numpy.minimum.at(low, rows, envelope['min'])
+		return high, low
+
+
+def printReport(results):
+	structure = results.cases.getStructure()
+	print('nodes {}, bars {}, cases {}'.format(structure.getNodeCount(), structure.getBarCount(), len(results.names)))
+	if not results.stable:
+		print('UNSTABLE: the bridge is a mechanism or is not supported by both anchors')
+		return
+	print('{:28s} | load (kN) | reaction (kN) | max tension (kN) | max compression (kN)'.format('case'))
+	reactions = numpy.zeros((len(results.names), structure.getNodeCount() * 3))
+	reactions[:,results.supported] = results.reactions
+	for row, name in enumerate(results.names):
+		print('{:28s} | {:9.1f} | {:13.1f} | {:16.1f} | {:20.1f}'.format(name, -results.loads[row,:,1].sum() / 1000.0,
+				reactions[row,1::3].sum() / 1000.0, max(results.axialForces[row].max(), 0.0) / 1000.0,
+				max(-results.axialForces[row].min(), 0.0) / 1000.0))
+	names, forces = results.combinations()
+	envelope = results.envelope(forces)
+	print('')
+	print('{:28s} | governs tension | governs compression'.format('combination'))
+	for row, name in enumerate(names):
+		print('{:28s} | {:15d} | {:19d}'.format(name, int((envelope['maxRow'] == row).sum()), int((envelope['minRow'] == row).sum())))
+	print('envelope: max tension {:.1f} kN, max compression {:.1f} kN'.format(envelope['max'].max() / 1000.0, -envelope['min'].min() / 1000.0))
+
+
+if __name__ == '__main__':
+	import time
+	import bridgeio
+	if len(sys.argv) > 1:
+		for path in sys.argv[1:]:
+			print(path)
+			cases = LoadCases(bridgeio.load(path))
+			cases.addStandard()
+			printReport(cases.solve())
+	else:
+		print('members | cases | factorize (ms) | all cases (ms) | one analysis per case (ms) | envelope (ms)')
+		for panels in (50,250,1000):
+			records, supports = analysis.prattTruss(panels)
+			cases = LoadCases(records, supports=supports)
+			cases.addStandard()
+			cases.addVehicles(numpy.linspace(analysis.PIN[0], analysis.PIN[0] + panels * 2.0, 40))
+			start = time.time()
+			results = cases.solve()
+			together = time.time() - start
+			start = time.time()
+			for name in results.names:
+				analysis.Analysis(records, supports).solve(cases.getLoads(name))
+			separate = time.time() - start
+			start = time.time()
+			results.memberEnvelope(results.combinations()[1])
+			envelope = time.time() - start
+			print('{:7d} | {:5d} | {:14.2f} | {:14.2f} | {:26.2f} | {:13.2f}'.format(len(records), len(results.names),
+					cases.analysis.timings['factorize'] * 1000.0, together * 1000.0, separate * 1000.0, envelope * 1000.0))
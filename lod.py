@@ -0,0 +1,128 @@
+﻿"""
+Distance-based level of detail
+
+Picks a tube tessellation level for every member from its projected
+(screen-space) diameter and decides which connector spheres are close enough
+to draw. Each threshold is widened into a band by the hysteresis fraction:
+a row only changes level once it leaves the band around the threshold, which
+stops members popping back and forth at the boundary.
+
+Everything works on whole arrays, so one call handles the entire bridge and
+can be benchmarked without Vizard.
+"""
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import math
+import numpy
+
+LEVEL_PIXELS = (4.0, 16.0)		# Screen diameters separating low, medium and full detail
+NODE_HIDE_DISTANCE = 30.0		# Connector spheres further than this are hidden
+HYSTERESIS = 0.2				# Fraction each threshold is widened by before a row switches
+UPDATE_INTERVAL = 10			# Frames between selections
+
+
+def pixelScale(fovY, viewportHeight):
+	"""Pixels per unit of size at unit distance for a vertical field of view in degrees"""
+	return viewportHeight / (2.0 * math.tan(math.radians(fovY) * 0.5))
+
+
+def distances(points, eye):
+	points = numpy.asarray(points,dtype=float).reshape(-1,3)
+	return numpy.sqrt(((points - numpy.asarray(eye,dtype=float)) ** 2).sum(axis=1))
+
+
+def screenDiameter(centers, diameters, eye, scale):
+	"""Approximate projected diameter in pixels of members centred at centers"""
+	return numpy.asarray(diameters,dtype=float) * scale / numpy.maximum(distances(centers,eye),1e-6)
+
+
+def selectLevels(pixels, previous=None, thresholds=LEVEL_PIXELS, hysteresis=HYSTERESIS):
+	"""Return a level per row, 0 being the coarsest; rows with previous < 0 get no hysteresis"""
+	pixels = numpy.asarray(pixels,dtype=float)
+	thresholds = numpy.asarray(thresholds,dtype=float)
+	raw = numpy.searchsorted(thresholds,pixels)
+	if previous is None:
+		return raw
+	previous = numpy.asarray(previous)
+	up = numpy.searchsorted(thresholds * (1.0 + hysteresis),pixels)
+	down = numpy.searchsorted(thresholds * (1.0 - hysteresis),pixels)
+	levels = numpy.where(up > previous, up, numpy.where(down < previous, down, previous))
+	return numpy.where(previous < 0, raw, levels)
+
+
+def selectVisible(distance, previous=None, hideDistance=NODE_HIDE_DISTANCE, hysteresis=HYSTERESIS):
+	"""Return a visibility flag per row; previous holds 1, 0 or -1 for rows not yet selected"""
+	distance = numpy.asarray(distance,dtype=float)
+	raw = distance < hideDistance
+	if previous is None:
+		return raw
+	previous = numpy.asarray(previous)
+	near = distance < hideDistance * (1.0 - hysteresis)
+	far = distance > hideDistance * (1.0 + hysteresis)
+	visible = numpy.where(near, True, numpy.where(far, False, previous > 0))
+	return numpy.where(previous < 0, raw, visible)
+
+
+class Selector(object):
+	"""Remembers the last level and visibility of stable row indices between selections"""
+	def __init__(self, thresholds=LEVEL_PIXELS, hideDistance=NODE_HIDE_DISTANCE, hysteresis=HYSTERESIS, interval=UPDATE_INTERVAL):
+		self._thresholds = thresholds
+		self._hideDistance = hideDistance
+		self._hysteresis = hysteresis
+		self._interval = interval
+		self._levels = numpy.zeros(0, dtype=int)
+		self._visible = numpy.zeros(0, dtype=int)
+
+	def isDue(self, frame):
+		return frame % self._interval == 0
+
+	def levels(self, rows, pixels):
+		"""Return (levels,changed) for rows given their projected diameters"""
+		self._levels = self._grow(self._levels, rows)
+		previous = self._levels[rows]
+		levels = selectLevels(pixels, previous, self._thresholds, self._hysteresis)
+		self._levels[rows] = levels
+		return levels, levels != previous
+
+	def visible(self, rows, distance):
+		"""Return (visible,changed) for rows given their distance from the eye"""
+		self._visible = self._grow(self._visible, rows)
+		previous = self._visible[rows]
+		visible = selectVisible(distance, previous, self._hideDistance, self._hysteresis)
+		self._visible[rows] = visible
+		return visible, visible.astype(int) != previous
+
+	def getHidden(self):
+		"""Return the rows currently selected as hidden"""
+		return numpy.flatnonzero(self._visible == 0)
+
+	def reset(self):
+		"""Forget previous selections, e.g. when detail rendering is switched off"""
+		self._levels[:] = -1
+		self._visible[:] = -1
+
+	def _grow(self, column, rows):
+		size = int(numpy.max(rows)) + 1 if len(rows) else 0
+		if size <= len(column):
+			return column
+		grown = numpy.full(max(size, len(column) * 2), -1, dtype=int)
+		grown[:len(column)] = column
+		return grown
+
+
+if __name__ == '__main__':
+	import timeit
+	scale = pixelScale(60.0, 1080)
+	print('members | select levels (ms) | select spheres (ms)')
+	for count in (1000,10000,100000):
+		centers = numpy.random.uniform(-50,50,(count,3))
+		diameters = numpy.random.uniform(0.05,0.3,count)
+		rows = numpy.arange(count)
+		selector = Selector()
+		eye = [0.0,1.8,-40.0]
+		selector.levels(rows,screenDiameter(centers,diameters,eye,scale))
+		levels = min(timeit.repeat(lambda: selector.levels(rows,screenDiameter(centers,diameters,eye,scale)),number=1,repeat=5))
+		spheres = min(timeit.repeat(lambda: selector.visible(rows,distances(centers,eye)),number=1,repeat=5))
+		print('{:7d} | {:18.2f} | {:19.2f}'.format(count,levels * 1000.0,spheres * 1000.0))
@@ -0,0 +1,36 @@
+﻿"""
+Runtime counters
+
+Named counters the builder reports into so costs that used to be invisible
+(live links, sensor registrations, skipped work) can be printed, dumped or
+shown in the headset. Counters are plain module-level numbers; adding to one
+is a dictionary update.
+"""
+_values = {}
+
+
+def add(name, amount=1):
+	"""Add amount to a counter, creating it at zero"""
+	_values[name] = _values.get(name, 0) + amount
+
+
+def setValue(name, value):
+	_values[name] = value
+
+
+def get(name, default=0):
+	return _values.get(name, default)
+
+
+def snapshot():
+	"""Return a copy of every counter"""
+	return dict(_values)
+
+
+def reset(name=None):
+	"""Zero one counter, or all of them"""
+	if name is None:
+		for key in _values:
+			_values[key] = 0
+	elif name in _values:
+		_values[name] = 0
@@ -0,0 +1,88 @@
+﻿"""
+Motion gating and look-ahead for per-frame interaction
+
+MotionGate tells a per-frame callback whether its input ray moved enough to
+be worth re-evaluating, so an idle hand costs a comparison instead of a
+transform write and a snap query. VelocityPredictor keeps a smoothed velocity
+of a moving point so a snap candidate can be previewed where the member is
+heading rather than where it was.
+"""
+import math
+
+POSITION_EPSILON = 0.002		# Meters the ray origin must move before an update
+ANGLE_EPSILON = 0.1				# Degrees any ray euler component must turn before an update
+SMOOTHING = 0.5					# Weight of the newest velocity sample
+LOOKAHEAD = 0.1					# Seconds a prediction looks ahead
+
+
+def angleDelta(a, b):
+	"""Smallest difference between two angles in degrees"""
+	return abs((a - b + 180.0) % 360.0 - 180.0)
+
+
+class MotionGate(object):
+	"""Accepts an update only when the ray moved more than epsilon since the last accepted one"""
+	def __init__(self, positionEpsilon=POSITION_EPSILON, angleEpsilon=ANGLE_EPSILON):
+		self._positionEpsilon = positionEpsilon
+		self._angleEpsilon = angleEpsilon
+		self._origin = None
+		self._euler = None
+		self._accepted = 0
+		self._skipped = 0
+
+	def moved(self, origin, euler):
+		"""Return True and remember the ray if it moved, otherwise count a skipped frame"""
+		if self._origin is not None:
+			distance = math.sqrt(sum((a - b) * (a - b) for a, b in zip(origin, self._origin)))
+			turn = max(angleDelta(a, b) for a, b in zip(euler, self._euler))
+			if distance < self._positionEpsilon and turn < self._angleEpsilon:
+				self._skipped += 1
+				return False
+		self._origin = list(origin)
+		self._euler = list(euler)
+		self._accepted += 1
+		return True
+
+	def reset(self):
+		"""Forget the last ray so the next call is always accepted"""
+		self._origin = None
+		self._euler = None
+
+	def getAccepted(self):
+		return self._accepted
+
+	def getSkipped(self):
+		return self._skipped
+
+
+class VelocityPredictor(object):
+	"""Exponentially smoothed velocity of one point"""
+	def __init__(self, smoothing=SMOOTHING, lookahead=LOOKAHEAD):
+		self._smoothing = smoothing
+		self._lookahead = lookahead
+		self.reset()
+
+	def update(self, pos, time):
+		"""Add a sample taken at time (seconds) and return the smoothed velocity"""
+		if self._pos is not None and time > self._time:
+			sample = [(a - b) / (time - self._time) for a, b in zip(pos, self._pos)]
+			self._velocity = [self._smoothing * v + (1.0 - self._smoothing) * old for v, old in zip(sample, self._velocity)]
+		self._pos = list(pos)
+		self._time = time
+		return self._velocity
+
+	def predict(self, lookahead=None):
+		"""Return the point extrapolated lookahead seconds past the last sample"""
+		if self._pos is None:
+			return None
+		if lookahead is None:
+			lookahead = self._lookahead
+		return [p + v * lookahead for p, v in zip(self._pos, self._velocity)]
+
+	def getVelocity(self):
+		return list(self._velocity)
+
+	def reset(self):
+		self._pos = None
+		self._time = 0.0
+		self._velocity = [0.0, 0.0, 0.0]
@@ -15,6 +15,7 @@ import vizfx
 import oculus
 import mathlite
 import cursor
+import scheduler
 
 # Navigator Base Class
 class Navigator(object):
@@ -205,7 +206,7 @@ class KeyboardMouse(Navigator):
 
 #		self.MOVE_SPEED = 2
 		
-		vizact.ontimer(0,self.updateView)
+		scheduler.add(self.updateView,scheduler.NAVIGATION)
 		vizact.onkeyup(self.KEYS['reset'],self.reset)
 		
 		def onMouseMove(e):
@@ -349,7 +350,7 @@ class Joystick(Navigator):
 		val = mathlite.getNewRange(self.joy.getSlider(),1,-1,self.MIN_SPEED,self.MAX_SPEED)
 		self.MOVE_SPEED = val
 		
-		vizact.ontimer(0, self.updateView)
+		scheduler.add(self.updateView,scheduler.NAVIGATION)
 		vizact.onsensorup(self.joy, self.KEYS['reset'], self.reset)
 		viz.callback(getExtension().SLIDER_EVENT,self.onSliderChange)
 		
@@ -408,7 +409,7 @@ class Oculus(Navigator):
 						self.camera_bounds.color(viz.GREEN)
 					else:
 						self.camera_bounds.color(viz.RED)
-				vizact.onupdate(0, checkPositionTracked)
+				scheduler.add(checkPositionTracked,scheduler.UI,rate=10)
 
 				# Setup camera bounds toggle key
 				def toggleBounds():
@@ -447,7 +448,7 @@ class Oculus(Navigator):
 	def setAsMain(self):
 		self.MOVE_SPEED = 2.0	
 
-		vizact.ontimer(0,self.updateView)
+		scheduler.add(self.updateView,scheduler.NAVIGATION)
 		vizact.onkeyup(self.KEYS['reset'], self.reset)
 		
 
@@ -550,7 +551,7 @@ class Joyculus(Navigator):
 						self.camera_bounds.color(viz.GREEN)
 					else:
 						self.camera_bounds.color(viz.RED)
-				vizact.onupdate(0, checkPositionTracked)
+				scheduler.add(checkPositionTracked,scheduler.UI,rate=10)
 
 				# Setup camera bounds toggle key
 				def toggleBounds():
@@ -600,7 +601,7 @@ class Joyculus(Navigator):
 		self.MOVE_SPEED = val
 		
 		vizact.onsensordown(self.joy,self.KEYS['reset'],self.reset)
-		vizact.ontimer(0,self.updateView)
+		scheduler.add(self.updateView,scheduler.NAVIGATION)
 		viz.callback(getExtension().SLIDER_EVENT,self.onSliderChange)
 		
 # Check for devices
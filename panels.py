@@ -12,6 +12,17 @@ def CreateLabelledPanel():
 	headerRow = panel.addRow([diameterLabel,thicknessLabel,lengthLabel,quantityLabel,deleteLabel])
 	return panel
 	
+def CreateSaveBrowserPanel():
+	panel = vizdlg.GridPanel(cellAlign=vizdlg.ALIGN_CENTER_TOP,border=False,spacing=0,padding=1,background=False,margin=0)
+	nameLabel = viz.addButtonLabel('name')
+	membersLabel = viz.addButtonLabel('members')
+	orientationLabel = viz.addButtonLabel('side/top/bot')
+	lengthLabel = viz.addButtonLabel('steel (m)')
+	spanLabel = viz.addButtonLabel('span (m)')
+	loadLabel = viz.addButtonLabel('')
+	headerRow = panel.addRow([nameLabel,membersLabel,orientationLabel,lengthLabel,spanLabel,loadLabel])
+	return panel
+	
 def CreateInventoryPanel():
 	panel = vizdlg.GridPanel(cellAlign=vizdlg.ALIGN_CENTER_TOP,border=False,spacing=0,padding=1,background=False,margin=0)
 	return panel
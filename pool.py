@@ -0,0 +1,79 @@
+﻿"""
+Object pool
+
+Recycles expensive scene objects instead of removing and rebuilding them.
+acquire() hands out a free object (a hit) or builds a new one (a miss), and
+release() returns it to the free list. Hit, miss and high-water counts show how
+large the pool needs to be for a given session.
+"""
+
+
+class Pool(object):
+	"""Free list of objects built by create, with optional reset/release/destroy hooks"""
+	def __init__(self, create, reset=None, release=None, destroy=None, capacity=None):
+		self._create = create
+		self._reset = reset
+		self._release = release
+		self._destroy = destroy
+		self._capacity = capacity
+		self._free = []
+		self._active = set()
+		self._hits = 0
+		self._misses = 0
+		self._highWater = 0
+
+	def acquire(self):
+		"""Return a reset object, reusing a released one when possible"""
+		if self._free:
+			obj = self._free.pop()
+			self._hits += 1
+		else:
+			obj = self._create()
+			self._misses += 1
+		self._active.add(obj)
+		self._highWater = max(self._highWater, len(self._active))
+		if self._reset is not None:
+			self._reset(obj)
+		return obj
+
+	def release(self, obj):
+		"""Return an object to the pool; releasing an object twice is ignored"""
+		if obj not in self._active:
+			return
+		self._active.discard(obj)
+		if self._release is not None:
+			self._release(obj)
+		if self._capacity is not None and len(self._free) >= self._capacity:
+			if self._destroy is not None:
+				self._destroy(obj)
+		else:
+			self._free.append(obj)
+
+	def prefill(self, count):
+		"""Build objects up front so the next count acquires are hits"""
+		for i in range(count - len(self._free)):
+			obj = self._create()
+			if self._release is not None:
+				self._release(obj)
+			self._free.append(obj)
+
+	def clear(self):
+		"""Destroy every free object"""
+		if self._destroy is not None:
+			for obj in self._free:
+				self._destroy(obj)
+		self._free = []
+
+	def getActiveCount(self):
+		return len(self._active)
+
+	def getFreeCount(self):
+		return len(self._free)
+
+	def getStats(self):
+		"""Return hits, misses, high-water mark and current active/free counts"""
+		return { 'hits'			: self._hits
+				,'misses'		: self._misses
+				,'highWater'	: self._highWater
+				,'active'		: len(self._active)
+				,'free'			: len(self._free) }
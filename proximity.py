@@ -0,0 +1,194 @@
+﻿"""
+Proximity manager with bulk sensor and target registration
+
+vizproximity.Manager only registers one sensor or target per call, and the
+builder used to re-add sensors that were already registered on every
+orientation change. This manager keeps O(1) membership sets, drops redundant
+calls, and lets callers register or unregister whole batches in one call so
+the underlying manager only sees the net change.
+
+vizproximity.Manager has no batch registration or deferred rebuild hook: its
+only entry points are addSensor/removeSensor/addTarget/removeTarget and the
+clear calls. Batches therefore still reach it one changed sensor at a time,
+and the saving comes only from skipping sensors whose registration would not
+change, not from a single rebuild per batch.
+
+Sensors can also be kept in persistent named sets (e.g. one per orientation).
+Switching which sets are active registers and unregisters only the sensors
+whose state actually changes.
+"""
+import viz
+import vizproximity
+
+
+class Manager(vizproximity.Manager):
+	"""vizproximity.Manager with addSensors/removeSensors/addTargets/removeTargets"""
+	def __init__(self, *args, **kwargs):
+		vizproximity.Manager.__init__(self, *args, **kwargs)
+		self._activeSensors = set()
+		self._activeTargets = set()
+		self._mutations = 0
+		self._sensorSets = {}
+		self._activeSets = set()
+
+	def addSensor(self, sensor):
+		if sensor not in self._activeSensors:
+			self._activeSensors.add(sensor)
+			self._mutations += 1
+			vizproximity.Manager.addSensor(self, sensor)
+
+	def removeSensor(self, sensor):
+		if sensor in self._activeSensors:
+			self._activeSensors.discard(sensor)
+			self._mutations += 1
+			vizproximity.Manager.removeSensor(self, sensor)
+
+	def addTarget(self, target):
+		if target not in self._activeTargets:
+			self._activeTargets.add(target)
+			self._mutations += 1
+			vizproximity.Manager.addTarget(self, target)
+
+	def removeTarget(self, target):
+		if target in self._activeTargets:
+			self._activeTargets.discard(target)
+			self._mutations += 1
+			vizproximity.Manager.removeTarget(self, target)
+
+	def clearSensors(self):
+		self._mutations += len(self._activeSensors)
+		self._activeSensors.clear()
+		vizproximity.Manager.clearSensors(self)
+
+	def clearTargets(self):
+		self._mutations += len(self._activeTargets)
+		self._activeTargets.clear()
+		vizproximity.Manager.clearTargets(self)
+
+	def addSensors(self, sensors):
+		"""Register many sensors, skipping ones already registered"""
+		added = [sensor for sensor in set(sensors) if sensor not in self._activeSensors]
+		self._activeSensors.update(added)
+		self._mutations += len(added)
+		for sensor in added:
+			vizproximity.Manager.addSensor(self, sensor)
+
+	def removeSensors(self, sensors):
+		"""Unregister many sensors, skipping ones not registered"""
+		removed = self._activeSensors.intersection(sensors)
+		if len(removed) == len(self._activeSensors):
+			self.clearSensors()
+			return
+		self._activeSensors.difference_update(removed)
+		self._mutations += len(removed)
+		for sensor in removed:
+			vizproximity.Manager.removeSensor(self, sensor)
+
+	def addTargets(self, targets):
+		"""Register many targets, skipping ones already registered"""
+		added = [target for target in set(targets) if target not in self._activeTargets]
+		self._activeTargets.update(added)
+		self._mutations += len(added)
+		for target in added:
+			vizproximity.Manager.addTarget(self, target)
+
+	def removeTargets(self, targets):
+		"""Unregister many targets, skipping ones not registered"""
+		removed = self._activeTargets.intersection(targets)
+		if len(removed) == len(self._activeTargets):
+			self.clearTargets()
+			return
+		self._activeTargets.difference_update(removed)
+		self._mutations += len(removed)
+		for target in removed:
+			vizproximity.Manager.removeTarget(self, target)
+
+	def addToSensorSet(self, name, sensor):
+		"""Add a sensor to a named set, registering it if the set is active"""
+		self._sensorSets.setdefault(name, set()).add(sensor)
+		if name in self._activeSets:
+			self.addSensor(sensor)
+
+	def removeFromSensorSet(self, name, sensor):
+		"""Remove a sensor from a named set, unregistering it unless another active set holds it"""
+		self._sensorSets.get(name, set()).discard(sensor)
+		if not any(sensor in self._sensorSets[active] for active in self._activeSets if active in self._sensorSets):
+			self.removeSensor(sensor)
+
+	def activateSensorSets(self, names):
+		"""Make exactly the named sets active, touching only sensors whose registration changes"""
+		names = set(names)
+		wanted = set()
+		for name in names:
+			wanted.update(self._sensorSets.get(name, ()))
+		dropped = set()
+		for name in self._activeSets - names:
+			dropped.update(self._sensorSets.get(name, ()))
+		self._activeSets = names
+		self.removeSensors(dropped - wanted)
+		self.addSensors(wanted)
+
+	def getActiveSensorSets(self):
+		return set(self._activeSets)
+
+	def hasSensor(self, sensor):
+		return sensor in self._activeSensors
+
+	def getSensorCount(self):
+		return len(self._activeSensors)
+
+	def getTargetCount(self):
+		return len(self._activeTargets)
+
+	def getMutationCount(self):
+		"""Number of sensor/target registrations forwarded to vizproximity"""
+		return self._mutations
+
+
+def benchmark(counts=(100,1000,5000), repeats=3):
+	"""Time per-call versus bulk registration of two sensors per member
+
+	Both sides make the same requests: register every sensor, register them
+	all again as an orientation switch used to, unregister half, then clear.
+	"""
+	results = []
+	for count in counts:
+		nodes = [viz.addGroup() for i in range(count * 2)]
+		sensors = [vizproximity.addBoundingSphereSensor(node) for node in nodes]
+		half = sensors[::2]
+
+		base = vizproximity.Manager()
+		start = viz.tick()
+		for i in range(repeats):
+			for sensor in sensors:
+				base.addSensor(sensor)
+			for sensor in sensors:
+				base.addSensor(sensor)
+			for sensor in half:
+				base.removeSensor(sensor)
+			base.clearSensors()
+		single = (viz.tick() - start) / repeats
+		base.remove()
+
+		bulk = Manager()
+		start = viz.tick()
+		for i in range(repeats):
+			bulk.addSensors(sensors)
+			bulk.addSensors(sensors)
+			bulk.removeSensors(half)
+			bulk.clearSensors()
+		batched = (viz.tick() - start) / repeats
+		bulk.remove()
+
+		for node in nodes:
+			node.remove()
+		results.append((count,single,batched))
+	return results
+
+
+if __name__ == '__main__':
+	viz.go()
+	print('members | per-call (ms) | bulk (ms)')
+	for count, single, batched in benchmark():
+		print('{:7d} | {:13.2f} | {:9.2f}'.format(count,single * 1000.0,batched * 1000.0))
+	viz.quit()
@@ -0,0 +1,125 @@
+﻿"""
+Indexed save library
+
+Keeps a JSON sidecar in the saves directory with per-file metadata so the
+in-VR browser can list, sort and filter thousands of saves without opening
+them. Refreshing only stats each file; a save is decoded again only when its
+modification time or size changed.
+"""
+import csv
+import json
+import os
+import bridgeio
+import geometry
+import numpy
+
+INDEX_NAME = '.index.json'
+INDEX_VERSION = 2
+EXTENSIONS = (bridgeio.BINARY_EXTENSION, bridgeio.CSV_EXTENSION)
+
+# Sort keys offered by the browser
+SORT_NEWEST = 'Newest'
+SORT_NAME = 'Name'
+SORT_MEMBERS = 'Members'
+SORT_LENGTH = 'Steel length'
+SORT_SPAN = 'Span'
+SORT_KEYS = {
+	 SORT_NEWEST	: ('mtime', True)
+	,SORT_NAME		: ('name', False)
+	,SORT_MEMBERS	: ('members', True)
+	,SORT_LENGTH	: ('steelLength', True)
+	,SORT_SPAN		: ('span', True)
+}
+
+
+def summarize(records):
+	"""Compute the cached metadata for one bridge's records"""
+	orientations = records['orientation'].tolist()
+	endA, endB = geometry.memberEndpoints(records['pos'],records['euler'],records['length'])
+	low, high = geometry.bounds(numpy.concatenate((endA,endB)))
+	return { 'members'		: len(records)
+			,'side'			: orientations.count(1)
+			,'top'			: orientations.count(2)
+			,'bottom'		: orientations.count(3)
+			,'bboxMin'		: [float(v) for v in low]
+			,'bboxMax'		: [float(v) for v in high]
+			,'span'			: float(high[0] - low[0])
+			,'steelLength'	: float(records['length'].sum()) }
+
+
+class SaveLibrary(object):
+	"""Cached listing of bridge saves in one directory"""
+	def __init__(self, directory='./data/saves'):
+		self._directory = directory
+		self._indexPath = os.path.join(directory, INDEX_NAME)
+		self._entries = {}
+		self._dirty = False
+		self._readIndex()
+
+	def getDirectory(self):
+		return self._directory
+
+	def getPath(self, name):
+		return os.path.join(self._directory, name)
+
+	def refresh(self):
+		"""Bring the index up to date with the directory, decoding only changed files"""
+		names = [name for name in os.listdir(self._directory) if name.lower().endswith(EXTENSIONS)]
+		for name in set(self._entries) - set(names):
+			del self._entries[name]
+			self._dirty = True
+		for name in names:
+			stat = os.stat(self.getPath(name))
+			entry = self._entries.get(name)
+			if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+				self._index(name, stat)
+		self._writeIndex()
+		return self
+
+	def update(self, path, records=None):
+		"""Refresh one entry, e.g. straight after saving it"""
+		name = os.path.basename(path)
+		self._index(name, os.stat(path), records)
+		self._writeIndex()
+
+	def list(self, sortBy=SORT_NEWEST, orientation=None, minMembers=0, text=''):
+		"""Return readable entries sorted and filtered on cached fields only"""
+		entries = [ entry for entry in self._entries.values()
+					if not entry.get('invalid')
+					and entry.get('members',0) >= minMembers
+					and (orientation is None or entry.get(orientation,0) > 0)
+					and text.lower() in entry['name'].lower() ]
+		key, reverse = SORT_KEYS.get(sortBy, SORT_KEYS[SORT_NEWEST])
+		entries.sort(key=lambda entry: entry.get(key,0), reverse=reverse)
+		return entries
+
+	def _index(self, name, stat, records=None):
+		entry = {'name' : name, 'mtime' : stat.st_mtime, 'size' : stat.st_size}
+		try:
+			if records is None:
+				records = bridgeio.load(self.getPath(name))
+			entry.update(summarize(records))
+		except (bridgeio.BridgeFormatError, ValueError, IOError, csv.Error):
+			entry['invalid'] = True
+		self._entries[name] = entry
+		self._dirty = True
+
+	def _readIndex(self):
+		try:
+			with open(self._indexPath,'r') as f:
+				index = json.load(f)
+			if index.get('version') == INDEX_VERSION:
+				self._entries = dict((entry['name'], entry) for entry in index['entries'])
+		except (IOError, ValueError, KeyError):
+			self._entries = {}
+
+	def _writeIndex(self):
+		if not self._dirty:
+			return
+		tmpPath = self._indexPath + '.tmp'
+		with open(tmpPath,'w') as f:
+			json.dump({'version' : INDEX_VERSION, 'entries' : list(self._entries.values())}, f)
+		if os.path.exists(self._indexPath):
+			os.remove(self._indexPath)
+		os.rename(tmpPath, self._indexPath)
+		self._dirty = False
@@ -0,0 +1,193 @@
+﻿"""
+Frame-phase scheduler
+
+Per-frame callbacks used to be separate vizact timers running in no particular
+order, each paying for its own timer dispatch. A Scheduler runs them from one
+timer in fixed phases: input, navigation, interaction, snapping, then UI.
+Tasks can be rate limited (e.g. UI at 10 Hz) or set to run only after they are
+marked dirty. A phase with a time budget defers its deferrable tasks to a
+later frame once the budget is used up; a task deferred once runs on the next
+frame regardless, so none waits more than a frame.
+
+The scheduler also records the time spent per phase and per task, so the
+per-frame Python cost can be measured and held to the budgets. While
+instrumentation is enabled every task call and phase also goes into its
+instrumentation histogram.
+"""
+import time
+import traceback
+import instrumentation
+
+# Phases, run in this order every frame
+INPUT = 0
+NAVIGATION = 1
+INTERACTION = 2
+SNAPPING = 3
+UI = 4
+PHASES = (INPUT, NAVIGATION, INTERACTION, SNAPPING, UI)
+PHASE_NAMES = ('input', 'navigation', 'interaction', 'snapping', 'ui')
+
+# Milliseconds per frame a phase may spend before deferring its deferrable tasks
+BUDGETS = {
+	 INTERACTION	: 4.0
+	,SNAPPING		: 2.0
+	,UI				: 2.0
+}
+
+
+class Task(object):
+	"""One scheduled callback, returned by Scheduler.add"""
+	def __init__(self, scheduler, func, args, phase, rate, whenDirty, deferrable, name):
+		self.func = func
+		self.args = args
+		self.phase = phase
+		self.interval = 1.0 / rate if rate else 0.0
+		self.deferrable = deferrable
+		self.name = name or instrumentation.callableName(func)
+		self.enabled = True
+		self.dirty = True if whenDirty else None		# None means the task ignores dirty flags
+		self.due = 0.0
+		self.calls = 0
+		self.idle = 0
+		self.deferred = 0
+		self.owed = False
+		self.seconds = 0.0
+		self._scheduler = scheduler
+
+	def markDirty(self):
+		"""Ask a dirty-flag task to run on the next pass of its phase"""
+		if self.dirty is not None:
+			self.dirty = True
+
+	def setEnabled(self, state):
+		self.enabled = state
+
+	def remove(self):
+		self._scheduler.remove(self)
+
+	def getStats(self):
+		return { 'name'		: self.name
+				,'phase'	: PHASE_NAMES[self.phase]
+				,'calls'	: self.calls
+				,'idle'		: self.idle
+				,'deferred'	: self.deferred
+				,'ms'		: self.seconds * 1000.0 }
+
+
+class Scheduler(object):
+	"""Runs tasks phase by phase once per call to run()"""
+	def __init__(self, clock=time.time, budgets=None):
+		self._clock = clock
+		self._budgets = dict(BUDGETS if budgets is None else budgets)
+		self._phases = [[] for phase in PHASES]
+		self._phaseSeconds = [0.0] * len(PHASES)
+		self._frameSeconds = 0.0
+		self._peakSeconds = 0.0
+		self._overheadSeconds = 0.0
+		self._frames = 0
+
+	def add(self, func, phase=INTERACTION, rate=0, whenDirty=False, deferrable=False, name=None, args=()):
+		"""Schedule func(*args) in a phase, at most rate times a second if rate is set"""
+		task = Task(self, func, tuple(args), phase, rate, whenDirty, deferrable, name)
+		self._phases[phase].append(task)
+		return task
+
+	def remove(self, task):
+		if task in self._phases[task.phase]:
+			self._phases[task.phase].remove(task)
+
+	def setBudget(self, phase, ms):
+		"""Set a phase's budget in milliseconds, or None for no budget"""
+		if ms is None:
+			self._budgets.pop(phase, None)
+		else:
+			self._budgets[phase] = ms
+
+	def run(self):
+		"""Run one frame's worth of due tasks"""
+		clock = self._clock
+		start = now = clock()
+		taskSeconds = 0.0
+		for phase in PHASES:
+			phaseStart = now
+			budget = self._budgets.get(phase)
+			if budget is not None:
+				budget *= 0.001
+			for task in list(self._phases[phase]):
+				if not task.enabled or task.dirty is False or now < task.due:
+					task.idle += 1
+					continue
+				if budget is not None and task.deferrable and not task.owed and now - phaseStart >= budget:
+					task.owed = True
+					task.deferred += 1
+					continue
+				task.owed = False
+				if task.dirty:
+					task.dirty = False
+				try:
+					task.func(*task.args)
+				except Exception:
+					traceback.print_exc()
+				after = clock()
+				if instrumentation.ENABLED:
+					instrumentation.record(task.name, after - now)
+				task.calls += 1
+				task.seconds += after - now
+				taskSeconds += after - now
+				if task.interval:
+					# Keep the task's cadence unless it fell more than a period behind
+					task.due = max(task.due + task.interval, now)
+				now = after
+			self._phaseSeconds[phase] = now - phaseStart
+			if instrumentation.ENABLED:
+				instrumentation.record('phase.' + PHASE_NAMES[phase], now - phaseStart)
+		self._frameSeconds = now - start
+		self._peakSeconds = max(self._peakSeconds, self._frameSeconds)
+		self._overheadSeconds += self._frameSeconds - taskSeconds
+		self._frames += 1
+
+	def getTasks(self, phase=None):
+		if phase is None:
+			return [task for tasks in self._phases for task in tasks]
+		return list(self._phases[phase])
+
+	def getStats(self):
+		"""Return last-frame phase times, peak frame time and mean scheduler overhead in milliseconds"""
+		stats = dict((PHASE_NAMES[phase] + 'Ms', self._phaseSeconds[phase] * 1000.0) for phase in PHASES)
+		stats['frameMs'] = self._frameSeconds * 1000.0
+		stats['peakFrameMs'] = self._peakSeconds * 1000.0
+		stats['overheadMs'] = self._overheadSeconds * 1000.0 / max(self._frames, 1)
+		stats['frames'] = self._frames
+		return stats
+
+
+_default = None
+
+
+def getDefault():
+	"""Return the shared scheduler, driven by a single vizact timer created on first use"""
+	global _default
+	if _default is None:
+		import viz
+		import vizact
+		_default = Scheduler(viz.tick)
+		vizact.ontimer(0, _default.run)
+	return _default
+
+
+def add(func, phase=INTERACTION, rate=0, whenDirty=False, deferrable=False, name=None, args=()):
+	"""Schedule a task on the shared scheduler"""
+	return getDefault().add(func, phase, rate, whenDirty, deferrable, name, args)
+
+
+if __name__ == '__main__':
+	import timeit
+	print('tasks | scheduler frame (us) | overhead per task (us) | bare calls (us)')
+	for count in (10, 50, 200):
+		noop = lambda: None
+		frames = Scheduler(budgets={})
+		for i in range(count):
+			frames.add(noop, PHASES[i % len(PHASES)])
+		scheduled = min(timeit.repeat(frames.run, number=1000, repeat=3)) / 1000
+		bare = min(timeit.repeat(lambda: [noop() for i in range(count)], number=1000, repeat=3)) / 1000
+		print('{:5d} | {:20.1f} | {:22.2f} | {:15.1f}'.format(count, scheduled * 1e6, (scheduled - bare) * 1e6 / count, bare * 1e6))
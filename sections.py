@@ -0,0 +1,137 @@
+﻿"""
+CHS section properties
+
+The catalogue only lists outside diameters and wall thicknesses in mm. This
+module derives the structural properties of circular hollow sections from
+them for any number of sections in one vectorized pass, and caches them in a
+SectionTable whose row indices match BridgeModel section indices, so
+per-member properties are a single fancy index away.
+
+All properties are in SI units: m^2, m^4, m, m^3 and kg/m.
+"""
+import xml.etree.ElementTree as ET
+from pyInstall import installIfNeeded
+
+installIfNeeded("numpy")
+
+import numpy
+
+DENSITY = 7850.0				# Steel, kg/m^3
+CATALOGUE_PATH = 'data/catalogues/catalogue_CHS.xml'
+
+PROPERTY_DTYPE = numpy.dtype([
+	 ('diameter',			'<f8')		# mm
+	,('thickness',			'<f8')		# mm
+	,('area',				'<f8')
+	,('secondMoment',		'<f8')
+	,('radiusOfGyration',	'<f8')
+	,('elasticModulus',		'<f8')
+	,('plasticModulus',		'<f8')
+	,('massPerMetre',		'<f8')
+])
+
+
+def area(diameter, thickness):
+	"""Return CHS cross-section areas in m^2 from diameters and thicknesses in mm"""
+	outer = numpy.asarray(diameter, dtype=float) * 0.001
+	inner = numpy.maximum(outer - 2.0 * numpy.asarray(thickness, dtype=float) * 0.001, 0.0)
+	return numpy.pi * 0.25 * (outer ** 2 - inner ** 2)
+
+
+def compute(diameter, thickness):
+	"""Return a PROPERTY_DTYPE row per (diameter,thickness) pair in mm"""
+	diameter = numpy.asarray(diameter, dtype=float).ravel()
+	thickness = numpy.asarray(thickness, dtype=float).ravel()
+	outer = diameter * 0.001
+	inner = numpy.maximum(outer - 2.0 * thickness * 0.001, 0.0)
+	table = numpy.zeros(len(diameter), dtype=PROPERTY_DTYPE)
+	table['diameter'] = diameter
+	table['thickness'] = thickness
+	table['area'] = numpy.pi * 0.25 * (outer ** 2 - inner ** 2)
+	table['secondMoment'] = numpy.pi / 64.0 * (outer ** 4 - inner ** 4)
+	valid = table['area'] > 0
+	table['radiusOfGyration'] = numpy.sqrt(table['secondMoment'] / numpy.where(valid, table['area'], 1.0)) * valid
+	table['elasticModulus'] = 2.0 * table['secondMoment'] / numpy.where(outer > 0, outer, 1.0)
+	table['plasticModulus'] = (outer ** 3 - inner ** 3) / 6.0
+	table['massPerMetre'] = table['area'] * DENSITY
+	return table
+
+
+def readCatalogue(path=CATALOGUE_PATH):
+	"""Return an (S,2) array of every (diameter,thickness) listed in a catalogue file"""
+	sections = [ (float(member.get('diameter')), float(thickness.text))
+				for member in ET.parse(str(path)).getroot().iter('member')
+				for thickness in member.iter('thickness') ]
+	return numpy.array(sections, dtype=float).reshape(-1,2)
+
+
+class SectionTable(object):
+	"""Cached section properties, one row per registered (diameter,thickness) in registration order"""
+	def __init__(self, sections=()):
+		self._index = {}
+		self._table = numpy.zeros(0, dtype=PROPERTY_DTYPE)
+		self.add(sections)
+
+	def add(self, sections):
+		"""Register (diameter,thickness) pairs, computing new ones in one pass, and return their rows"""
+		keys = [(float(diameter), float(thickness)) for diameter, thickness in sections]
+		new = []
+		for key in keys:
+			if key not in self._index:
+				self._index[key] = len(self._table) + len(new)
+				new.append(key)
+		if new:
+			diameter, thickness = numpy.array(new, dtype=float).T
+			self._table = numpy.concatenate((self._table, compute(diameter, thickness)))
+		return numpy.array([self._index[key] for key in keys], dtype=int)
+
+	def index(self, diameter, thickness):
+		"""Return the row of one section, registering it if new"""
+		key = (float(diameter), float(thickness))
+		row = self._index.get(key)
+		if row is None:
+			row = self.add([key])[0]
+		return row
+
+	def find(self, diameter, thickness):
+		"""Return the row of one section, or None if it is not registered"""
+		return self._index.get((float(diameter), float(thickness)))
+
+	def getTable(self):
+		return self._table
+
+	def getColumn(self, name, rows=None):
+		"""Return one property for every section, or per member when given their section rows"""
+		column = self._table[name]
+		return column if rows is None else column[rows]
+
+	def __len__(self):
+		return len(self._table)
+
+
+_catalogues = {}
+
+def getCatalogue(path=CATALOGUE_PATH):
+	"""Return the SectionTable of a catalogue file, parsed and computed once per path"""
+	table = _catalogues.get(path)
+	if table is None:
+		table = _catalogues[path] = SectionTable(readCatalogue(path))
+	return table
+
+
+if __name__ == '__main__':
+	import timeit
+	catalogue = getCatalogue()
+	print('{} catalogue sections'.format(len(catalogue)))
+	print('  D (mm) | t (mm) |  A (cm2) |    I (cm4) | r (cm) | Wel (cm3) | Wpl (cm3) | kg/m')
+	for row in catalogue.getTable()[::20]:
+		print('{:8.1f} | {:6.1f} | {:8.2f} | {:10.1f} | {:6.2f} | {:9.1f} | {:9.1f} | {:6.1f}'.format(row['diameter'], row['thickness'],
+				row['area'] * 1e4, row['secondMoment'] * 1e8, row['radiusOfGyration'] * 1e2,
+				row['elasticModulus'] * 1e6, row['plasticModulus'] * 1e6, row['massPerMetre']))
+	sections = readCatalogue()
+	print('')
+	print(' sections | one pass (ms)')
+	for repeat in (1,100,1000):
+		diameter, thickness = numpy.tile(sections, (repeat,1)).T
+		seconds = min(timeit.repeat(lambda: compute(diameter, thickness), number=1, repeat=3))
+		print('{:9d} | {:13.3f}'.format(len(diameter), seconds * 1000.0))
@@ -0,0 +1,120 @@
+﻿"""
+Snap index
+
+A uniform 3D grid of snap points (shared joints and support anchors) keyed by
+quantized position. The cell size equals the snap radius, so the nearest point
+within that radius of a query is always in one of the 27 cells around it, and
+a lookup costs O(1) expected time however many joints the bridge has. Points
+are inserted, moved and removed one at a time as members snap, move and are
+deleted.
+
+Keys are whatever the caller uses to identify a snap point, so the index has
+no Vizard dependency.
+"""
+import itertools
+import math
+
+SNAP_RADIUS = 0.3
+NEIGHBOURS = list(itertools.product((-1,0,1),repeat=3))
+
+
+class SnapIndex(object):
+	"""Uniform-grid spatial hash of snap points tagged with a group"""
+	def __init__(self, cellSize=SNAP_RADIUS):
+		self._cellSize = float(cellSize)
+		self._cells = {}
+		self._points = {}
+
+	def quantize(self, pos):
+		return tuple(int(math.floor(v / self._cellSize)) for v in pos)
+
+	def insert(self, key, pos, group=None):
+		"""Add a snap point, or move it if the key is already indexed"""
+		if key in self._points:
+			self.remove(key)
+		pos = tuple(float(v) for v in pos)
+		cell = self.quantize(pos)
+		self._cells.setdefault(cell, []).append(key)
+		self._points[key] = (pos, group, cell)
+
+	def move(self, key, pos):
+		self.insert(key, pos, self._points[key][1])
+
+	def remove(self, key):
+		entry = self._points.pop(key, None)
+		if entry is None:
+			return
+		bucket = self._cells[entry[2]]
+		bucket.remove(key)
+		if not bucket:
+			del self._cells[entry[2]]
+
+	def clear(self):
+		self._cells = {}
+		self._points = {}
+
+	def has(self, key):
+		return key in self._points
+
+	def getPosition(self, key):
+		return self._points[key][0]
+
+	def getGroup(self, key):
+		return self._points[key][1]
+
+	def getCount(self):
+		return len(self._points)
+
+	def nearest(self, pos, radius=None, groups=None):
+		"""Return (key, distance) of the nearest point in groups within radius (capped at the cell size), or (None, None)"""
+		if radius is None:
+			radius = self._cellSize
+		radius = min(radius, self._cellSize)
+		cell = self.quantize(pos)
+		nearest = None
+		best = radius * radius
+		for offset in NEIGHBOURS:
+			for key in self._cells.get((cell[0] + offset[0], cell[1] + offset[1], cell[2] + offset[2]), ()):
+				point, group, pointCell = self._points[key]
+				if groups is not None and group not in groups:
+					continue
+				distance = (pos[0] - point[0]) ** 2 + (pos[1] - point[1]) ** 2 + (pos[2] - point[2]) ** 2
+				if distance <= best:
+					nearest = key
+					best = distance
+		if nearest is None:
+			return None, None
+		return nearest, math.sqrt(best)
+
+	def nearestToAny(self, points, radius=None, groups=None):
+		"""Return (key, index, distance) of the closest match to any of points, e.g. both ends of a member"""
+		found = (None, None, None)
+		for index, pos in enumerate(points):
+			key, distance = self.nearest(pos, radius, groups)
+			if key is not None and (found[0] is None or distance < found[2]):
+				found = (key, index, distance)
+		return found
+
+
+if __name__ == '__main__':
+	import random
+	import timeit
+	import geometry
+	#--A diagonal rolled -40 degrees snaps by its lower end to the anchor it touches, not to the mirrored point
+	index = SnapIndex()
+	index.insert('anchor', (10.0, 5.0, -5.0), 0)
+	index.insert('mirrored', (10.0, 9.114, -5.0), 0)
+	index.insert('top', (5.097, 9.114, -5.0), 1)
+	endA, endB = geometry.memberEndpoints([7.6, 7.0, -5.0], [0.0, 0.0, -40.0], 6.4)
+	key, end, distance = index.nearestToAny([endA[0], endB[0]], groups=(0,))
+	assert (key, end) == ('anchor', 1), (key, end)
+	key, end, distance = index.nearestToAny([endA[0], endB[0]], groups=(1,))
+	assert (key, end) == ('top', 0), (key, end)
+	print('joints | nearest to both ends (us)')
+	for count in (1000,10000,100000):
+		index = SnapIndex()
+		for key in range(count):
+			index.insert(key, (random.uniform(-50,50), random.uniform(0,20), random.uniform(-10,10)), key % 3)
+		ends = [(random.uniform(-50,50), random.uniform(0,20), random.uniform(-10,10)) for i in range(2)]
+		elapsed = min(timeit.repeat(lambda: index.nearestToAny(ends, groups=(0,1)), number=1000, repeat=3)) / 1000
+		print('{:6d} | {:26.1f}'.format(count, elapsed * 1e6))
@@ -52,6 +52,12 @@ Are you sure you want to proceed?"""
 QUIT_MESSAGE = """Any unsaved progress will be lost! 
 Are you sure you want to proceed?"""
 
+OPEN_SAVE_MESSAGE = """Any unsaved progress will be lost! 
+Are you sure you want to load this bridge?"""
+
+RECOVER_MESSAGE = """The last session did not close properly! 
+Recover the unsaved bridge?"""
+
 # Imports
 import viz
 import vizact
@@ -68,12 +74,34 @@ import vizmenu
 import vizproximity
 import vizshape
 import viztask
+import analysis
+import bridgeio
+import bridgemodel
 import csv
+import bvh
+import instrumentation
 import inventory
+import itertools
+import journal
 import mathlite
 import navigation
+import numpy
 import panels
+import proximity
+import pool
+import highlightsets
+import joints
+import jointtree
+import loadcases
+import instancerenderer
+import instancing
+import lod
+import metrics
+import motion
 import roots
+import savelibrary
+import scheduler
+import snapindex
 import structures
 import sys
 import themes
@@ -142,10 +170,11 @@ ORDERS_BOT_FLAG = 'Bot'
 
 BUILD_MEMBERS = []				# Array to store all truss members of bridge for saving/loading
 SIDE_MEMBERS = []				# Array to store Side truss
-SIDE_CLONES = []				# Array to store cloned Side truss
 TOP_MEMBERS = []				# Array to store Top truss
 BOT_MEMBERS = []				# Array to store Bottom truss
-GRAB_LINKS = []					# Array to store grab links between bridge root and truss members
+MEMBER_PATH = 'resources/chs.osgb'
+MEMBER_POOLS = {}				# Pools of recycled truss members keyed by model path
+LINK_METRIC = 'memberLinks'		# Live links moving a member or its end nodes
 
 BRIDGE_LENGTH = 20				# Length of bridge in meters
 BRIDGE_SPAN = 10				# Span of bridge in meters
@@ -167,16 +196,21 @@ INACTIVE_ALPHA = 0.25			# Alpha value for inactive truss members
 ORIENTATION = structures.Orientation.Side
 MODE = structures.Mode.View
 
-PROXY_NODES = []
 TARGET_NODES = []
-SENSOR_NODES = []
+JOINT_TOLERANCE = 0.05			# Member ends closer than this share one joint
 
 PRE_SNAP_POS = []
 PRE_SNAP_ROT = []
 SNAP_TO_POS = []
+SNAP_TARGET = None				# Joint or anchor the grabbed member will snap to
+SNAP_ANCHORS = 'anchors'		# Snap index group of the pin and roller anchors
 VALID_SNAP = False
 
 SHOW_HIGHLIGHTER = False
+HIGHLIGHT_DISTANCE = 100.0		# Glove ray length when picking members and joints
+HIGHLIGHT_COLOR = viz.YELLOW
+MEMBER_PICK_RADIUS = 0.05		# Thinnest capsule a member is picked as
+JOINT_PICK_RADIUS = 0.3
 HAND_DISTANCE = 2.5
 SCROLL_MIN = 0.2
 SCROLL_MAX = 20
@@ -185,7 +219,30 @@ CACHED_GLOVE_Z = 0
 
 OPTIONS_BUTTON_LENGTH = 1.75
 
+AUTOSAVE_DIRECTORY = './data/autosave'
+NEXT_MEMBER_ID = 0				# Session-unique id for journaling member edits
+
+SAVES_DIRECTORY = './data/saves'
+SAVE_BROWSER_ROWS = 10			# Max saves listed in the in-VR browser
+SAVE_BROWSER_SORTS = [savelibrary.SORT_NEWEST,savelibrary.SORT_NAME,savelibrary.SORT_MEMBERS,savelibrary.SORT_LENGTH,savelibrary.SORT_SPAN]
+SAVE_BROWSER_FILTERS = [('All',None),('Has Top','top'),('Has Bottom','bottom')]
+
+LOAD_BUDGET_MS = 4.0			# Milliseconds per frame spent creating members while loading
+LOAD_TASK = None
+LOAD_CANCELLED = False
+isloading = False
+
+ANALYSIS = None					# Live stiffness analysis of the bridge while turned on, see toggleAnalysis
+ANALYSIS_VERSION = -1			# Bridge model version the live analysis reflects
+ANALYSIS_SOLVED = -1			# Bridge model version last solved and reported
+
+SAVE_FILTER = [('Bridge Files','*.tbb'),('CSV Files','*.csv')]
+LOAD_FILTER = [('Bridge Files','*.tbb;*.csv'),('CSV Files','*.csv')]
+
 DEBUG_PROXIMITY = True
+DEBUG_TIMING = False			# Print pool, counter and task statistics on exit
+DEBUG_PROFILE = False			# Record callback timings from startup instead of from the profiler key
+PROFILE_PATH = './data/profiles/callbacks'	# Callback timings are written to this path plus .json and .csv on exit
 DEBUG_CAMBOUNDS = False
 
 # Setup key commands
@@ -219,6 +276,9 @@ KEYS = { 'forward'	: 'w'
 		,'capslock'	: viz.KEY_CAPS_LOCK
 		,'slideFar'	: '2'
 		,'slideNear': '1'
+		,'profiler'	: viz.KEY_F12
+		,'analyze'	: 'k'
+		,'loadCases': 'l'
 }
 
 # Initialize scene
@@ -249,30 +309,10 @@ def initMouse():
 	
 	
 def initProxy():
-	"""Initialize proximity manager and register callbacks"""
+	"""Initialize proximity manager; snapping itself is decided by the snap index"""
 	# Create proximity manager
-	proxyManager = vizproximity.Manager()
+	proxyManager = proximity.Manager()
 	proxyManager.setDebug(DEBUG_PROXIMITY)
-	
-	# Register callbacks for proximity SENSOR_NODES
-	def enterProximity(e):
-		global SENSOR_NODE
-		global SNAP_TO_POS
-		global VALID_SNAP
-		SENSOR_NODE = e.sensor.getSource()
-		SNAP_TO_POS = e.sensor.getSource().getPosition()
-		VALID_SNAP = True
-		print 'EnterProximity: SNAP_TO_POS',SNAP_TO_POS
-	
-	def exitProximity(e):
-		global SENSOR_NODE
-		global VALID_SNAP
-		SENSOR_NODE = None
-		VALID_SNAP = False
-
-	proxyManager.onEnter(None, enterProximity)
-	proxyManager.onExit(None, exitProximity)
-	
 	return proxyManager
 	
 	
@@ -317,6 +357,7 @@ initScene(RESOLUTION,MULTISAMPLING,FOV,STENCIL,STEREOMODE,FULLSCREEN,(0.1, 0.1,
 initMouse()
 initLighting()
 highlightTool = highlighter.Highlighter()
+highlightSets = highlightsets.HighlightSets(highlightTool)
 proxyManager = initProxy()
 catalogue_root = getCatalogue('data/catalogues/catalogue_CHS.xml')
 environment_root = roots.EnvironmentRoot()
@@ -325,6 +366,11 @@ environment_root.setWaveAnimationSpeed(0.01);
 bridge_root = roots.Root()
 bridge_root.getGroup().setPosition(BRIDGE_ROOT_POS)
 bridge_root.getGroup().setEuler(SIDE_VIEW_ROT)
+SIDE_ROOT_MATRIX = viz.Matrix.euler(SIDE_VIEW_ROT)
+SIDE_ROOT_MATRIX.postTrans(BRIDGE_ROOT_POS)
+autosave = journal.Journal(AUTOSAVE_DIRECTORY)
+bridgeModel = bridgemodel.BridgeModel()
+jointTree = jointtree.JointTree(bridgeModel)
 grid_root = roots.GridRoot(GRID_COLOR)
 info_root = roots.InfoRoot()
 
@@ -368,6 +414,137 @@ def applyEnvironmentEffect(obj):
 	obj.texture(env)
 	obj.appearance(viz.ENVIRONMENT_MAP)	
 
+#--Placed members and their end nodes live under one group per orientation on the bridge root, so
+#--they follow the bridge without links, and showing, hiding and fading an orientation is a group call
+MEMBER_GROUPS = dict((orientation,viz.addGroup(parent=bridge_root.getGroup())) for orientation in structures.Orientation)
+JOINT_GROUPS = dict((orientation,viz.addGroup(parent=bridge_root.getGroup())) for orientation in structures.Orientation)
+
+#--Far side truss: side members and joints are drawn a second time through a mirrored parent
+sideMirror = viz.addGroup(parent=bridge_root.getGroup())
+sideMirror.setScale([1,1,-1])
+sideMirror.enable(viz.FLIP_POLYGON_ORDER)
+sideMirror.disable(viz.INTERSECTION)
+sideMirror.visible(False)
+MEMBER_GROUPS[structures.Orientation.Side].addParent(sideMirror)
+JOINT_GROUPS[structures.Orientation.Side].addParent(sideMirror)
+
+def styleOrientationGroups(shown,alphas):
+	"""Apply visibility and an alpha override to each orientation's member and joint groups"""
+	for orientation in structures.Orientation:
+		for group in (MEMBER_GROUPS[orientation],JOINT_GROUPS[orientation]):
+			group.visible(shown[orientation])
+			group.alpha(alphas[orientation],op=viz.OP_OVERRIDE)
+
+def showOrientation(active):
+	"""Build and Edit styling: the active orientation opaque, Side kept as a faded guide"""
+	shown = dict((orientation,orientation == active or orientation == structures.Orientation.Side) for orientation in structures.Orientation)
+	alphas = dict((orientation,1 if orientation == active else INACTIVE_ALPHA) for orientation in structures.Orientation)
+	styleOrientationGroups(shown,alphas)
+	showSideMirror(active != structures.Orientation.Side)
+
+#--Level of detail: View and Walk modes draw members from one merged tube mesh per level of rising tessellation
+LOD_SLICES = (6,12,24)			# Tube slices per level, coarsest first
+LOD_ACTIVE = False
+LOD_STALE = True				# Set when the bridge changed and every row must be placed again
+LOD_FRAME = 0
+LOD_JOINTS = []					# Every pooled joint, indexed by its stable selector row
+lodRoot = viz.addGroup(parent=bridge_root.getGroup())
+lodRoot.setMatrix(SIDE_ROOT_MATRIX.inverse())
+LOD_RENDERERS = [instancerenderer.InstancedRenderer(instancing.tubeMesh(slices),parent=lodRoot) for slices in LOD_SLICES]
+for renderer in LOD_RENDERERS:
+	applyEnvironmentEffect(renderer.getGroup())
+lodRoot.visible(False)
+lodSelector = lod.Selector()
+
+def transformPoints(points,matrix):
+	"""Transform (N,3) points by a row-vector viz.Matrix"""
+	m = numpy.array(matrix.get()).reshape(4,4)
+	return numpy.asarray(points,dtype=float).reshape(-1,3).dot(m[:3,:3]) + m[3,:3]
+
+def memberEnds(truss,mode=viz.ABS_PARENT):
+	"""Return (A,B) (1,3) end points of a member from its node transform, matching nodeA and nodeB"""
+	m = viz.Matrix.euler(truss.getEuler(mode))
+	m.postTrans(truss.getPosition(mode))
+	half = truss.length * 0.5
+	ends = transformPoints([[-half,0,0],[half,0,0]],m)
+	return ends[:1], ends[1:]
+
+def invalidateLevelOfDetail():
+	global LOD_STALE
+	LOD_STALE = True
+
+def showLevelOfDetail(state):
+	"""Swap the interactive member nodes for the level of detail renderers"""
+	global LOD_ACTIVE
+	LOD_ACTIVE = state
+	invalidateLevelOfDetail()
+	lodRoot.visible(state)
+	for group in MEMBER_GROUPS.values():
+		group.visible(not state)
+	if state:
+		updateLevelOfDetail(force=True)
+	else:
+		for renderer in LOD_RENDERERS:
+			renderer.clear()
+		for row in lodSelector.getHidden().tolist():
+			LOD_JOINTS[row].visible(True)
+
+def updateLevelOfDetail(force=False):
+	"""Every few frames pick each member's tessellation and hide far connector spheres"""
+	global LOD_FRAME
+	global LOD_STALE
+	if not LOD_ACTIVE:
+		return
+	LOD_FRAME += 1
+	if not force and not lodSelector.isDue(LOD_FRAME):
+		return
+	if LOD_STALE:
+		for renderer in LOD_RENDERERS:
+			renderer.clear()
+		lodSelector.reset()
+		LOD_STALE = False
+	eye = viz.MainView.getPosition()
+	scale = lod.pixelScale(viz.MainWindow.getVerticalFOV(),viz.MainWindow.getSize(viz.WINDOW_PIXELS)[1])
+	
+	#--Members, with side members drawn a second time mirrored onto the far side
+	slots = bridgeModel.active()
+	side = slots[bridgeModel.orientation[slots] == structures.Orientation.Side.value]
+	rows = numpy.concatenate((slots * 2,side * 2 + 1))
+	pos = numpy.concatenate((bridgeModel.pos[slots],bridgeModel.pos[side] * [1,1,-1]))
+	euler = numpy.concatenate((bridgeModel.euler[slots],bridgeModel.euler[side] * [-1,-1,1]))
+	source = numpy.concatenate((slots,side))
+	diameter = bridgeModel.getSections()[bridgeModel.section[source],0] * 0.001
+	length = bridgeModel.length[source]
+	lodMatrix = lodRoot.getMatrix()
+	lodMatrix.postMult(bridge_root.getGroup().getMatrix())
+	levels, changed = lodSelector.levels(rows,lod.screenDiameter(transformPoints(pos,lodMatrix),diameter,eye,scale))
+	if changed.any():
+		moved = rows[changed].tolist()
+		for level, renderer in enumerate(LOD_RENDERERS):
+			buffer = renderer.getBuffer()
+			for row in moved:
+				buffer.remove(row)
+			placed = changed & (levels == level)
+			buffer.setMany(rows[placed].tolist(),pos[placed],euler[placed],
+							numpy.column_stack((length[placed],diameter[placed],diameter[placed])),diameter[placed] * 0.5)
+			renderer.sync()
+	
+	#--Connector spheres, where a side joint counts as near when either copy is
+	jointList = jointRegistry.getJoints()
+	if not jointList:
+		return
+	bridgeMatrix = bridge_root.getGroup().getMatrix()
+	local = numpy.array([jointRegistry.getPosition(joint) for joint in jointList],dtype=float)
+	distance = lod.distances(transformPoints(local,bridgeMatrix),eye)
+	isSide = numpy.array([joint.orientation == structures.Orientation.Side for joint in jointList])
+	if isSide.any():
+		mirrored = lod.distances(transformPoints(local[isSide] * [1,1,-1],bridgeMatrix),eye)
+		distance[isSide] = numpy.minimum(distance[isSide],mirrored)
+	visible, changed = lodSelector.visible(numpy.array([joint.lodRow for joint in jointList]),distance)
+	for index in numpy.flatnonzero(changed).tolist():
+		jointList[index].visible(bool(visible[index]))
+scheduler.add(updateLevelOfDetail,scheduler.UI,deferrable=True)
+
 #--Create middle road
 road = vizfx.addChild('resources/road.osgb',pos=(0,5.25,0),parent=environment_root.getGroup())
 road.visible(False)
@@ -384,19 +561,30 @@ pinAnchorSphere = vizshape.addSphere(0.2,pos=([-BRIDGE_SPAN,BRIDGE_ROOT_POS[1],-
 pinAnchorSphere.visible(False)
 pinLink = viz.link(pinAnchorSphere,viz.NullLinkable)
 pinAnchorSensor = vizproximity.Sensor(vizproximity.Sphere(0.3,center=[0,0.1,0]),pinLink)
-proxyManager.addSensor(pinAnchorSensor)
+proxyManager.addToSensorSet(SNAP_ANCHORS,pinAnchorSensor)
 viz.grab(pinSupport,pinAnchorSphere)
 
 rollerAnchorSphere = vizshape.addSphere(0.2,pos=([BRIDGE_SPAN,BRIDGE_ROOT_POS[1],-(BRIDGE_SPAN*0.5)]))
 rollerAnchorSphere.visible(False)
 rollerLink = viz.link(rollerAnchorSphere,viz.NullLinkable)
 rollerAnchorSensor = vizproximity.Sensor(vizproximity.Sphere(0.3,center=[0,0.1,0]), rollerLink)
-proxyManager.addSensor(rollerAnchorSensor)
+proxyManager.addToSensorSet(SNAP_ANCHORS,rollerAnchorSensor)
 viz.grab(rollerSupport,rollerAnchorSphere)
 
 for model in supports:
 	viz.grab(bridge_root.getGroup(),model)
 
+#--Joints and anchors members can snap to, in bridge root coordinates
+snapIndex = snapindex.SnapIndex(snapindex.SNAP_RADIUS)
+for anchor in (pinAnchorSphere,rollerAnchorSphere):
+	snapIndex.insert(anchor,transformPoints([anchor.getPosition()],SIDE_ROOT_MATRIX.inverse())[0],SNAP_ANCHORS)
+
+#--Members and joints the glove ray can highlight, in bridge root coordinates
+pickTree = bvh.BVH()
+
+#--Highlight candidate changes and clears reach the highlighter once per frame, before picking
+scheduler.add(highlightSets.flush,scheduler.INTERACTION)
+
 # Create canvas for displaying GUI objects
 instructionsPanel = vizinfo.InfoPanel(title=HEADER_TEXT,align=viz.ALIGN_CENTER_BASE,icon=False,key=None)
 instructionsPanel.getTitleBar().fontSize(36)
@@ -505,6 +693,20 @@ creditsPanel.addItem(viz.addText(PROGRAMMERS_TEXT))
 creditsPanel.addSection('    [ Art ]')
 creditsPanel.addItem(viz.addText(ARTISTS_TEXT))
 
+# TAB 5: Save browser panel
+saveBrowserPanel = vizinfo.InfoPanel(title=HEADER_TEXT,text='Saved bridges',align=viz.ALIGN_CENTER_TOP,icon=False,key=None)
+saveBrowserPanel.getTitleBar().fontSize(36)
+saveSortDropList = viz.addDropList()
+saveSortDropList.addItems(SAVE_BROWSER_SORTS)
+saveBrowserPanel.addLabelItem('Sort by', saveSortDropList)
+saveFilterDropList = viz.addDropList()
+saveFilterDropList.addItems([label for label, field in SAVE_BROWSER_FILTERS])
+saveBrowserPanel.addLabelItem('Show', saveFilterDropList)
+SAVE_BROWSER_GRID = panels.CreateSaveBrowserPanel()
+saveBrowserPanel.addItem(SAVE_BROWSER_GRID)
+SAVE_BROWSER_ROW_ITEMS = []
+saveLibrary = savelibrary.SaveLibrary(SAVES_DIRECTORY)
+
 # Create inspector panel
 inspectorCanvas = viz.addGUICanvas(align=viz.ALIGN_CENTER)
 inspector = panels.InspectorPanel()
@@ -576,6 +778,7 @@ menuTabPanel.addPanel('Instructions',instructionsPanel)
 menuTabPanel.addPanel('Controls',controlsQuad)
 menuTabPanel.addPanel('Inventory',inventoryPanel)
 menuTabPanel.addPanel('Options',optionPanel)
+menuTabPanel.addPanel('Saves',saveBrowserPanel)
 menuTabPanel.addPanel('Credits',creditsPanel)
 
 # Add dialog canvas
@@ -597,6 +800,17 @@ feedbackText.color(viz.WHITE)
 feedbackText.fontSize(50)
 feedbackCanvas.visible(viz.OFF)
 
+# Add profiler overlay
+profilerCanvas = viz.addGUICanvas(align=viz.ALIGN_CENTER)
+profilerQuad = viz.addTexQuad(size=[900,400],parent=profilerCanvas)
+profilerQuad.color(viz.BLACK)
+profilerQuad.alpha(0.6)
+profilerText = viz.addText('',parent=profilerQuad,align=viz.ALIGN_CENTER)
+profilerText.font('Courier New')
+profilerText.fontSize(20)
+profilerText.color(viz.WHITE)
+profilerCanvas.visible(viz.OFF)
+
 def initCanvas():	
 	# Set canvas resolution to fit bounds of info panel
 	bb = menuTabPanel.getBoundingBox()
@@ -612,6 +826,8 @@ def initCanvas():
 	updateResolution(feedbackQuad,feedbackCanvas)
 	feedbackCanvas.setPosition(0,0,6)	
 	
+	updateResolution(profilerQuad,profilerCanvas)
+	
 #	inspectorCanvas.setRenderWorldOverlay(RESOLUTION,fov=90.0,distance=3.0)
 	inspectorCanvas.setRenderWorld(RESOLUTION,[10,viz.AUTO_COMPUTE])
 	
@@ -653,7 +869,7 @@ def showFeedback():
 		break
 
 
-task = viztask.schedule( showFeedback() )
+task = viztask.schedule( instrumentation.wrapTask(showFeedback()) )
 def runFeedbackTask(message='Welcome'):
 	global task
 	task.kill()
@@ -662,10 +878,10 @@ def runFeedbackTask(message='Welcome'):
 	feedbackText.alpha(0)
 	feedbackText.message(message)
 	feedbackCanvas.visible(viz.ON)
-	task = viztask.schedule( showFeedback() )
+	task = viztask.schedule( instrumentation.wrapTask(showFeedback()) )
 	
 
-def showdialog(message,func):
+def showdialog(message,func,cancelFunc=None):
 	menuCanvas.setMouseStyle(viz.CANVAS_MOUSE_VISIBLE)
 	inventoryCanvas.setMouseStyle(viz.CANVAS_MOUSE_VISIBLE)
 	
@@ -686,8 +902,8 @@ def showdialog(message,func):
 		yield dialog.show()
 		if dialog.accepted:
 			func()
-		else:
-			pass
+		elif cancelFunc is not None:
+			cancelFunc()
 		dialog.remove()
 		dialogCanvas.visible(viz.OFF)
 		
@@ -696,14 +912,43 @@ def showdialog(message,func):
 			inventoryCanvas.setMouseStyle(viz.CANVAS_MOUSE_VIRTUAL)
 		
 def clearBridge():
-	viztask.schedule(showdialog(CLEAR_MESSAGE,clearMembers))
+	viztask.schedule(instrumentation.wrapTask(showdialog(CLEAR_MESSAGE,clearMembers)))
 
 def quitGame():
-	viztask.schedule(showdialog(QUIT_MESSAGE,viz.quit))
+	viztask.schedule(instrumentation.wrapTask(showdialog(QUIT_MESSAGE,viz.quit)))
 	
 def loadBridge():
 	clickSound.play()
-	viztask.schedule(showdialog(LOAD_MESSAGE,LoadData))
+	viztask.schedule(instrumentation.wrapTask(showdialog(LOAD_MESSAGE,LoadData)))
+	
+def openSave(name):
+	clickSound.play()
+	path = saveLibrary.getPath(name)
+	viztask.schedule(instrumentation.wrapTask(showdialog(OPEN_SAVE_MESSAGE,lambda: loadFile(path))))
+	
+def populateSaveBrowser():
+	"""List indexed saves using the browser's sort and filter selections"""
+	global SAVE_BROWSER_ROW_ITEMS
+	for row in SAVE_BROWSER_ROW_ITEMS:
+		SAVE_BROWSER_GRID.removeRow(row)
+	SAVE_BROWSER_ROW_ITEMS = []
+	
+	sortBy = SAVE_BROWSER_SORTS[saveSortDropList.getSelection()]
+	orientation = SAVE_BROWSER_FILTERS[saveFilterDropList.getSelection()][1]
+	try:
+		entries = saveLibrary.refresh().list(sortBy,orientation)
+	except OSError as e:
+		viz.logError('populateSaveBrowser: Unable to index saves', e)
+		entries = []
+	
+	for entry in entries[:SAVE_BROWSER_ROWS]:
+		loadSaveButton = viz.addButtonLabel('Load')
+		row = SAVE_BROWSER_GRID.addRow( [ viz.addText(entry['name']), viz.addText(str(entry['members'])),
+										viz.addText('{}/{}/{}'.format(entry['side'],entry['top'],entry['bottom'])),
+										viz.addText('{:.1f}'.format(entry['steelLength'])),
+										viz.addText('{:.1f}'.format(entry['span'])), loadSaveButton ] )
+		vizact.onbuttonup ( loadSaveButton, openSave, entry['name'] )
+		SAVE_BROWSER_ROW_ITEMS.append(row)
 	
 class Order(object):
 	'Base class for all ORDERS'
@@ -901,7 +1146,7 @@ def populateInventory():
 	for sideOrder in ORDERS_SIDE:
 		msg = '{}m(l) x {}mm(d) x {}mm(th) [{}]'.format ( sideOrder.length, sideOrder.diameter, sideOrder.thickness, sideOrder.quantity )
 		sideButton = viz.addButtonLabel ( msg )
-		vizact.onbuttonup ( sideButton, createTrussNew, sideOrder, 'resources/chs.osgb' )
+		vizact.onbuttonup ( sideButton, createTrussNew, sideOrder, MEMBER_PATH )
 		row = sideInventory.addRow ( [sideButton] )
 		sideRows.append ( row )
 		vizact.onbuttonup ( sideButton, updateQuantity, sideOrder, sideButton, ORDERS_SIDE, sideInventory, row )
@@ -910,7 +1155,7 @@ def populateInventory():
 	for topOrder in ORDERS_TOP:
 		msg = '{}m(l) x {}mm(d) x {}mm(th) [{}]'.format ( topOrder.length, topOrder.diameter, topOrder.thickness, topOrder.quantity )
 		topButton = viz.addButtonLabel ( msg )
-		vizact.onbuttonup ( topButton, createTrussNew, topOrder, 'resources/chs.osgb' )
+		vizact.onbuttonup ( topButton, createTrussNew, topOrder, MEMBER_PATH )
 		row = topInventory.addRow( [topButton] )
 		topRows.append ( row )
 		vizact.onbuttonup ( topButton, updateQuantity, topOrder, topButton, ORDERS_TOP, topInventory, row )
@@ -919,7 +1164,7 @@ def populateInventory():
 	for botOrder in ORDERS_BOT:
 		msg = '{}m(l) x {}mm(d) x {}mm(th) [{}]'.format ( botOrder.length, botOrder.diameter, botOrder.thickness,  botOrder.quantity )
 		botButton = viz.addButtonLabel ( msg )
-		vizact.onbuttonup ( botButton, createTrussNew, botOrder, 'resources/chs.osgb' )
+		vizact.onbuttonup ( botButton, createTrussNew, botOrder, MEMBER_PATH )
 		row = bottomInventory.addRow ( [botButton] )
 		bottomRows.append ( row )
 		vizact.onbuttonup ( botButton, updateQuantity, botOrder, botButton, ORDERS_BOT, bottomInventory, row )
@@ -951,58 +1196,366 @@ def populateInventory():
 	inventoryCanvas.setRenderWorld([bb.width,bb.height],[1,viz.AUTO_COMPUTE])
 
 
-def createTruss(order=Order(),path=''):
+def nextMemberId():
+	global NEXT_MEMBER_ID
+	NEXT_MEMBER_ID += 1
+	return NEXT_MEMBER_ID
+
+
+def getMemberState(truss):
+	"""Return the member as a save record tuple in Side orientation coordinates"""
+	m = viz.Matrix.euler(truss.getEuler(viz.ABS_GLOBAL))
+	m.postTrans(truss.getPosition(viz.ABS_GLOBAL))
+	m.postMult(bridge_root.getGroup().getMatrix().inverse())
+	m.postMult(SIDE_ROOT_MATRIX)
+	order = truss.order
+	return ( float(order.diameter), float(order.thickness), float(order.length), int(order.quantity),
+			m.getPosition(), m.getEuler(), int(truss.orientation.value) )
+
+
+def syncMemberNode(truss):
+	"""Place a member's node from its bridge model state"""
+	diameter, thickness, length, quantity, pos, euler, orientation = bridgeModel.get(truss.memberId)
+	m = viz.Matrix.euler(euler)
+	m.postTrans(pos)
+	m.postMult(SIDE_ROOT_MATRIX.inverse())
+	m.postMult(bridge_root.getGroup().getMatrix())
+	truss.setPosition(m.getPosition(),viz.ABS_GLOBAL)
+	truss.setEuler(m.getEuler(),viz.ABS_GLOBAL)
+
+
+def recordEdit(op,truss):
+	"""Apply a committed member edit to the bridge model, the autosave journal and the live analysis"""
+	global ANALYSIS_VERSION
+	invalidateLevelOfDetail()
+	synced = ANALYSIS is not None and ANALYSIS_VERSION == bridgeModel.getVersion()
+	if op == journal.DELETE:
+		bridgeModel.remove(truss.memberId)
+		autosave.append(op,truss.memberId)
+		if synced:
+			ANALYSIS.removeMember(truss.memberId)
+	else:
+		member = getMemberState(truss)
+		bridgeModel.set(truss.memberId,member)
+		autosave.append(op,truss.memberId,member)
+		if synced:
+			ANALYSIS.setMember(truss.memberId,member)
+	#--Edits the analysis missed, e.g. loads and clears, make refreshAnalysis start over instead
+	if synced:
+		ANALYSIS_VERSION = bridgeModel.getVersion()
+
+
+def newMember(path):
+	"""Build a poolable member: CHS node with end spheres, proximity targets and sensors"""
 	truss = viz.addChild(path,cache=viz.CACHE_COPY)
-	truss.order = order
-	truss.diameter = float(order.diameter)
-	truss.thickness = float(order.thickness)
-	truss.length = float(order.length)
-	truss.quantity = int(order.quantity)
-	truss.orientation = ORIENTATION
-	truss.level = structures.Level.Horizontal
-	truss.isNewMember = False
+	truss.path = path
+	applyEnvironmentEffect(truss)
 	
-	truss.setScale([truss.length,truss.diameter*0.001,truss.diameter*0.001])	
-
-	posA = truss.getPosition()
-	posA[0] -= truss.length * 0.5
-	nodeA = vizshape.addSphere(0.3,pos=posA)
+	nodeA = vizshape.addSphere(0.3)
 	nodeA.isNode = True
 	nodeA.parent = truss
 	nodeA.index = 0
-#	nodeA.visible(False)
 	truss.nodeA = nodeA
-	truss.linkA = viz.grab(truss,nodeA)
 	
-	posB = truss.getPosition()
-	posB[0] += truss.length * 0.5
-	nodeB = vizshape.addSphere(0.3,pos=posB)
+	nodeB = vizshape.addSphere(0.3)
 	nodeB.isNode = True
 	nodeB.parent = truss
 	nodeB.index = 1
-#	nodeB.visible(False)
 	truss.nodeB = nodeB
-	truss.linkB = viz.grab(truss,nodeB)
-		
+	
 	nodeA.otherNode = nodeB
 	nodeB.otherNode = nodeA
 	truss.proxyNodes = [nodeA,nodeB]
+	truss.targetNodes = [vizproximity.Target(nodeA),vizproximity.Target(nodeB)]
+	truss.linkA = None
+	truss.linkB = None
+	return truss
+
+
+def resetMember(truss):
+	"""Restore a pooled member to the state of a freshly added one"""
+	truss.setPosition([0,0,0])
+	truss.setEuler([0,0,0])
+	truss.setScale([1,1,1])
+	truss.visible(True)
+	truss.alpha(1)
+	truss.emissive(viz.BLACK)
+	for node in truss.proxyNodes:
+		node.setEuler([0,0,0])
+		node.visible(True)
+		node.alpha(1)
+		node.enable(viz.RENDERING)
+	truss.isNewMember = False
+
+
+def releaseMember(truss):
+	"""Hide a member and drop the links moving its end nodes"""
+	releaseEndNodes(truss)
+	truss.visible(False)
+	for node in truss.proxyNodes:
+		node.visible(False)
+
+
+def destroyMember(truss):
+	for node in truss.proxyNodes:
+		node.remove()
+	truss.remove()
+
+
+def getMemberPool(path):
+	"""Return the member pool for a model path, creating it on first use"""
+	if path not in MEMBER_POOLS:
+		MEMBER_POOLS[path] = pool.Pool(lambda: newMember(path),resetMember,releaseMember,destroyMember)
+	return MEMBER_POOLS[path]
+
+
+def grabLink(src,dst):
+	"""Link dst to src while something moves, counted in the link metric"""
+	metrics.add(LINK_METRIC)
+	return viz.grab(src,dst)
+
+
+def dropLink(link):
+	if link is not None:
+		link.remove()
+		metrics.add(LINK_METRIC,-1)
+
+
+def grabEndNodes(truss):
+	"""Make both end nodes follow the member from where they are"""
+	releaseEndNodes(truss)
+	truss.linkA = grabLink(truss,truss.nodeA)
+	truss.linkB = grabLink(truss,truss.nodeB)
+
+
+def releaseEndNodes(truss):
+	dropLink(truss.linkA)
+	dropLink(truss.linkB)
+	truss.linkA = None
+	truss.linkB = None
+
+
+def linkEndNodes(truss):
+	"""Place both end nodes at the member's ends and grab them with it"""
+	posA = truss.getPosition()
+	posA[0] -= truss.length * 0.5
+	truss.nodeA.setPosition(posA)
 	
-	targetA = vizproximity.Target(truss.proxyNodes[0])
-	targetB = vizproximity.Target(truss.proxyNodes[1])
-	truss.targetNodes = [targetA,targetB]
+	posB = truss.getPosition()
+	posB[0] += truss.length * 0.5
+	truss.nodeB.setPosition(posB)
+	grabEndNodes(truss)
+
+
+def setGlobalParent(node,parent):
+	"""Reparent a node while keeping its world transform"""
+	m = node.getMatrix(viz.ABS_GLOBAL)
+	node.setParent(parent)
+	node.setMatrix(m,viz.ABS_GLOBAL)
+
+
+def placeMember(truss):
+	"""Park a member under its orientation group on the bridge root, with its end nodes at its ends and no links"""
+	releaseEndNodes(truss)
+	group = MEMBER_GROUPS[truss.orientation]
+	setGlobalParent(truss,group)
+	endA, endB = memberEnds(truss)
+	for node, pos in zip(truss.proxyNodes,(endA[0],endB[0])):
+		node.setParent(group)
+		node.setPosition(pos.tolist())
+
+
+def enablePicking(truss):
+	"""Make a placed member pickable and a highlight candidate, or refit its pick volume after it moved; loaded members wait for their commit"""
+	endA, endB = memberEnds(truss)
+	pickTree.insert(truss,endA[0],endB[0],max(truss.diameter * 0.0005,MEMBER_PICK_RADIUS),truss.orientation)
+	highlightSets.add(truss.orientation,truss)
+
+
+def liftMember(truss,withEndNodes=True):
+	"""Take a member off the bridge root so it can be moved in world coordinates"""
+	setGlobalParent(truss,viz.WORLD)
+	for node in truss.proxyNodes:
+		setGlobalParent(node,viz.WORLD)
+	if withEndNodes:
+		grabEndNodes(truss)
+
+
+def recycleTruss(truss):
+	"""Return a member to its pool, taking it off the bridge root"""
+	pickTree.remove(truss)
+	highlightSets.remove(truss.orientation,truss)
+	truss.setParent(viz.WORLD)
+	for node in truss.proxyNodes:
+		node.setParent(viz.WORLD)
+	MEMBER_POOLS[truss.path].release(truss)
+
+
+def getPoolStats():
+	"""Return pool statistics keyed by pool name"""
+	stats = dict((path,memberPool.getStats()) for path, memberPool in MEMBER_POOLS.items())
+	stats['joints'] = jointPool.getStats()
+	return stats
+
+
+def newJoint():
+	"""Build a poolable joint sphere with its snapping sensor"""
+	joint = vizshape.addSphere(0.3,parent=bridge_root.getGroup())
+	joint.isNode = True
+	joint.isJoint = True
+	joint.sensor = vizproximity.addBoundingSphereSensor(joint)
+	joint.lodRow = len(LOD_JOINTS)
+	LOD_JOINTS.append(joint)
+	return joint
+
+
+def resetJoint(joint):
+	joint.visible(True)
+	joint.alpha(1)
+	joint.emissive(viz.BLACK)
+
+
+def releaseJoint(joint):
+	joint.visible(False)
+
+
+jointPool = pool.Pool(newJoint,resetJoint,releaseJoint,lambda joint: joint.remove())
+
+
+def getSnapGroups():
+	"""Anchors and Side joints stay snappable in every orientation as guides for Top and Bottom members"""
+	return (SNAP_ANCHORS,structures.Orientation.Side,ORIENTATION)
+
+
+def createJoint(pos,orientation):
+	"""Registry callback: place a pooled joint at a bridge-local position"""
+	joint = jointPool.acquire()
+	joint.setParent(JOINT_GROUPS[orientation])
+	joint.setPosition(pos)
+	joint.orientation = orientation
+	snapIndex.insert(joint,pos,orientation)
+	pickTree.insert(joint,pos,pos,JOINT_PICK_RADIUS,orientation)
+	highlightSets.add(orientation,joint)
+	proxyManager.addToSensorSet(orientation,joint.sensor)
+	return joint
+
+
+def removeJoint(joint):
+	"""Registry callback: stop snapping to a joint and return it to the pool"""
+	proxyManager.removeFromSensorSet(joint.orientation,joint.sensor)
+	snapIndex.remove(joint)
+	pickTree.remove(joint)
+	highlightSets.remove(joint.orientation,joint)
+	jointPool.release(joint)
+
+
+jointRegistry = joints.JointRegistry(createJoint,removeJoint,JOINT_TOLERANCE)
+
+
+def refreshJoints():
+	"""Switch the registered sensors to the current orientation's prebuilt sets"""
+	proxyManager.activateSensorSets(getSnapGroups())
+refreshJoints()
+
+
+SENSOR_MUTATIONS = 0			# Proximity manager mutation count at the end of the previous frame
+def countSensorMutations():
+	"""Publish how many sensor and target registrations the last frame made"""
+	global SENSOR_MUTATIONS
+	total = proxyManager.getMutationCount()
+	frame = total - SENSOR_MUTATIONS
+	SENSOR_MUTATIONS = total
+	metrics.setValue('sensorMutationsPerFrame',frame)
+	metrics.setValue('sensorMutationsPeak',max(frame,metrics.get('sensorMutationsPeak')))
+scheduler.add(countSensorMutations,scheduler.UI)
+
+
+def publishFrameStats():
+	"""Copy the frame scheduler's timings into the metrics"""
+	for name, value in scheduler.getDefault().getStats().items():
+		metrics.setValue('scheduler.' + name,value)
+scheduler.add(publishFrameStats,scheduler.UI,rate=2)
+
+
+def publishBridgeTotals():
+	"""Copy the bridge model's running steel mass totals into the metrics"""
+	totals = bridgeModel.massTotals()
+	metrics.setValue('bridge.tonnes',totals['tonnes'])
+	for orientation, mass in totals['byOrientation'].items():
+		metrics.setValue('bridge.massKg.' + structures.Orientation(orientation).name,mass)
+	for axis, value in zip('xyz',totals['centreOfGravity']):
+		metrics.setValue('bridge.centreOfGravity.' + axis,value)
+scheduler.add(publishBridgeTotals,scheduler.UI,rate=2)
+
+
+def recordFrameTime():
+	"""Record whole frames so time spent in Python callbacks can be told apart from rendering"""
+	if instrumentation.ENABLED:
+		instrumentation.record('frame',viz.getFrameElapsed())
+scheduler.add(recordFrameTime,scheduler.INPUT)
+
+
+def updateProfiler():
+	profilerText.message(instrumentation.formatSummary())
+profilerTask = scheduler.add(updateProfiler,scheduler.UI,rate=4,deferrable=True)
+profilerTask.setEnabled(False)
+
+
+def toggleProfiler(state=None):
+	"""Start or stop recording callback timings, showing them in the profiler overlay"""
+	if state is None:
+		state = not instrumentation.isEnabled()
+	instrumentation.setEnabled(state)
+	profilerTask.setEnabled(state)
+	profilerCanvas.visible(state)
+if DEBUG_PROFILE:
+	toggleProfiler(True)
+
+
+def getBridgePosition(node):
+	"""Return a node's world position in bridge root coordinates"""
+	m = viz.Matrix.translate(node.getPosition(viz.ABS_GLOBAL))
+	m.postMult(bridge_root.getGroup().getMatrix().inverse())
+	return m.getPosition()
+
+
+def attachJoints(truss):
+	"""Share the member's ends with coincident ends of the same orientation"""
+	for node in truss.proxyNodes:
+		jointRegistry.attach(node,getBridgePosition(node),truss.orientation)
+		node.disable(viz.RENDERING)
+
+
+def detachJoints(truss):
+	"""Release the member's joints and draw its own end spheres while it moves"""
+	for node in truss.proxyNodes:
+		jointRegistry.detach(node)
+		node.enable(viz.RENDERING)
+
+
+def createTruss(order=Order(),path=''):
+	truss = getMemberPool(path).acquire()
+	truss.memberId = nextMemberId()
+	truss.order = order
+	truss.diameter = float(order.diameter)
+	truss.thickness = float(order.thickness)
+	truss.length = float(order.length)
+	truss.quantity = int(order.quantity)
+	truss.orientation = ORIENTATION
+	truss.level = structures.Level.Horizontal
+	truss.isNewMember = False
 	
-	sensorA =  vizproximity.addBoundingSphereSensor(truss.proxyNodes[0])
-	sensorB =  vizproximity.addBoundingSphereSensor(truss.proxyNodes[1])
-	truss.sensorNodes = [sensorA,sensorB]
+	truss.setScale([truss.length,truss.diameter*0.001,truss.diameter*0.001])	
 	
-	applyEnvironmentEffect(truss)	
+	# Reuse pooled end nodes, targets and sensors
+	linkEndNodes(truss)
 	
 	return truss
 
 
 def createTrussNew(order=Order(),path='',loading=False):
-	truss = viz.addChild(path,cache=viz.CACHE_COPY)
+	truss = getMemberPool(path).acquire()
+	truss.memberId = nextMemberId()
 	truss.order = order
 	truss.diameter = float(order.diameter)
 	truss.thickness = float(order.thickness)
@@ -1013,47 +1566,13 @@ def createTrussNew(order=Order(),path='',loading=False):
 	
 	truss.setScale([truss.length,truss.diameter*0.001,truss.diameter*0.001])	
 	
-	# Setup proximity-based snapping nodes
-	posA = truss.getPosition()
-	posA[0] -= truss.length * 0.5
-	nodeA = vizshape.addSphere(0.3,pos=posA)
-	nodeA.isNode = True
-	nodeA.parent = truss
-	nodeA.index = 0
-#	nodeA.visible(False)
-	truss.nodeA = nodeA
-	truss.linkA = viz.grab(truss,nodeA)
-	
-	posB = truss.getPosition()
-	posB[0] += truss.length * 0.5
-	nodeB = vizshape.addSphere(0.3,pos=posB)
-	nodeB.isNode = True
-	nodeB.parent = truss
-	nodeB.index = 1
-#	nodeB.visible(False)
-	truss.nodeB = nodeB
-	truss.linkB = viz.grab(truss,nodeB)
-	
-	nodeA.otherNode = nodeB
-	nodeB.otherNode = nodeA
-	truss.proxyNodes = [nodeA,nodeB]
-	
-	# Setup target nodes at both ends
-	targetA = vizproximity.Target(truss.proxyNodes[0])
-	targetB = vizproximity.Target(truss.proxyNodes[1])	
-	truss.targetNodes = [targetA,targetB]
-	
-	# Setup sensor nodes at both ends
-	sensorA =  vizproximity.addBoundingSphereSensor(truss.proxyNodes[0])
-	sensorB =  vizproximity.addBoundingSphereSensor(truss.proxyNodes[1])	
-	truss.sensorNodes = [sensorA,sensorB]
+	# Setup proximity-based snapping nodes from the pooled targets and sensors
+	linkEndNodes(truss)
 	
 	global BUILD_MEMBERS
 	global highlightTool
 	global proxyManager
-	global PROXY_NODES
 	global TARGET_NODES
-	global SENSOR_NODES
 	
 	global PRE_SNAP_POS	
 	global PRE_SNAP_ROT
@@ -1061,27 +1580,15 @@ def createTrussNew(order=Order(),path='',loading=False):
 	PRE_SNAP_POS = truss.getPosition()
 	PRE_SNAP_ROT = truss.getEuler()
 	
-	PROXY_NODES.append(truss.proxyNodes[0])
-	PROXY_NODES.append(truss.proxyNodes[1])
-	TARGET_NODES.append(truss.targetNodes[0])
-	TARGET_NODES.append(truss.targetNodes[1])
-	SENSOR_NODES.append(truss.sensorNodes[0])
-	SENSOR_NODES.append(truss.sensorNodes[1])
+	TARGET_NODES.extend(truss.targetNodes)
 	
 	# Enable truss nodes to interact with other sensors
-	proxyManager.addTarget(truss.targetNodes[0])
-	proxyManager.addTarget(truss.targetNodes[1])
+	proxyManager.addTargets(truss.targetNodes)
 
 	BUILD_MEMBERS.append(truss)
-	applyEnvironmentEffect(truss)
 	
-	try:
-		# Clear highlighter
-		highlightTool.clear()
-		currentTruss = [truss]
-		highlightTool.setItems(currentTruss)
-	except:
-		print 'Failed: Highlighter not initialized!'
+	# Clear highlighter; the new member is held as highlightedItem until it is placed
+	highlightSets.clear()
 	
 	if not loading:
 		global grabbedItem
@@ -1111,18 +1618,10 @@ def deleteTruss():
 	global grabbedItem
 	global isgrabbing
 	
-	PROXY_NODES.remove(grabbedItem.proxyNodes[0])
-	PROXY_NODES.remove(grabbedItem.proxyNodes[1])
-	grabbedItem.proxyNodes[0].remove()
-	grabbedItem.proxyNodes[1].remove()
-	
 	TARGET_NODES.remove(grabbedItem.targetNodes[0])
 	TARGET_NODES.remove(grabbedItem.targetNodes[1])
 	
-	SENSOR_NODES.remove(grabbedItem.sensorNodes[0])
-	SENSOR_NODES.remove(grabbedItem.sensorNodes[1])
-	proxyManager.removeSensor(grabbedItem.sensorNodes[0])
-	proxyManager.removeSensor(grabbedItem.sensorNodes[1])
+	detachJoints(grabbedItem)
 	
 	BUILD_MEMBERS.remove(grabbedItem)
 	
@@ -1130,30 +1629,17 @@ def deleteTruss():
 		proxyManager.removeTarget(grabbedItem.targetNodes[0])
 		proxyManager.removeTarget(grabbedItem.targetNodes[1])
 	else:
+		recordEdit(journal.DELETE,grabbedItem)
 		if grabbedItem.orientation == structures.Orientation.Side:
-			try:
-				grabbedItem.clonedSide.nodeA.remove()
-				grabbedItem.clonedSide.nodeB.remove()
-				SIDE_CLONES.remove(grabbedItem.clonedSide)
-				grabbedItem.clonedSide.remove()
-				grabbedItem.clonedSide = None
-			except:
-				print 'deleteTruss: No cloned side to remove!'
-		
 			SIDE_MEMBERS.remove(grabbedItem)
 		elif grabbedItem.orientation == structures.Orientation.Top:
 			TOP_MEMBERS.remove(grabbedItem)
 		elif grabbedItem.orientation == structures.Orientation.Bottom:
 			BOT_MEMBERS.remove(grabbedItem)
-		
-		try:
-			GRAB_LINKS.remove(grabbedItem.link)
-		except:
-			print 'deleteTruss: No link to remove!'
 	
-	highlightTool.clear()
+	highlightSets.clear()
 	highlightedItem = None
-	grabbedItem.remove()
+	recycleTruss(grabbedItem)
 	grabbedItem = None
 	isgrabbing = False
 	
@@ -1165,6 +1651,22 @@ def deleteTruss():
 	# Play warning sound
 	warningSound.play()
 
+def registerMembers(members):
+	"""Add members' targets to the proximity list in one batch"""
+	for member in members:
+		TARGET_NODES.extend(member.targetNodes)
+
+
+def unregisterMembers(members):
+	"""Remove members' targets and joints from the proximity list and manager in one batch"""
+	targets = set()
+	for member in members:
+		targets.update(member.targetNodes)
+		detachJoints(member)
+	TARGET_NODES[:] = [target for target in TARGET_NODES if target not in targets]
+	proxyManager.removeTargets(targets)
+
+
 def generateMembers(loading=False):
 	"""Create truss members based on order list"""
 	global BUILD_MEMBERS
@@ -1180,110 +1682,52 @@ def generateMembers(loading=False):
 	ROWS = []
 	
 	# Clear current inventory
+	unregisterMembers(BUILD_MEMBERS)
 	for member in BUILD_MEMBERS:
-		PROXY_NODES.remove(member.proxyNodes[0])
-		PROXY_NODES.remove(member.proxyNodes[1])
-		TARGET_NODES.remove(member.targetNodes[0])
-		TARGET_NODES.remove(member.targetNodes[1])
-		SENSOR_NODES.remove(member.sensorNodes[0])
-		SENSOR_NODES.remove(member.sensorNodes[1])
-		proxyManager.removeSensor(member.sensorNodes[0])
-		proxyManager.removeSensor(member.sensorNodes[1])
-		member.remove()
-		del member
-		member = None
+		recycleTruss(member)
 	BUILD_MEMBERS = []
 	
 #	clearMembers()
 	
 	for i, order in enumerate(ORDERS):
-		trussMember = createTruss(order,'resources/chs.osgb')
+		trussMember = createTruss(order,MEMBER_PATH)
 		trussMember.order = order
-		
-		PROXY_NODES.append(trussMember.proxyNodes[0])
-		PROXY_NODES.append(trussMember.proxyNodes[1])
-		TARGET_NODES.append(trussMember.targetNodes[0])
-		TARGET_NODES.append(trussMember.targetNodes[1])
-		SENSOR_NODES.append(trussMember.sensorNodes[0])
-		SENSOR_NODES.append(trussMember.sensorNodes[1])
-		proxyManager.addSensor(trussMember.sensorNodes[0])
-		proxyManager.addSensor(trussMember.sensorNodes[1])
-
 		BUILD_MEMBERS.append(trussMember)
+	registerMembers(BUILD_MEMBERS)
 
 	# Clear ORDERS
 	ORDERS = []
 
 
-def clearMembers():
+def clearMembers(journaled=True):
 	"""Delete truss members"""
 	global highlightTool
-	global PROXY_NODES
 	global TARGET_NODES
-	global SENSOR_NODES
 	global BUILD_MEMBERS
 	global SIDE_MEMBERS
 	global TOP_MEMBERS
 	global BOT_MEMBERS
-	global SIDE_CLONES
-	global GRAB_LINKS
 	
-	#--Force clear highlight
-	highlightTool.clear()
+	#--Force clear highlight; recycled members and joints leave their highlight sets
+	highlightSets.clear()
 	
-	try:
-		highlightTool.removeItems(BUILD_MEMBERS)
-		highlightTool.removeItems(PROXY_NODES)
-	except:
-		print 'clearMembers: Failed to remove highlightable items'
-	
-	highlightTool.setItems([])
 	proxyManager.clearTargets()
-			
-	for node in PROXY_NODES:
-		node.remove()
-		node = None
-		del node
-	PROXY_NODES = []
-	for target in TARGET_NODES:
-		target = None
-		del target
+	jointRegistry.clear()
 	TARGET_NODES = []
-	for sensor in SENSOR_NODES:
-		proxyManager.removeSensor(sensor)
-		sensor = None
-		del sensor
-	SENSOR_NODES = []
 	
-	# Clear previous bridge
-	for member in BUILD_MEMBERS:
-		member.remove()
-		member = None
+	# Return previous bridge to the pools, which also removes any end node links
+	for member in BUILD_MEMBERS + SIDE_MEMBERS + TOP_MEMBERS + BOT_MEMBERS:
+		recycleTruss(member)
 	BUILD_MEMBERS = []
-	for clone in SIDE_CLONES:
-		clone.nodeA.remove()
-		clone.nodeB.remove()
-		clone.remove()
-		clone = None
-	SIDE_CLONES = []
-	for member in SIDE_MEMBERS:
-		member.remove()
-		member = None
 	SIDE_MEMBERS = []
-	for member in TOP_MEMBERS:
-		member.remove()
-		member = None
 	TOP_MEMBERS = []
-	for member in BOT_MEMBERS:
-		member.remove()
-		member = None
 	BOT_MEMBERS = []
 	
-	# Clear grab links
-	for link in GRAB_LINKS:
-		link.remove()
-		link = None
-	GRAB_LINKS = []
+	#--Journal cleared bridge
+	bridgeModel.clear()
+	invalidateLevelOfDetail()
+	if journaled:
+		autosave.append(journal.CLEAR,0)
 	
 	#--Clear road
 	toggleRoad(road)
@@ -1331,151 +1775,35 @@ def toggleGrid(value=viz.TOGGLE):
 		hideMenuSound.play()
 
 def toggleMembers(side=True,sideClones=True,top=True,bottom=True):
-		for member in SIDE_MEMBERS:
-			member.visible(side)
-			member.nodeA.visible(side)
-			member.nodeB.visible(side)
-		for member in SIDE_CLONES:
-			member.visible(sideClones)
-			member.nodeA.visible(sideClones)
-			member.nodeB.visible(sideClones)
-			member.alpha(1)
-			member.nodeA.alpha(1)
-			member.nodeB.alpha(1)			
-		for member in TOP_MEMBERS:
-			member.visible(top)
-			member.nodeA.visible(top)
-			member.nodeB.visible(top)
-		for member in BOT_MEMBERS:
-			member.visible(bottom)
-			member.nodeA.visible(bottom)
-			member.nodeB.visible(bottom)
-		#--Turn all alpha values to 1 for full visibility
-		for members in BUILD_MEMBERS:
-			members.alpha(1)
-		for nodes in PROXY_NODES:
-			nodes.alpha(1)
+	shown = {structures.Orientation.Side : side, structures.Orientation.Top : top, structures.Orientation.Bottom : bottom}
+	#--Turn all alpha values to 1 for full visibility
+	styleOrientationGroups(shown,dict((orientation,1) for orientation in structures.Orientation))
+	showSideMirror(sideClones)
 
 
 def toggleHighlightables(val=True):
-	highlightTool.clear()
-	highlightables = BUILD_MEMBERS + PROXY_NODES
+	"""Make the active orientation's members and joints highlightable, or nothing"""
+	highlightSets.clear()
 	if val is True:
-		highlightTool.setItems([])
-		highlightTool.setItems(highlightables)
+		highlightSets.activate([ORIENTATION])
 	else:
-		highlightTool.removeItems(highlightables)
-		highlightTool.setItems([])
-
-def getOrientationHighlightables():
-	highlightTool.clear()
-	highlightables = []
-	
-	if ORIENTATION is structures.Orientation.Top:	
-		for member in SIDE_CLONES:
-			member.visible(True)
-			member.nodeA.visible(True)
-			member.nodeB.visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.nodeA.alpha(INACTIVE_ALPHA)
-			member.nodeB.alpha(INACTIVE_ALPHA)
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.proxyNodes[0].alpha(INACTIVE_ALPHA)
-			member.proxyNodes[1].alpha(INACTIVE_ALPHA)			
-		for member in BOT_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in TOP_MEMBERS:
-			member.visible(True)	
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)			
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])
-	elif ORIENTATION is structures.Orientation.Bottom:
-		for member in SIDE_CLONES:
-			member.visible(True)
-			member.nodeA.visible(True)
-			member.nodeB.visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.nodeA.alpha(INACTIVE_ALPHA)
-			member.nodeB.alpha(INACTIVE_ALPHA)		
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			#--Lower opacity of guide truss members
-			member.alpha(INACTIVE_ALPHA)
-			member.proxyNodes[0].alpha(INACTIVE_ALPHA)
-			member.proxyNodes[1].alpha(INACTIVE_ALPHA)				
-		for member in TOP_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in BOT_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)	
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)			
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])
-	elif ORIENTATION is structures.Orientation.Side:			
-		for member in SIDE_CLONES:
-			member.visible(False)
-			member.nodeA.visible(False)
-			member.nodeB.visible(False)			
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)	
-			#--Set opacity of side truss to 1
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)				
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])			
-		for member in TOP_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in BOT_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-	return highlightables
+		highlightSets.activate([])
+
+def getOrientationMembers(orientation):
+	if orientation == structures.Orientation.Top:
+		return TOP_MEMBERS
+	elif orientation == structures.Orientation.Bottom:
+		return BOT_MEMBERS
+	return SIDE_MEMBERS
+
+def refreshHighlightables():
+	"""Show the active orientation and make its members and joints the highlight candidates"""
+	highlightSets.clear()
+	showOrientation(ORIENTATION)
+	
+	#--Joints of the active orientation double as rotation handles
+	refreshJoints()
+	highlightSets.activate([ORIENTATION])
 	
 
 def toggleUtility(val=viz.TOGGLE):
@@ -1525,6 +1853,7 @@ def toggleMenu(val=viz.TOGGLE):
 		glove.visible(False)
 		SHOW_HIGHLIGHTER = False
 		createConfirmButton()
+		populateSaveBrowser()
 		showMenuSound.play()
 	else:
 		hideMenuSound.play()
@@ -1585,23 +1914,47 @@ objToRotate = None
 isrotating = False
 rotatingItem = None
 
+PICKED_ITEM = None				# Member or joint under the glove ray, picked from pickTree
+
 def updateHighlightTool(highlightTool):	
+	"""Pick against pickTree instead of the whole scene; GUI canvases handle their own mouse picking"""
 	if SHOW_HIGHLIGHTER == True:
-		highlightTool.highlight()
+		if grabbedItem is None and not isrotating:
+			setPickedItem(pickItem())
 	else:
-		highlightTool.clear()
-		return
-		
-	if highlightTool.getSelection() is None:
+		if PICKED_ITEM is not None:
+			setPickedItem(None)
+
+def pickItem():
+	"""Return the highlight candidate nearest along the glove ray, or None"""
+	line = highlightTool.getRayCaster().getLineForward()
+	begin = line.getBegin()
+	toBridge = bridge_root.getGroup().getMatrix().inverse()
+	ray = transformPoints([begin,numpy.add(begin,line.getDir())],toBridge)
+	item, distance = pickTree.raycast(ray[0],ray[1] - ray[0],HIGHLIGHT_DISTANCE,groups=highlightSets.getActiveSets())
+	return item
+
+def setPickedItem(item):
+	"""Tint the picked item and raise the highlight event when it changes or highlightedItem was reset"""
+	global PICKED_ITEM
+	if item is PICKED_ITEM and item is highlightedItem:
 		return
+	old = PICKED_ITEM
+	PICKED_ITEM = item
+	if old is not None:
+		old.emissive(viz.BLACK)
+	if item is not None:
+		item.emissive(HIGHLIGHT_COLOR)
+	onHighlight(viz.Data(new=item,old=old))
 
 # Register a callback function for the highlight event
+@instrumentation.timed
 def onHighlight(e):
 	global highlightedItem
 	global rotatingItem
 	
 	#--Force clear
-	highlightTool.clear()
+	highlightSets.clear()
 	highlightedItem = None
 	rotatingItem = None
 	inspectMember(None)
@@ -1610,12 +1963,16 @@ def onHighlight(e):
 		highlightedItem = e.new
 		if hasattr(e.new,'length'):
 			inspectMember(highlightedItem)
+		elif hasattr(e.new,'isJoint'):
+			#--Rotate the member end attached to the joint most recently
+			if jointRegistry.getRefCount(e.new) > 0:
+				rotatingItem = jointRegistry.getOwners(e.new)[-1]
 		elif hasattr(e.new,'isNode'):
 #			print 'onHighlight: Node parent is',e.new.parent
 			rotatingItem = e.new
 	else:
 		#--Force clear highlight
-		highlightTool.clear()
+		highlightSets.clear()
 		highlightedItem = None
 		rotatingItem = None
 		inspectMember(None)
@@ -1623,22 +1980,83 @@ def onHighlight(e):
 viz.callback(highlighter.HIGHLIGHT_EVENT,onHighlight)
 
 
+#--Grab updates are skipped while the glove ray and the member's spin stay still
+grabGate = motion.MotionGate()
+grabVelocity = motion.VelocityPredictor()
+snapPreview = vizshape.addSphere(0.35)
+snapPreview.color(viz.GREEN)
+snapPreview.alpha(0.5)
+snapPreview.disable(viz.INTERSECTION)
+snapPreview.visible(False)
+
 def onHighlightGrab():
 	""" Clamp grabbed member to front glove position and grid z """
 	global grabbedItem
 	global isgrabbing
-	if grabbedItem is not None and isgrabbing is True:	
-		raycaster = highlightTool.getRayCaster()
-		startPos = raycaster.getPosition()
-#		print startPos
-		dist = mathlite.math.fabs(startPos[2] - GRID_Z)
-#		print dist
-#		newPoint = raycaster.getLineForward(length=dist).getEnd()
-#		print newPoint
-		newPos = raycaster.getLineForward().endFromDistance(dist)
-		newPos[2] = GRID_Z
-		grabbedItem.setPosition(newPos)
-vizact.ontimer(0,onHighlightGrab)
+	if grabbedItem is None or isgrabbing is not True:
+		grabGate.reset()
+		grabVelocity.reset()
+		if snapPreview.getVisible():
+			snapPreview.visible(False)
+		return
+	raycaster = highlightTool.getRayCaster()
+	startPos = raycaster.getPosition()
+	if not grabGate.moved(startPos,raycaster.getEuler() + grabbedItem.getEuler()):
+		metrics.add('grabFramesSkipped')
+		settleSnapPreview()
+		return
+#	print startPos
+	dist = mathlite.math.fabs(startPos[2] - GRID_Z)
+#	print dist
+#	newPoint = raycaster.getLineForward(length=dist).getEnd()
+#	print newPoint
+	newPos = raycaster.getLineForward().endFromDistance(dist)
+	newPos[2] = GRID_Z
+	grabbedItem.setPosition(newPos)
+	snapTask.markDirty()
+	metrics.add('grabFramesUpdated')
+scheduler.add(onHighlightGrab,scheduler.INTERACTION)
+
+def settleSnapPreview():
+	"""Once the hand stops, drop the look-ahead and preview the snap a release would make"""
+	if not any(grabVelocity.getVelocity()):
+		return
+	grabVelocity.reset()
+	snapPreview.visible(VALID_SNAP)
+	if VALID_SNAP:
+		snapPreview.setPosition(SNAP_TO_POS)
+
+def snapGrabbed():
+	"""Snapping phase: re-run the snap query after the grabbed member moved"""
+	if grabbedItem is not None and isgrabbing is True:
+		updateSnap(grabbedItem)
+snapTask = scheduler.add(snapGrabbed,scheduler.SNAPPING,whenDirty=True)
+
+def updateSnap(truss):
+	"""Snap to the active joint or anchor nearest either end of the grabbed member"""
+	global SNAP_TARGET
+	global SNAP_TO_POS
+	global VALID_SNAP
+	bridge = bridge_root.getGroup().getMatrix()
+	endA, endB = memberEnds(truss,viz.ABS_GLOBAL)
+	ends = transformPoints(numpy.concatenate((endA,endB)),bridge.inverse())
+	target, end, distance = snapIndex.nearestToAny(ends.tolist(),groups=getSnapGroups())
+	SNAP_TARGET = target
+	VALID_SNAP = target is not None
+	if VALID_SNAP:
+		SNAP_TO_POS = transformPoints([snapIndex.getPosition(target)],bridge)[0].tolist()
+	
+	#--Preview the snap the member is heading for, a frame or two before it gets there
+	center = truss.getPosition(viz.ABS_GLOBAL)
+	grabVelocity.update(center,viz.tick())
+	shift = numpy.subtract(grabVelocity.predict(),center)
+	ahead = transformPoints(numpy.concatenate((endA,endB)) + shift,bridge.inverse())
+	preview, end, distance = snapIndex.nearestToAny(ahead.tolist(),groups=getSnapGroups())
+	if preview is None:
+		preview = target
+	snapPreview.visible(preview is not None)
+	if preview is not None:
+		snapPreview.setPosition(transformPoints([snapIndex.getPosition(preview)],bridge)[0].tolist())
 
 def onHighlightGrab2():
 	global grabbedItem
@@ -1661,11 +2079,10 @@ def onRelease(e=None):
 	global PRE_SNAP_POS
 	global PRE_SNAP_ROT
 	global SNAP_TO_POS
+	global SNAP_TARGET
 	global VALID_SNAP
 	global bridge_root
-	global GRAB_LINKS
 	global SHOW_HIGHLIGHTER
-	global PROXY_NODES
 	global highlightTool
 	
 #	print 'OnRelease: VALID_SNAP is',VALID_SNAP
@@ -1673,12 +2090,13 @@ def onRelease(e=None):
 #	print 'OnRelease: PRE_SNAP_POS is', PRE_SNAP_POS
 	
 	if VALID_SNAP:
+		editOp = journal.MOVE
 		# If new member, group appropriately
 		if grabbedItem.isNewMember == True:
+			editOp = journal.CREATE
 			grabbedItem.orientation = ORIENTATION
 			if ORIENTATION == structures.Orientation.Side:		
 				SIDE_MEMBERS.append(grabbedItem)
-				grabbedItem.clonedTruss = cloneSide(grabbedItem)
 			elif ORIENTATION == structures.Orientation.Top:
 				TOP_MEMBERS.append(grabbedItem)
 			elif ORIENTATION == structures.Orientation.Bottom:
@@ -1702,53 +2120,47 @@ def onRelease(e=None):
 
 		clampedX =  viz.clamp(grabbedItem.getPosition()[0],-10 + xOffset,10 - xOffset)
 		clampedY =  viz.clamp(grabbedItem.getPosition()[1],2,10)
-		grabbedItem.setPosition( [SNAP_TO_POS[0] + xOffset, SNAP_TO_POS[1] + yOffset, SENSOR_NODE.getPosition()[2]] )
+		grabbedItem.setPosition( [SNAP_TO_POS[0] + xOffset, SNAP_TO_POS[1] + yOffset, SNAP_TO_POS[2]] )
 		grabbedItem.setEuler( [0,0,grabbedItem.getEuler()[2]] )
 		
-		# Enable sensor nodes for other members to snap to
-		proxyManager.addSensor(grabbedItem.sensorNodes[0])
-		proxyManager.addSensor(grabbedItem.sensorNodes[1])
+		# Put it back on the bridge and share joints for other members to snap to
+		placeMember(grabbedItem)
+		enablePicking(grabbedItem)
+		attachJoints(grabbedItem)
+		
+		recordEdit(editOp,grabbedItem)
 		
 		# Play snap MUTE
 		clickSound.play()
 	else:
 		# If invalid position and newly-generated truss, destroy it
 		if grabbedItem.isNewMember == True:
-			highlightTool.clear()
+			highlightSets.clear()
 			BUILD_MEMBERS.remove(grabbedItem)
 			proxyManager.removeTarget(grabbedItem.targetNodes[0])
 			proxyManager.removeTarget(grabbedItem.targetNodes[1])
-			PROXY_NODES.remove(grabbedItem.proxyNodes[0])
-			PROXY_NODES.remove(grabbedItem.proxyNodes[1])
-			grabbedItem.proxyNodes[0].remove()
-			grabbedItem.proxyNodes[1].remove()
-			grabbedItem.remove()
+			recycleTruss(grabbedItem)
 			highlightedItem = None
 			grabbedItem = None
 		else:	
 			grabbedItem.setPosition(PRE_SNAP_POS)
 			grabbedItem.setEuler(PRE_SNAP_ROT)
-			# Enable sensor nodes for other members to snap to
-			proxyManager.addSensor(grabbedItem.sensorNodes[0])
-			proxyManager.addSensor(grabbedItem.sensorNodes[1])
+			# Put it back on the bridge and share joints for other members to snap to
+			placeMember(grabbedItem)
+			enablePicking(grabbedItem)
+			attachJoints(grabbedItem)
 		
 		# Play warning sound
 		warningSound.play()
 			
-	# Re-grab existing Build members
-#	for members in BUILD_MEMBERS:
-#		link = viz.grab(bridge_root,members)
-#		GRAB_LINKS.append(link)
 	if grabbedItem is not None:
-		link = viz.grab(bridge_root.getGroup(),grabbedItem)
-		GRAB_LINKS.append(link)
-		grabbedItem.link = link
-	
 		# Disable truss member target nodes on release
 		proxyManager.removeTarget(grabbedItem.targetNodes[0])
 		proxyManager.removeTarget(grabbedItem.targetNodes[1])
 		
 	SNAP_TO_POS = []
+	SNAP_TARGET = None
+	VALID_SNAP = False
 	
 	# Clear item references
 	highlightedItem = None
@@ -1760,49 +2172,11 @@ def onRelease(e=None):
 	if MODE != structures.Mode.Edit:
 		cycleMode(structures.Mode.Build)
 	else:
-		highlightTool.setItems(getOrientationHighlightables())
+		refreshHighlightables()
 
 
-def cloneSide(truss):
-	pos = truss.getPosition()
-	rot = truss.getEuler()
-	scale = truss.getScale()
-	
-	#--Check for truss level
-	pos[2] *= -1
-		
-	clone = truss.clone()
-	clone.setScale(scale)
-	clone.setPosition(pos)
-	clone.setEuler(rot)
-	
-	truss.clonedSide = clone
-	
-	#--Create spherical connectors
-	posA = truss.proxyNodes[0].getPosition()
-	posA[2] = pos[2]
-	nodeA = vizshape.addSphere(0.3,pos=posA)
-	clone.nodeA = nodeA
-	viz.grab(clone,nodeA)
-	
-	posB = truss.proxyNodes[1].getPosition()
-	posB[2] = pos[2]
-	nodeB = vizshape.addSphere(0.3,pos=posB)
-	clone.nodeB = nodeB
-	viz.grab(clone,nodeB)
-	
-	#--Grab clone with truss
-	viz.grab(truss,clone)
-	
-	#--Add clone to list
-	SIDE_CLONES.append(clone)
-	
-	#--Toggle visibility of side clones
-	clone.visible(False)
-	nodeA.visible(False)
-	nodeB.visible(False)
-	
-	return clone
+def showSideMirror(state):
+	sideMirror.visible(state)
 
 
 def toggleRoad(road):
@@ -1864,7 +2238,7 @@ def rotateTruss():
 	else:
 		#--Hide rotation GUI
 		rotationCanvas.visible(False)
-vizact.ontimer(0,rotateTruss)
+scheduler.add(rotateTruss,scheduler.INTERACTION)
 
 global isSpinning
 isSpinning = False
@@ -1879,32 +2253,26 @@ def spinTruss(truss):
 		isSpinning = False
 	
 	
-def resetSensors():
-	proxyManager.clearSensors()
-	proxyManager.addSensor(pinAnchorSensor)
-	proxyManager.addSensor(rollerAnchorSensor)
-
-	
+@instrumentation.timed
 def cycleOrientation(val):
 	global ORIENTATION
 	global grabbedItem
 	global grid_root
 	
 	#--Force clear highlight
-	highlightTool.clear()
+	highlightSets.clear()
 
 	if MODE is structures.Mode.View or MODE is structures.Mode.Walk:
 		return
 	
 	if grabbedItem is not None or isrotating is True:
 		return
-		
+	
+	if isloading:
+		return
+	
 	pos = []
 	rot = []
-
-	resetSensors()
-	highlightables = []	#--Define highlightables
-	highlightTool.setItems([])
 	
 	for model in supports:
 		model.alpha(SUPPORT_ALPHA)	
@@ -1914,127 +2282,29 @@ def cycleOrientation(val):
 		rot = TOP_VIEW_ROT
 		pos = TOP_VIEW_POS
 		pos[2] = TOP_CACHED_Z
-		
-		for member in SIDE_CLONES:
-			member.visible(True)
-			member.nodeA.visible(True)
-			member.nodeB.visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.nodeA.alpha(INACTIVE_ALPHA)
-			member.nodeB.alpha(INACTIVE_ALPHA)
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.proxyNodes[0].alpha(INACTIVE_ALPHA)
-			member.proxyNodes[1].alpha(INACTIVE_ALPHA)			
-		for member in BOT_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in TOP_MEMBERS:
-			member.visible(True)	
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)			
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])
 		grid_root.setInfoMessage(VIEW_MESSAGE)
 	elif val == structures.Orientation.Bottom:
 		rot = BOT_VIEW_ROT
 		pos = BOT_VIEW_POS
 		pos[2] = BOT_CACHED_Z
-		
-		for member in SIDE_CLONES:
-			member.visible(True)
-			member.nodeA.visible(True)
-			member.nodeB.visible(True)
-			member.alpha(INACTIVE_ALPHA)
-			member.nodeA.alpha(INACTIVE_ALPHA)
-			member.nodeB.alpha(INACTIVE_ALPHA)		
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)
-			#--Lower opacity of guide truss members
-			member.alpha(INACTIVE_ALPHA)
-			member.proxyNodes[0].alpha(INACTIVE_ALPHA)
-			member.proxyNodes[1].alpha(INACTIVE_ALPHA)				
-		for member in TOP_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in BOT_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)	
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)			
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])
 		grid_root.setInfoMessage(VIEW_MESSAGE)
 	else:
 		rot = SIDE_VIEW_ROT
 		pos = BRIDGE_ROOT_POS
-		
-		for member in SIDE_CLONES:
-			member.visible(False)
-			member.nodeA.visible(False)
-			member.nodeB.visible(False)			
-		for member in SIDE_MEMBERS:
-			member.visible(True)
-			proxyManager.addSensor(member.sensorNodes[0])
-			proxyManager.addSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(True)
-			member.proxyNodes[1].visible(True)	
-			#--Set opacity of side truss to 1
-			member.alpha(1)
-			member.proxyNodes[0].alpha(1)
-			member.proxyNodes[1].alpha(1)				
-			#--Add to highlight
-			highlightables.append(member)
-			highlightables.append(member.proxyNodes[0])
-			highlightables.append(member.proxyNodes[1])			
-		for member in TOP_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
-		for member in BOT_MEMBERS:
-			member.visible(False)
-			proxyManager.removeSensor(member.sensorNodes[0])
-			proxyManager.removeSensor(member.sensorNodes[1])
-			member.proxyNodes[0].visible(False)
-			member.proxyNodes[1].visible(False)
 		grid_root.setInfoMessage(SIDE_VIEW_MESSAGE)
 	
+	#--Group-level visibility and alpha, then the active orientation's members are highlightable
+	showOrientation(val)
+	
+	#--Joints of the active orientation double as rotation handles
+	refreshJoints()
+	
 	#--Set new position and rotation
 	bridge_root.getGroup().setEuler(rot)
 	bridge_root.getGroup().setPosition(pos)
 	
-	#--Set new highlights
-	highlightTool.setItems(highlightables)
+	#--Swap highlight candidates to the new orientation's set
+	highlightSets.activate([val])
 	
 	# Show feedback
 	runFeedbackTask(str(ORIENTATION.name) + ' View')
@@ -2052,9 +2322,9 @@ def cycleMode(mode=structures.Mode.Add):
 	global highlightedItem
 	
 	#--Force clear highlight
-	highlightTool.clear()
+	highlightSets.clear()
 	
-	if isrotating: 
+	if isrotating or isloading: 
 		return
 	if MODE == structures.Mode.Add and grabbedItem is not None:
 		return
@@ -2065,6 +2335,9 @@ def cycleMode(mode=structures.Mode.Add):
 	
 	MODE = mode
 	
+	if LOD_ACTIVE:
+		showLevelOfDetail(False)
+	
 	toggleEnvironment(False)
 	toggleGrid(True)
 	glove.visible(False)
@@ -2085,10 +2358,7 @@ def cycleMode(mode=structures.Mode.Add):
 		# Clear highlighter
 		SHOW_HIGHLIGHTER = False
 		highlightedItem = None
-		highlightTool.clear()
-		highlightTool.removeItems(BUILD_MEMBERS)
-		highlightTool.removeItems(PROXY_NODES)
-		highlightTool.setItems([])
+		highlightSets.activate([])
 		
 		#--If cached mode is View or Walk, reset to build position
 		if CACHED_MODE is structures.Mode.View or CACHED_MODE is structures.Mode.Walk:
@@ -2108,12 +2378,8 @@ def cycleMode(mode=structures.Mode.Add):
 		if info_root.getVisible() is True:
 			info_root.visible(False)
 			
-		# Clear highlighter
-		highlightTool.clear()
-		highlightTool.removeItems(BUILD_MEMBERS)
-		highlightTool.setItems([])
-		highlightables = BUILD_MEMBERS + PROXY_NODES
-		highlightTool.setItems(highlightables)
+		# Highlight the active orientation's members and joints
+		highlightSets.activate([ORIENTATION])
 		SHOW_HIGHLIGHTER = True
 		
 		#--If cached mode is View or Walk, reset to build position
@@ -2143,16 +2409,14 @@ def cycleMode(mode=structures.Mode.Add):
 		bridge_root.getGroup().setEuler(SIDE_VIEW_ROT)
 		navigator.setNavAbility()
 		
-		# Show all truss members
+		# Show all truss members, drawn by distance
 		toggleMembers()
+		showLevelOfDetail(True)
 		
 		# Clear highlighter
 		SHOW_HIGHLIGHTER = False
 		highlightedItem = None
-		highlightTool.clear()
-		highlightTool.removeItems(BUILD_MEMBERS)
-		highlightTool.removeItems(PROXY_NODES)
-		highlightTool.setItems([])
+		highlightSets.activate([])
 		
 		# Hide supports
 		for model in supports:
@@ -2170,16 +2434,14 @@ def cycleMode(mode=structures.Mode.Add):
 		navigator.setEuler(WALK_ROT)
 		navigator.setNavAbility(elevate=False)
 		
-		# Show all truss members
+		# Show all truss members, drawn by distance
 		toggleMembers()
+		showLevelOfDetail(True)
 	
 		# Clear highlighter
 		SHOW_HIGHLIGHTER = False
 		highlightedItem = None
-		highlightTool.clear()
-		highlightTool.removeItems(BUILD_MEMBERS)
-		highlightTool.removeItems(PROXY_NODES)
-		highlightTool.setItems([])
+		highlightSets.activate([])
 		
 		# Hide supports
 		for model in supports:
@@ -2217,9 +2479,12 @@ def cycleView(index):
 
 
 # Setup Callbacks and Events
+@instrumentation.timed
 def onKeyUp(key):
 	if key == KEYS['esc']:
-		if utilityCanvas.getVisible() is True:
+		if isloading:
+			cancelLoad()
+		elif utilityCanvas.getVisible() is True:
 			toggleUtility(False)
 		elif menuCanvas.getVisible() is True:
 			toggleMenu(False)
@@ -2273,19 +2538,31 @@ def onKeyUp(key):
 	elif key == KEYS['capslock']:
 		runFeedbackTask('Caps Lock')
 		warningSound.play()
+	elif key == KEYS['profiler']:
+		toggleProfiler()
+	elif key == KEYS['analyze'] or key == KEYS['analyze'].upper():
+		toggleAnalysis()
+		clickSound.play()
+	elif key == KEYS['loadCases'] or key == KEYS['loadCases'].upper():
+		checkLoadCases()
+		clickSound.play()
 
 
+@instrumentation.timed
 def onKeyDown(key):
 	if key == KEYS['snapMenu']:
 #		toggleMenuLink()
 		pass
 
 
+@instrumentation.timed
 def onJoyButton(e):
 	KEYS = navigator.KEYS
 	
 	if e.button == KEYS['esc']:
-		if utilityCanvas.getVisible() is True:
+		if isloading:
+			cancelLoad()
+		elif utilityCanvas.getVisible() is True:
 			toggleUtility(False)
 		elif menuCanvas.getVisible() is True:
 			toggleMenu(False)
@@ -2389,8 +2666,8 @@ def slideRootHat():
 			pos[2] = clampedZ
 			BOT_CACHED_Z = pos[2]
 		bridge_root.getGroup().setPosition(pos)
-		bridge_root.getGroup().setPosition(pos)
 	
+@instrumentation.timed
 def onHatChange(e):
 	global SLIDE_VAL
 	SLIDE_VAL = e.value
@@ -2426,8 +2703,8 @@ def onHatChange(e):
 				inventoryTabPanel.selectPanel(inventoryTabPanel.panels.count-1)
 			clickSound.play()
 
+@instrumentation.timed
 def onMouseDown(button):
-	global GRAB_LINKS
 	global proxyManager
 	global PRE_SNAP_POS
 	global PRE_SNAP_ROT
@@ -2455,26 +2732,23 @@ def onMouseDown(button):
 			rotationCanvas.visible(True)
 			
 			newParentNode = None
-			#--Break links
-			try:
-				GRAB_LINKS.remove(rotatingItem.parent.link)
-				rotatingItem.parent.link.remove()
-				rotatingItem.parent.link = None
-			except:
-				print 'No link'
+			#--Take the member off the bridge; the rotation chain moves its nodes instead of end node links
+			detachJoints(rotatingItem.parent)
+			liftMember(rotatingItem.parent,withEndNodes=False)
 			#--Link with opposing node as main
 			if rotatingItem == rotatingItem.parent.proxyNodes[0]:
 				newParentNode = rotatingItem.parent.proxyNodes[1]
 			else:
 				newParentNode = rotatingItem.parent.proxyNodes[0]
 			#--New grab chain
-			rotateLinkA = viz.grab(newParentNode,rotatingItem.parent)
-			rotateLinkB = viz.grab(rotatingItem.parent,rotatingItem)
+			rotateLinkA = grabLink(newParentNode,rotatingItem.parent)
+			rotateLinkB = grabLink(rotatingItem.parent,rotatingItem)
 			objToRotate = newParentNode
 			isrotating = True
 			print 'onMouseDown: objToRotate is',objToRotate,'and isrotating is',isrotating
 
 
+@instrumentation.timed
 def onMouseUp(button):	
 	global isgrabbing
 	global grabbedItem
@@ -2482,7 +2756,6 @@ def onMouseUp(button):
 	global PRE_SNAP_POS
 	global PRE_SNAP_ROT
 	global grabbedRotation
-	global GRAB_LINKS
 	global bridge_root
 	global SNAP_TO_POS
 	global objToRotate
@@ -2497,20 +2770,19 @@ def onMouseUp(button):
 			onRelease()
 		#--Grab onto rotation node
 		elif isrotating is True and objToRotate is not None:
-			rotateLinkA.remove()
+			dropLink(rotateLinkA)
 			rotateLinkA = None
-			rotateLinkB.remove()
+			dropLink(rotateLinkB)
 			rotateLinkB = None
 			
 			truss = objToRotate.parent
 			otherNode = objToRotate.otherNode
 			print 'Node', objToRotate, 'Other', otherNode
-			viz.grab(truss,objToRotate)
-			viz.grab(truss,otherNode)
-			link = viz.grab(bridge_root.getGroup(),truss)			
-			GRAB_LINKS.append(link)
-			truss.link = link
+			placeMember(truss)
+			enablePicking(truss)
+			attachJoints(truss)
 			isgrabbing = False
+			recordEdit(journal.ROTATE,truss)
 			print 'MouseUp: Regrabbing '
 		#--Check if still highlighting before attempting to grab truss
 		elif highlightedItem is None:
@@ -2520,13 +2792,6 @@ def onMouseUp(button):
 		elif isgrabbing is True and highlightedItem is not None and isrotating is False:
 			grabbedItem = highlightedItem
 			print 'MouseUp: Grabbing onto', grabbedItem.length,'m truss'
-			try:
-				GRAB_LINKS.remove(grabbedItem.link)
-				grabbedItem.link.remove()
-				grabbedItem.link = None
-			except:
-				print 'No link'
-			
 			#--Disable highlighting
 			toggleHighlightables(False)
 			
@@ -2534,9 +2799,9 @@ def onMouseUp(button):
 			proxyManager.addTarget(grabbedItem.targetNodes[0])
 			proxyManager.addTarget(grabbedItem.targetNodes[1])
 			
-			# Disable truss member sensor nodes
-			proxyManager.removeSensor(grabbedItem.sensorNodes[0])
-			proxyManager.removeSensor(grabbedItem.sensorNodes[1])
+			# Leave shared joints so the member cannot snap to its own ends, then lift it off the bridge
+			detachJoints(grabbedItem)
+			liftMember(grabbedItem)
 			
 			PRE_SNAP_POS = grabbedItem.getPosition()
 			PRE_SNAP_ROT = grabbedItem.getEuler()
@@ -2562,6 +2827,7 @@ def onMouseUp(button):
 			deleteTruss()
 
 
+@instrumentation.timed
 def onSlider(obj,pos):
 	global objToRotate
 	if obj == rotationSlider:
@@ -2577,6 +2843,7 @@ def onSlider(obj,pos):
 		quantitySlider.message(str(displayedQty))
 		
 
+@instrumentation.timed
 def onList(e):
 	if e.object == diameterDropList:
 		thicknesses = []
@@ -2585,6 +2852,9 @@ def onList(e):
 			thicknesses.append(thickness.text)
 		thicknessDropList.clearItems()
 		thicknessDropList.addItems(thicknesses)
+	
+	if e.object == saveSortDropList or e.object == saveFilterDropList:
+		populateSaveBrowser()
 		
 	if e.object == inventoryTabPanel.tabGroup:
 		if e.newSel == 0:
@@ -2597,94 +2867,291 @@ def onList(e):
 	clickSound.play()
 	
 		
-# Saves current Build members' truss dimensions, position, rotation to './data/bridge#.csv'
+# Turns live self-weight analysis of the Build members on or off
+def toggleAnalysis():
+	global ANALYSIS
+	
+	if ANALYSIS is not None:
+		ANALYSIS = None
+		analysisTask.setEnabled(False)
+		runFeedbackTask('Analysis off')
+		return
+	
+	if bridgeModel.getCount() == 0:
+		runFeedbackTask('Nothing to analyze!')
+		warningSound.play()
+		return
+	
+	resetAnalysis()
+	analysisTask.setEnabled(True)
+
+
+def resetAnalysis():
+	"""Factorize the whole bridge afresh, after which member edits are applied incrementally"""
+	global ANALYSIS
+	global ANALYSIS_VERSION
+	global ANALYSIS_SOLVED
+	slots = bridgeModel.active()
+	ANALYSIS = analysis.Reanalysis(bridgeModel.toRecords(slots),bridgeModel.id[slots])
+	ANALYSIS_VERSION = bridgeModel.getVersion()
+	ANALYSIS_SOLVED = -1
+
+
+def refreshAnalysis():
+	"""Re-solve the live analysis once per bridge change and report whether the bridge stands"""
+	global ANALYSIS_SOLVED
+	if ANALYSIS is None or ANALYSIS_SOLVED == bridgeModel.getVersion() or isloading:
+		return
+	if ANALYSIS_VERSION != bridgeModel.getVersion():
+		resetAnalysis()
+	
+	solution = ANALYSIS.solve()
+	ANALYSIS_SOLVED = bridgeModel.getVersion()
+	summary = solution.getSummary()
+	for key, value in ANALYSIS.timings.items():
+		metrics.setValue('analysis.' + key + 'Ms',value * 1000.0)
+	metrics.setValue('analysis.rebuilds',ANALYSIS.rebuilds)
+	
+	if not solution.stable:
+		runFeedbackTask('Unstable! {} loose ends'.format(summary['danglingNodes']))
+		warningSound.play()
+	else:
+		runFeedbackTask('Stands! Sag {:.1f} mm, max force {:.0f} kN'.format(summary['maxDisplacement'] * 1000.0,
+						max(summary['maxTension'],summary['maxCompression']) / 1000.0))
+analysisTask = scheduler.add(refreshAnalysis,scheduler.UI)
+analysisTask.setEnabled(False)
+	
+		
+# Checks the Build members under the standard load cases and reports the governing envelope
+def checkLoadCases():
+	if bridgeModel.getCount() == 0:
+		runFeedbackTask('Nothing to analyze!')
+		warningSound.play()
+		return None
+	
+	start = viz.tick()
+	cases = loadcases.LoadCases(bridgeModel.toRecords())
+	cases.addStandard()
+	results = cases.solve()
+	metrics.setValue('loadCases.ms',(viz.tick() - start) * 1000.0)
+	loadcases.printReport(results)
+	
+	if not results.stable:
+		runFeedbackTask('Unstable! {} loose ends'.format(len(cases.getStructure().danglingNodes())))
+		warningSound.play()
+	else:
+		envelope = results.envelope(results.combinations()[1])
+		runFeedbackTask('ULS envelope: tension {:.0f} kN, compression {:.0f} kN'.format(max(envelope['max'].max(),0.0) / 1000.0,
+						max(-envelope['min'].min(),0.0) / 1000.0))
+	return results
+	
+		
+# Saves current Build members' truss dimensions, position, rotation to './data/saves/bridge#.tbb' (or '.csv' for export)
 def SaveData():
 	global BUILD_MEMBERS
 		
 	# Play MUTE
 	clickSound.play()
 	
-	filePath = vizinput.fileSave(file='Bridge',filter=[('CSV Files','*.csv')],directory='./data/saves')		
+	filePath = vizinput.fileSave(file='Bridge',filter=SAVE_FILTER,directory=SAVES_DIRECTORY)		
 	if filePath == '':
 		return
 		
-	if not '.csv' in filePath:
-		filePath += '.csv'
+	if bridgeio.formatFromPath(filePath) == bridgeio.FORMAT_BINARY and not filePath.lower().endswith(bridgeio.BINARY_EXTENSION):
+		filePath += bridgeio.BINARY_EXTENSION
 	
-	cachedOrientation = ORIENTATION
-	cycleOrientation(structures.Orientation.Side)
+	for memberId, reason in bridgeModel.validate():
+		viz.logWarn('SaveData: Member', memberId, reason)
+	for memberId, otherId in jointTree.duplicateMembers(JOINT_TOLERANCE).tolist():
+		viz.logWarn('SaveData: Members', memberId, 'and', otherId, 'overlap')
 	
-	with open(filePath,'wb') as f:
-		writer = csv.writer(f)
-		for truss in BUILD_MEMBERS:
-			writer.writerow([str(truss.order.diameter),str(truss.order.thickness),str(truss.order.length),str(truss.order.quantity),
-							str(truss.getPosition()[0]), str(truss.getPosition()[1]),str(truss.getPosition()[2]),
-							str(truss.getEuler()[0]),str(truss.getEuler()[1]),str(truss.getEuler()[2]),
-							int(truss.orientation.value)])
-	
-	cycleOrientation(cachedOrientation)
+	records = bridgeModel.toRecords()
+	bridgeio.save(filePath,records)
+	saveLibrary.update(filePath,records)
 	
 	# Save successful feedback
 	runFeedbackTask('Save success!')
 		
-# Loads Build members' truss dimensions, position, rotation from './data/bridge#.csv'					
+# Loads Build members' truss dimensions, position, rotation from './data/saves/bridge#.tbb' or '.csv'
 def LoadData():
-	global BUILD_MEMBERS
-	global SIDE_MEMBERS
-	global TOP_MEMBERS
-	global BOT_MEMBERS
-	global SIDE_CLONES
-	global ORDERS
-	global GRAB_LINKS
+	global LOAD_TASK
 	
 	# Play MUTE
 	clickSound.play()
 	
-	filePath = vizinput.fileOpen(filter=[('CSV Files','*.csv')],directory='./data/saves')		
+	if isloading:
+		runFeedbackTask('Already loading!')
+		warningSound.play()
+		return
+	
+	filePath = vizinput.fileOpen(filter=LOAD_FILTER,directory=SAVES_DIRECTORY)		
 	if filePath == '':
 		return	
-
-	clearMembers()
 	
-	cachedOrientation = ORIENTATION
-	cycleOrientation(structures.Orientation.Side)
-	cachedMode = MODE
+	loadFile(filePath)
+
+
+def loadFile(filePath):
+	"""Start streaming a bridge save into the scene"""
+	global LOAD_TASK
+	if isloading:
+		runFeedbackTask('Already loading!')
+		warningSound.play()
+		return
+	LOAD_TASK = viztask.schedule( instrumentation.wrapTask(LoadDataTask(bridgeio.streamMembers(filePath),filePath)) )
+
+
+def loadMember(diameter, thickness, length, quantity, pos, euler, orientation):
+	"""Create one loaded truss member in place without registering it for interaction"""
+	order = Order(diameter=diameter,thickness=thickness,length=length,quantity=quantity)
+	order.pos = pos
+	order.euler = euler
+	order.orientation = structures.Orientation(orientation)
 	
-	ORDERS = []
-	with open(filePath,'rb') as f:
-		reader = csv.reader(f)
-		for row in reader:
-			 order = Order(diameter=float(row[0]),thickness=float(row[1]),length=float(row[2]),quantity=int(row[3]))
-			 order.pos = ( [float(row[4]), float(row[5]), float(row[6])] )
-			 order.euler = ( [float(row[7]), float(row[8]), float(row[9])] )
-			 order.orientation = structures.Orientation(int(row[10]))
-			 ORDERS.append(order)
-	
-	generateMembers(loading=True)
-
-	for truss in BUILD_MEMBERS:
-		truss.isNewMember = False
-		truss.orientation = truss.order.orientation
-		truss.setPosition(truss.order.pos)
+	truss = createTruss(order,MEMBER_PATH)
+	truss.isNewMember = False
+	truss.orientation = order.orientation
+	bridgeModel.set(truss.memberId,(diameter,thickness,length,quantity,pos,euler,orientation))
+	invalidateLevelOfDetail()
+	syncMemberNode(truss)
+	placeMember(truss)
+	return truss
+
+
+def discardLoadedMembers(members):
+	"""Destroy members created by an unfinished load"""
+	for truss in members:
+		bridgeModel.remove(truss.memberId)
+		recycleTruss(truss)
+	invalidateLevelOfDetail()
+
+
+def commitLoadedMembers(members):
+	"""Register loaded members so they can be grabbed, snapped to and saved"""
+	registerMembers(members)
+	for truss in members:
+		enablePicking(truss)
+		attachJoints(truss)
+		BUILD_MEMBERS.append(truss)
 		if truss.orientation == structures.Orientation.Side:
 			SIDE_MEMBERS.append(truss)
-			truss.clonedSide = cloneSide(truss)
 		elif truss.orientation == structures.Orientation.Top:
 			TOP_MEMBERS.append(truss)
 		elif truss.orientation == structures.Orientation.Bottom:
 			BOT_MEMBERS.append(truss)
-		truss.setEuler(truss.order.euler)
-		link = viz.grab(bridge_root.getGroup(),truss)
-		truss.link = link
-		GRAB_LINKS.append(link)
+
+
+def showLoadProgress(progress):
+	"""Keep the feedback canvas up with the current load percentage"""
+	task.kill()
+	feedbackCanvas.visible(viz.ON)
+	feedbackCanvas.alpha(0.5)
+	feedbackText.alpha(1)
+	feedbackText.message('Loading {}%  [ ESC ] Cancel'.format(int(progress * 100)))
+
+
+def cancelLoad():
+	global LOAD_CANCELLED
+	if isloading:
+		LOAD_CANCELLED = True
+
+
+# Streams (member,progress) pairs from a save file or the autosave, spending at most LOAD_BUDGET_MS per frame
+def LoadDataTask(stream,source):
+	global isloading
+	global LOAD_CANCELLED
+	global LOAD_TASK
+	
+	#--Read the first member before touching the scene, so an unreadable file leaves the bridge alone
+	try:
+		first = [next(stream)]
+	except StopIteration:
+		first = []
+	except (bridgeio.BridgeFormatError,ValueError,IOError,csv.Error) as e:
+		viz.logError('LoadData: Unable to read', source, e)
+		runFeedbackTask('Invalid save file!')
+		warningSound.play()
+		LOAD_TASK = None
+		return
+	stream = itertools.chain(first,stream)
+	
+	#--Keep the autosave intact until the new bridge is committed, and the old bridge to restore on failure
+	previous = bridgeModel.items()
+	clearMembers(journaled=False)
+	
+	cachedOrientation = ORIENTATION
+	cycleOrientation(structures.Orientation.Side)
+	cachedMode = MODE
+	
+	isloading = True
+	LOAD_CANCELLED = False
+	loaded = []
+	failed = False
+	
+	try:
+		frameStart = viz.tick()
+		for member, progress in stream:
+			loaded.append(loadMember(*member))
+			if (viz.tick() - frameStart) * 1000.0 >= LOAD_BUDGET_MS:
+				showLoadProgress(progress)
+				yield viztask.waitFrame(1)
+				frameStart = viz.tick()
+				if LOAD_CANCELLED:
+					break
+	except (bridgeio.BridgeFormatError,ValueError,IOError,csv.Error) as e:
+		viz.logError('LoadData: Unable to read', source, e)
+		failed = True
+	
+	isloading = False
+	LOAD_TASK = None
+	
+	if failed or LOAD_CANCELLED:
+		discardLoadedMembers(loaded)
+		#--Put the previous bridge back under fresh member ids
+		loaded = [loadMember(*member) for memberId, member in previous]
+	commitLoadedMembers(loaded)
+	autosave.reset(bridgeModel.items())
 		
 	cycleOrientation(cachedOrientation)
 	cycleMode(cachedMode)
 	
 	# Show load feedback
-	runFeedbackTask('Load success!')
+	if failed:
+		runFeedbackTask('Invalid save file!')
+		warningSound.play()
+	elif LOAD_CANCELLED:
+		runFeedbackTask('Load cancelled')
+		warningSound.play()
+	else:
+		runFeedbackTask('Load success!')
+	LOAD_CANCELLED = False
+
+def recoverSession():
+	"""Rebuild the bridge from the autosave snapshot and journal"""
+	global LOAD_TASK
+	members = autosave.recover()
+	count = float(max(len(members),1))
+	stream = ( (member,(i + 1) / count) for i, (memberId, member) in enumerate(members) )
+	LOAD_TASK = viztask.schedule( instrumentation.wrapTask(LoadDataTask(stream,AUTOSAVE_DIRECTORY)) )
+
+
+def discardSession():
+	bridgeModel.clear()
+	autosave.reset()
+
+
+def onExit():
+	autosave.close()
+	if DEBUG_TIMING:
+		print 'Pool statistics:', getPoolStats()
+		print 'Metrics:', metrics.snapshot()
+		for task in scheduler.getDefault().getTasks():
+			print 'Task:', task.getStats()
+	if instrumentation.getSummary():
+		print 'Callback timings:', instrumentation.dump(PROFILE_PATH), 'callbacks written to', PROFILE_PATH
 
 # Events
+viz.callback ( viz.EXIT_EVENT, onExit )
 viz.callback ( viz.SLIDER_EVENT, onSlider )
 viz.callback ( viz.LIST_EVENT, onList )
 
@@ -2820,7 +3287,7 @@ def MainTask():
 			vizact.onsensorup( navigator.getSensor(), navigator.KEYS['road'],toggleRoad,road)
 			vizact.onsensorup( navigator.getSensor(), navigator.KEYS['stereo'],toggleStereo,vizact.choice([False,True]))		
 			viz.callback( navigation.getExtension().HAT_EVENT, onHatChange )
-			vizact.ontimer( 0,slideRootHat )	
+			scheduler.add(slideRootHat,scheduler.INPUT)	
 			navigator.setAsMain()
 		elif joystickConnected:
 			navigator = navigation.Joystick()
@@ -2830,7 +3297,7 @@ def MainTask():
 			vizact.onsensorup( navigator.getSensor(), navigator.KEYS['road'],toggleRoad,road)			
 			vizact.onsensorup( navigator.getSensor(), navigator.KEYS['stereo'],toggleStereo,vizact.choice([False,True]))		
 			viz.callback( navigation.getExtension().HAT_EVENT, onHatChange )
-			vizact.ontimer( 0,slideRootHat )				
+			scheduler.add(slideRootHat,scheduler.INPUT)				
 			navigator.setAsMain()
 		elif oculusConnected:
 			navigator = navigation.Oculus()
@@ -2855,7 +3322,9 @@ def MainTask():
 		navigator.reset()
 		
 		initMouse()
-		highlightTool.setUpdateFunction(updateHighlightTool)
+		#--The highlighter's own per-frame update is replaced by the interaction phase pick
+		highlightTool.setUpdateFunction(lambda tool: None)
+		scheduler.add(updateHighlightTool,scheduler.INTERACTION,args=(highlightTool,))
 		mouseTracker = initTracker(HAND_DISTANCE)
 		gloveLink = viz.link(mouseTracker,glove)
 		gloveLink.postMultLinkable(navigator.VIEW)
@@ -2866,7 +3335,7 @@ def MainTask():
 		inspectorLink.postTrans([0,-.2,0])
 		inspectorCanvas.visible(False)
 		
-		vizact.ontimer(0,clampTrackerScroll,mouseTracker,SCROLL_MIN,SCROLL_MAX)
+		scheduler.add(clampTrackerScroll,scheduler.INPUT,args=(mouseTracker,SCROLL_MIN,SCROLL_MAX))
 		
 		rotationCanvas.setEuler( [0,30,0] )
 		
@@ -2881,6 +3350,12 @@ def MainTask():
 		#--Show initial info message
 		info_root.showInfoMessage(INITIAL_MESSAGE)
 		
+		#--Offer to recover an autosaved bridge after a crash
+		if autosave.begin() and len(autosave.recover()) > 0:
+			viztask.schedule(instrumentation.wrapTask(showdialog(RECOVER_MESSAGE,recoverSession,discardSession)))
+		else:
+			autosave.reset()
+		
 		
 		#--Button callbacks
 		vizact.onbuttonup ( saveButton, SaveData )
@@ -2892,7 +3367,7 @@ def MainTask():
 #		toggleMenu(True)
 		
 		INITIALIZED = True
-viztask.schedule( MainTask() )
+viztask.schedule( instrumentation.wrapTask(MainTask()) )
 
 		
 # Pre-load sounds